@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class StagetwoConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "stagetwo"
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .routers import check_pin_cache
+
+        check_pin_cache()
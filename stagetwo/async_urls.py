@@ -0,0 +1,19 @@
+from django.urls import path
+from . import async_views
+from .views import BulkUserRegistrationView
+
+# Same routes and names as urls.py, served by the native async views.
+urlpatterns = [
+    path('register', async_views.UserRegistrationView.as_view(), name='register'),
+    path('register/bulk', BulkUserRegistrationView.as_view(), name='register-bulk'),
+    path('login', async_views.UserLoginView.as_view(), name='login'),
+    path('token/refresh', async_views.TokenRefreshView.as_view(), name='token-refresh'),
+    path('logout', async_views.LogoutView.as_view(), name='logout'),
+    path('users/<uuid:user_id>', async_views.UserDetailView.as_view(), name='user-detail'),
+    path('organisations', async_views.OrganisationListView.as_view(), name='organisation-list'),
+    path('organisations/search', async_views.OrganisationSearchView.as_view(), name='organisation-search'),
+    path('organisations/<uuid:org_id>', async_views.OrganisationDetailView.as_view(), name='organisation-detail'),
+    path('organisations', async_views.OrganisationCreateView.as_view(), name='organisation-create'),
+    path('organisations/<uuid:org_id>/users', async_views.AddUserToOrganisationView.as_view(), name='add-user-to-organisation'),
+    path('organisations/<uuid:org_id>/users/batch', async_views.AddUsersToOrganisationView.as_view(), name='add-users-to-organisation'),
+]
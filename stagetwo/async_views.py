@@ -0,0 +1,466 @@
+"""
+Native async versions of the views in ``views.py``, served when the
+project runs under ASGI with ``ASYNC_VIEWS`` enabled (see ``asgi.py``).
+
+DRF's ``APIView`` is synchronous, so these views are plain Django async
+views. They reuse the same authentication class, serializers, parser and
+renderer, so the request and response formats match the sync views. ORM
+access uses Django's async query methods. Password hashing runs on the
+bounded hash pool so it never blocks the event loop.
+"""
+from io import BytesIO
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
+from rest_framework.settings import api_settings
+from rest_framework_simplejwt.exceptions import TokenError
+
+from .authentication import ClaimsJWTAuthentication
+from .conditional import etag_matches, make_etag
+from .hashing import acheck_password, ahash_password
+from .memberships import (
+    add_members, ais_member, ashare_organisation, organisation_list_versions, organisation_members
+)
+from .metrics import AUTH_FAILURES
+from .models import Membership, Organisation, User
+from .organisation_cache import aorganisation_list, aorganisation_payloads
+from .pagination import InvalidCursor, KeysetPaginator
+from .projections import MEMBER, ORGANISATION, USER
+from .routers import apin_to_primary, ause_replica, read_alias, reset_reads
+from .search import InvalidQuery, clean_query, search_organisations
+from .singleflight import lookups
+from .timing import timed
+from .serializers import (
+    AddUserToOrganisationSerializer,
+    AddUsersToOrganisationSerializer,
+    OrganisationSerializer,
+    UserLoginSerializer,
+    UserRegistrationSerializer,
+    create_user_with_organisation,
+    field_errors,
+)
+from .tokens import (
+    delete_refresh_cookie,
+    requested_refresh_delivery,
+    revoke_tokens,
+    set_refresh_cookie,
+    use_refresh_token,
+)
+from .views import get_raw_refresh_token, issue_tokens
+
+
+class AsyncAPIView(View):
+    authentication_class = ClaimsJWTAuthentication
+    authentication_required = False
+    # Serve the view's GET requests from a read replica; see routers.py.
+    replica_reads = False
+    # Set by a handler to send (or clear) the refresh token cookie.
+    refresh_cookie = None
+    clear_refresh_cookie = False
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        # Token-authenticated JSON API, same as DRF's APIView.
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            request.data = self.parse(request)
+            request.user, request.auth = await self.authenticate(request)
+            handler = getattr(self, request.method.lower(), None)
+            if handler is None or request.method.lower() not in self.http_method_names:
+                raise exceptions.MethodNotAllowed(request.method)
+            read_alias_token = None
+            if self.replica_reads and request.method in ('GET', 'HEAD'):
+                read_alias_token = await ause_replica(request.user.pk)
+            try:
+                # Handlers return (data, status) or (data, status, headers).
+                data, status_code, *headers = await handler(request, *args, **kwargs)
+            finally:
+                if read_alias_token is not None:
+                    reset_reads(read_alias_token)
+        except exceptions.APIException as exc:
+            return self.handle_exception(exc)
+        response = self.render(data, status_code)
+        for name, value in (headers[0] if headers else {}).items():
+            response[name] = value
+        if self.refresh_cookie:
+            set_refresh_cookie(response, self.refresh_cookie)
+        elif self.clear_refresh_cookie:
+            delete_refresh_cookie(response)
+        return response
+
+    def parse(self, request):
+        if not request.body:
+            return {}
+        parser = api_settings.DEFAULT_PARSER_CLASSES[0]()
+        return parser.parse(BytesIO(request.body))
+
+    async def authenticate(self, request):
+        authenticator = self.authentication_class()
+        result = await authenticator.aauthenticate(request)
+        if result is None:
+            if self.authentication_required:
+                raise exceptions.NotAuthenticated()
+            return None, None
+        return result
+
+    def handle_exception(self, exc):
+        if isinstance(exc.detail, (list, dict)):
+            data = exc.detail
+        else:
+            data = {"detail": exc.detail}
+        response = self.render(data, exc.status_code)
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            response.status_code = status.HTTP_401_UNAUTHORIZED
+            response["WWW-Authenticate"] = self.authentication_class().authenticate_header(None)
+        return response
+
+    def not_modified(self, etag):
+        return None, status.HTTP_304_NOT_MODIFIED, {"ETag": etag}
+
+    def render(self, data, status_code):
+        renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+        with timed('render'):
+            content = renderer.render(data)
+        return HttpResponse(content, status=status_code, content_type=renderer.media_type)
+
+
+class UserRegistrationView(AsyncAPIView):
+    async def post(self, request):
+        serializer = UserRegistrationSerializer(data=request.data)
+        if not serializer.is_valid():
+            return {"errors": field_errors(serializer.errors)}, status.HTTP_400_BAD_REQUEST
+        password_hash = await ahash_password(serializer.validated_data['password'])
+        try:
+            user = await sync_to_async(create_user_with_organisation)(serializer.validated_data, password_hash)
+        except exceptions.ValidationError as exc:
+            return {"errors": field_errors(exc.detail)}, status.HTTP_400_BAD_REQUEST
+        await apin_to_primary(user.pk)
+        tokens, self.refresh_cookie = issue_tokens(user, requested_refresh_delivery(request.GET))
+        return {
+            "status": "success",
+            "message": "Registration successful",
+            "data": {
+                **tokens,
+                "user": USER.from_instance(user),
+            }
+        }, status.HTTP_201_CREATED
+
+
+class UserLoginView(AsyncAPIView):
+    async def post(self, request):
+        serializer = UserLoginSerializer(data=request.data)
+        if not serializer.is_valid():
+            return serializer.errors, status.HTTP_400_BAD_REQUEST
+        email = serializer.validated_data['email']
+        password = serializer.validated_data['password']
+        user = await User.objects.by_email(email).afirst()
+        if user is None:
+            # Hash anyway so unknown emails take as long as wrong passwords,
+            # as ModelBackend does.
+            await ahash_password(password)
+        elif await acheck_password(user, password) and user.is_active:
+            tokens, self.refresh_cookie = issue_tokens(user, requested_refresh_delivery(request.GET))
+            return {
+                "status": "success",
+                "message": "Login successful",
+                "data": {
+                    **tokens,
+                    "user": USER.from_instance(user),
+                }
+            }, status.HTTP_200_OK
+        AUTH_FAILURES.inc(reason='login')
+        return {
+            "status": "Bad request",
+            "message": "Authentication failed",
+            "statusCode": 401
+        }, status.HTTP_401_UNAUTHORIZED
+
+
+class TokenRefreshView(AsyncAPIView):
+    async def post(self, request):
+        raw, delivery = get_raw_refresh_token(request)
+        try:
+            user, rotate = await sync_to_async(use_refresh_token)(raw)
+        except TokenError:
+            AUTH_FAILURES.inc(reason='refresh_token')
+            return {
+                "status": "Bad request",
+                "message": "Invalid or expired refresh token",
+                "statusCode": 401
+            }, status.HTTP_401_UNAUTHORIZED
+        tokens, self.refresh_cookie = issue_tokens(user, delivery if rotate else None)
+        return {
+            "status": "success",
+            "message": "Token refreshed successfully",
+            "data": tokens
+        }, status.HTTP_200_OK
+
+
+class LogoutView(AsyncAPIView):
+    authentication_required = True
+
+    async def post(self, request):
+        raw, _ = get_raw_refresh_token(request)
+        await sync_to_async(revoke_tokens)(request.user, request.auth, raw)
+        self.clear_refresh_cookie = True
+        return {
+            "status": "success",
+            "message": "Logout successful"
+        }, status.HTTP_200_OK
+
+class UserDetailView(AsyncAPIView):
+    authentication_required = True
+    replica_reads = True
+
+    async def get(self, request, user_id):
+        current_user = request.user
+        if str(current_user.userId) == str(user_id):
+            data = USER.from_instance(current_user)
+            etag = make_etag('user', data)
+            if etag_matches(request, etag):
+                return self.not_modified(etag)
+            return {
+                "status": "success",
+                "message": "User retrieved successfully",
+                "data": data
+            }, status.HTTP_200_OK, {"ETag": etag}
+        try:
+            pk, version, *row = await lookups.ado(
+                ('user', user_id, read_alias()),
+                lambda: User.objects.values_list('pk', 'version', *USER.columns).aget(userId=user_id)
+            )
+        except User.DoesNotExist:
+            return {
+                "status": "Bad Request",
+                "message": "User not found",
+                "statusCode": 404
+            }, status.HTTP_404_NOT_FOUND
+        if not await ashare_organisation(current_user.pk, pk):
+            return {
+                "status": "Forbidden Request",
+                "message": "You do not have the permission to view this yet",
+                "statusCode": 403
+            }, status.HTTP_403_FORBIDDEN
+        etag = make_etag('user', str(user_id), version)
+        if etag_matches(request, etag):
+            return self.not_modified(etag)
+        return {
+            "status": "success",
+            "message": "User retrieved successfully",
+            "data": USER.from_row(row)
+        }, status.HTTP_200_OK, {"ETag": etag}
+
+
+class OrganisationListView(AsyncAPIView):
+    authentication_required = True
+    replica_reads = True
+    paginator = KeysetPaginator(key='id')
+
+    async def get(self, request):
+        versions = await organisation_list_versions(request.user.pk).afirst() or (None, None, 0)
+        etag = make_etag('organisations', request.user.pk, *versions[1:], request.GET.urlencode())
+        if etag_matches(request, etag):
+            return self.not_modified(etag)
+
+        if not self.paginator.is_requested(request):
+            entries = await aorganisation_list(request.user.pk, *versions)
+            return {
+                "status": "success",
+                "message": "Organisations retrieved successfully",
+                "data": {
+                    "organisations": await aorganisation_payloads(entries)
+                }
+            }, status.HTTP_200_OK, {"ETag": etag}
+        try:
+            page, next_cursor = await self.paginator.apaginate(
+                Organisation.objects.filter(users=request.user.pk).values_list('id', *ORGANISATION.columns), request
+            )
+        except InvalidCursor as exc:
+            return {
+                "status": "Bad Request",
+                "message": str(exc),
+                "statusCode": 400
+            }, status.HTTP_400_BAD_REQUEST
+        return {
+            "status": "success",
+            "message": "Organisations retrieved successfully",
+            "data": {
+                "organisations": [ORGANISATION.from_row(row[1:]) for row in page],
+                "next": next_cursor
+            }
+        }, status.HTTP_200_OK, {"ETag": etag}
+
+
+class OrganisationSearchView(AsyncAPIView):
+    authentication_required = True
+    replica_reads = True
+    paginator = KeysetPaginator(key=('rank', 'id'), default_limit=20)
+
+    async def get(self, request):
+        try:
+            query = clean_query(request.GET.get('q'))
+            page, next_cursor = await self.paginator.apaginate(
+                search_organisations(request.user.pk, query).values_list('rank', 'id', *ORGANISATION.columns),
+                request
+            )
+        except (InvalidQuery, InvalidCursor) as exc:
+            return {
+                "status": "Bad Request",
+                "message": str(exc),
+                "statusCode": 400
+            }, status.HTTP_400_BAD_REQUEST
+        return {
+            "status": "success",
+            "message": "Organisations retrieved successfully",
+            "data": {
+                "organisations": [ORGANISATION.from_row(row[2:]) for row in page],
+                "next": next_cursor
+            }
+        }, status.HTTP_200_OK
+
+
+class OrganisationDetailView(AsyncAPIView):
+    authentication_required = True
+    replica_reads = True
+
+    async def get(self, request, org_id):
+        try:
+            pk, version, *row = await lookups.ado(
+                ('organisation', org_id, read_alias()),
+                lambda: Organisation.objects.values_list('pk', 'version', *ORGANISATION.columns).aget(orgId=org_id)
+            )
+            if not await ais_member(request.user.pk, pk):
+                raise Organisation.DoesNotExist
+        except Organisation.DoesNotExist:
+            return {
+                "status": "Bad request",
+                "message": "Organisation not found",
+                "statusCode": 404
+            }, status.HTTP_404_NOT_FOUND
+        etag = make_etag('organisation', str(org_id), version)
+        if etag_matches(request, etag):
+            return self.not_modified(etag)
+        return {
+            "status": "success",
+            "message": "Organisation retrieved successfully",
+            "data": ORGANISATION.from_row(row)
+        }, status.HTTP_200_OK, {"ETag": etag}
+
+
+class OrganisationCreateView(AsyncAPIView):
+    authentication_required = True
+
+    async def post(self, request):
+        serializer = OrganisationSerializer(data=request.data)
+        if not serializer.is_valid():
+            return {
+                "status": "Bad Request",
+                "message": "Client error",
+                "statusCode": 400
+            }, status.HTTP_400_BAD_REQUEST
+        organisation = await Organisation.objects.acreate(**serializer.validated_data)
+        await organisation.users.aadd(request.user.pk, through_defaults={'role': Membership.Role.OWNER})
+        await organisation.arefresh_from_db(fields=['member_count'])
+        await apin_to_primary(request.user.pk)
+        return {
+            "status": "success",
+            "message": "Organisation created successfully",
+            "data": OrganisationSerializer(organisation).data
+        }, status.HTTP_201_CREATED
+
+
+class AddUserToOrganisationView(AsyncAPIView):
+    authentication_required = True
+    replica_reads = True
+    paginator = KeysetPaginator(key='user_id')
+
+    async def get(self, request, org_id):
+        try:
+            page, next_cursor = await self.paginator.apaginate(
+                organisation_members(org_id, request.user.pk).values_list('user_id', *MEMBER.columns), request
+            )
+        except InvalidCursor as exc:
+            return {
+                "status": "Bad Request",
+                "message": str(exc),
+                "statusCode": 400
+            }, status.HTTP_400_BAD_REQUEST
+        if not page and not await Organisation.objects.filter(orgId=org_id, users=request.user.pk).aexists():
+            return {
+                "status": "Bad request",
+                "message": "Organisation not found",
+                "statusCode": 404
+            }, status.HTTP_404_NOT_FOUND
+        return {
+            "status": "success",
+            "message": "Members retrieved successfully",
+            "data": {
+                "users": [MEMBER.from_row(row[1:]) for row in page],
+                "next": next_cursor
+            }
+        }, status.HTTP_200_OK
+
+    async def post(self, request, org_id):
+        serializer = AddUserToOrganisationSerializer(data=request.data)
+        if not serializer.is_valid():
+            return serializer.errors, status.HTTP_400_BAD_REQUEST
+        try:
+            user = await User.objects.aget(userId=serializer.validated_data['userId'])
+        except User.DoesNotExist:
+            return {
+                "status": "Bad request",
+                "message": "User not found",
+                "statusCode": 404
+            }, status.HTTP_404_NOT_FOUND
+        try:
+            organisation = await Organisation.objects.aget(orgId=org_id, users=request.user.pk)
+        except Organisation.DoesNotExist:
+            return {
+                "status": "Bad request",
+                "message": "Organisation not found",
+                "statusCode": 404
+            }, status.HTTP_404_NOT_FOUND
+        await organisation.users.aadd(user)
+        await apin_to_primary(request.user.pk, user.pk)
+        return {
+            "status": "success",
+            "message": "User added to organisation successfully"
+        }, status.HTTP_200_OK
+
+
+class AddUsersToOrganisationView(AsyncAPIView):
+    authentication_required = True
+
+    async def post(self, request, org_id):
+        serializer = AddUsersToOrganisationSerializer(data=request.data)
+        if not serializer.is_valid():
+            return serializer.errors, status.HTTP_400_BAD_REQUEST
+        try:
+            organisation = await Organisation.objects.aget(orgId=org_id, users=request.user.pk)
+        except Organisation.DoesNotExist:
+            return {
+                "status": "Bad request",
+                "message": "Organisation not found",
+                "statusCode": 404
+            }, status.HTTP_404_NOT_FOUND
+        user_ids = list(dict.fromkeys(serializer.validated_data['userIds']))
+        found = {
+            uid: pk async for uid, pk in User.objects.filter(userId__in=user_ids).values_list('userId', 'pk')
+        }
+        added = set(await sync_to_async(add_members)(organisation, list(found.values())))
+        await apin_to_primary(request.user.pk, *added)
+        return {
+            "status": "success",
+            "message": "Users added to organisation successfully",
+            "data": {
+                "added": [str(uid) for uid, pk in found.items() if pk in added],
+                "alreadyMembers": [str(uid) for uid, pk in found.items() if pk not in added],
+                "notFound": [str(uid) for uid in user_ids if uid not in found],
+            }
+        }, status.HTTP_200_OK
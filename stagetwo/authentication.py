@@ -0,0 +1,130 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .cache import TTLCache
+from .metrics import AUTH_FAILURES
+from .revocation import revocations
+from .timing import timed
+
+
+user_cache = TTLCache(
+    maxsize=getattr(settings, 'USER_CACHE_SIZE', 1024),
+    ttl=getattr(settings, 'USER_CACHE_TTL', 300),
+)
+
+
+def get_cached_user(pk):
+    user = user_cache.get(pk)
+    if user is None:
+        try:
+            user = get_user_model().objects.get(pk=pk)
+        except get_user_model().DoesNotExist:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+        user_cache.set(pk, user)
+    return user
+
+
+class ClaimsUser(TokenUser):
+    """
+    A lightweight user built from the claims of a validated access token.
+
+    The profile fields the views need are read straight from the token. Any
+    other attribute falls through to the full ``User`` row, which is loaded
+    once and kept in a bounded TTL/LRU cache.
+
+    ``is_active`` is ``TokenUser``'s constant ``True``, not read from the
+    row: a deactivated user keeps API access until their access token
+    expires (``ACCESS_TOKEN_LIFETIME``, five minutes). Refreshing is refused
+    for inactive users, so no later access token is issued.
+    """
+
+    def _claim(self, claim, attr):
+        if claim in self.token:
+            return self.token[claim]
+        return getattr(self.get_full_user(), attr)
+
+    @cached_property
+    def userId(self):
+        return self._claim("userId", "userId")
+
+    @cached_property
+    def email(self):
+        return self._claim("email", "email")
+
+    @cached_property
+    def first_name(self):
+        return self._claim("firstName", "first_name")
+
+    @cached_property
+    def last_name(self):
+        return self._claim("lastName", "last_name")
+
+    @cached_property
+    def phone(self):
+        return self._claim("phone", "phone")
+
+    def get_full_user(self):
+        return get_cached_user(self.pk)
+
+    def __getattr__(self, name):
+        # Only reached for attributes the token cannot answer.
+        if name.startswith('_') or name == 'token':
+            raise AttributeError(name)
+        return getattr(self.get_full_user(), name)
+
+
+class ClaimsJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    JWT authentication that does not query the database per request; see
+    ``ClaimsUser`` and, for revoked tokens, ``revocation.py``.
+    """
+
+    def authenticate(self, request):
+        with timed('auth'):
+            try:
+                return super().authenticate(request)
+            except AuthenticationFailed:
+                AUTH_FAILURES.inc(reason='access_token')
+                raise
+
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        if revocations.is_revoked(validated_token.get(api_settings.JTI_CLAIM)):
+            raise InvalidToken("Token has been revoked")
+        return validated_token
+
+    async def aauthenticate(self, request):
+        try:
+            return await self._aauthenticate(request)
+        except AuthenticationFailed:
+            AUTH_FAILURES.inc(reason='access_token')
+            raise
+
+    async def _aauthenticate(self, request):
+        # authenticate() for async views: the revocation check may need the
+        # database, which must not be queried synchronously on the event loop.
+        with timed('auth'):
+            header = self.get_header(request)
+            if header is None:
+                return None
+            raw_token = self.get_raw_token(header)
+            if raw_token is None:
+                return None
+            validated_token = await self.aget_validated_token(raw_token)
+            return self.get_user(validated_token), validated_token
+
+    async def aget_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        if await revocations.ais_revoked(validated_token.get(api_settings.JTI_CLAIM)):
+            raise InvalidToken("Token has been revoked")
+        return validated_token
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken("Token contained no recognizable user identification")
+        return ClaimsUser(validated_token)
@@ -0,0 +1,85 @@
+"""
+Helpers shared by the ``bench_*`` management commands.
+
+Benchmarks always run against a throwaway test database created from the
+configured connection, never against the configured database itself.
+"""
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+
+@contextmanager
+def benchmark_database(verbosity=0):
+    # The test environment also lets the test clients' "testserver" host in.
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=verbosity, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity)
+        teardown_test_environment()
+
+
+def percentile(sorted_samples, pct):
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, int(round(pct / 100 * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+
+def summarize(samples, elapsed=None):
+    """
+    Summarize per-operation durations (seconds) as throughput and latency
+    percentiles in milliseconds.
+    """
+    samples = sorted(samples)
+    elapsed = elapsed if elapsed is not None else sum(samples)
+    return {
+        "iterations": len(samples),
+        "ops_per_sec": len(samples) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+    }
+
+
+def measure(fn, iterations, warmup=0):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return summarize(samples, time.perf_counter() - started)
+
+
+def format_row(name, result):
+    return (
+        f"{name:<40} {result['ops_per_sec']:>10.1f} ops/s  "
+        f"p50 {result['p50_ms']:.3f}ms  p95 {result['p95_ms']:.3f}ms  p99 {result['p99_ms']:.3f}ms"
+    )
+
+
+def compare_to_baseline(results, baseline, tolerance=0.2, metric='p95_ms'):
+    """
+    Regressions of ``results`` against a saved ``baseline`` (both mappings
+    of name to result): ``metric`` more than ``tolerance`` slower, or more
+    SQL queries per request. Names missing from either side are ignored.
+    """
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if previous.get(metric) and result[metric] > previous[metric] * (1 + tolerance):
+            regressions.append(
+                f"{name}: {metric} {result[metric]:.3f} > {previous[metric]:.3f} (+{tolerance:.0%} allowed)"
+            )
+        if 'queries_max' in previous and result.get('queries_max', 0) > previous['queries_max']:
+            regressions.append(f"{name}: {result['queries_max']} queries per request, was {previous['queries_max']}")
+    return regressions
@@ -0,0 +1,25 @@
+"""
+Strong ETags and ``If-None-Match`` handling for the read endpoints.
+
+ETags are derived from row version counters (see ``models.bump_version``,
+``memberships.bump_membership_versions`` and
+``memberships.bump_organisations_versions``), so a 304 can be decided
+without building the response body.
+"""
+import hashlib
+
+from django.utils.cache import parse_etags
+
+
+def make_etag(*parts):
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(request, etag):
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    # If-None-Match uses the weak comparison function.
+    return '*' in etags or etag in (tag.removeprefix('W/') for tag in etags)
@@ -0,0 +1,59 @@
+"""
+Database connection management.
+
+``database_config`` builds ``DATABASES['default']`` for one of three
+connection modes (``DATABASE_CONNECTION_MODE``):
+
+``persistent``
+    Long-lived workers: connections are kept for ``CONN_MAX_AGE`` seconds
+    and health-checked before reuse.
+``pgbouncer``
+    Serverless, behind PgBouncer in transaction pooling mode: connections
+    are closed at the end of every request (PgBouncer does the pooling),
+    and server-side cursors are disabled because a cursor cannot outlive
+    the pooled transaction.
+``pooled``
+    Long-running ASGI/WSGI workers without PgBouncer: closed connections go
+    back to an in-process pool (see ``backends/postgresql``).
+
+Django only connects on the first query in every mode, so requests that
+never touch the database (e.g. ones answered from token claims) never pay
+for a connection or a TLS handshake.
+"""
+import dj_database_url
+
+MODES = ('persistent', 'pgbouncer', 'pooled')
+
+
+def database_config(url, mode='persistent', ssl_require=True, conn_max_age=600, pool=None):
+    if mode not in MODES:
+        raise ValueError(f"Unknown database connection mode {mode!r}, expected one of {', '.join(MODES)}")
+    if not url:
+        return {}
+    config = dj_database_url.parse(url)
+    is_postgres = config['ENGINE'] == 'django.db.backends.postgresql'
+    if is_postgres:
+        # Counts connects (and pools, in "pooled" mode).
+        config['ENGINE'] = 'stagetwo.db.backends.postgresql'
+        if ssl_require:
+            config.setdefault('OPTIONS', {})['sslmode'] = 'require'
+
+    if mode == 'persistent':
+        config['CONN_MAX_AGE'] = conn_max_age
+        config['CONN_HEALTH_CHECKS'] = True
+    elif mode == 'pgbouncer':
+        config['CONN_MAX_AGE'] = 0
+        config['DISABLE_SERVER_SIDE_CURSORS'] = True
+    elif is_postgres:
+        config['CONN_MAX_AGE'] = 0
+        config['POOL'] = dict(pool or {})
+    return config
+
+
+def connection_stats():
+    """
+    Connect counters and latency (and pool hits/misses) per database alias
+    for this process. Exported by ``stagetwo.metrics``.
+    """
+    from .pool import stats
+    return {alias: alias_stats.as_dict() for alias, alias_stats in stats.items()}
@@ -0,0 +1,69 @@
+"""
+PostgreSQL backend that counts connects and, when ``POOL`` is set in the
+database settings, keeps closed connections in an in-process pool instead
+of closing them::
+
+    "POOL": {"size": 10, "max_idle": 300, "check_after": 30}
+
+Use it with ``CONN_MAX_AGE = 0`` so Django hands the connection back at the
+end of every request. See ``stagetwo.db.database_config``.
+"""
+from django.db.backends.postgresql import base
+
+from ...pool import ConnectionPool, stats_for, timed_connect
+
+# Per process and per alias; shared by every thread's DatabaseWrapper.
+pools = {}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def __init__(self, settings_dict, *args, **kwargs):
+        super().__init__(settings_dict, *args, **kwargs)
+        alias = self.alias
+        self.stats = stats_for(alias)
+        options = settings_dict.get("POOL")
+        self.pool = None
+        if options:
+            self.pool = pools.get(alias)
+            if self.pool is None:
+                self.pool = pools[alias] = ConnectionPool(
+                    options.get("size", 10),
+                    max_idle=options.get("max_idle", 300),
+                    check_after=options.get("check_after", 30),
+                    is_usable=self._is_usable_raw,
+                    stats=self.stats,
+                )
+
+    def get_new_connection(self, conn_params):
+        connect = lambda: super(DatabaseWrapper, self).get_new_connection(conn_params)
+        if self.pool is None:
+            return timed_connect(connect, self.stats)
+        return self.pool.acquire(connect)
+
+    def _close(self):
+        if self.pool is None or self.in_atomic_block:
+            return super()._close()
+        connection = self.connection
+        # Only pool connections that are idle outside a transaction.
+        try:
+            if connection.info.transaction_status != 0:
+                connection.rollback()
+        except Exception:
+            self.pool.discard(connection)
+            return
+        if self.errors_occurred:
+            self.pool.discard(connection)
+        else:
+            self.pool.release(connection)
+
+    @staticmethod
+    def _is_usable_raw(connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            # A pooled connection may be in manual-commit mode.
+            if connection.info.transaction_status != 0:
+                connection.rollback()
+        except Exception:
+            return False
+        return True
@@ -0,0 +1,120 @@
+"""
+A small in-process connection pool with hit/miss and connect-latency
+counters, used by the pooled PostgreSQL backend in long-running workers.
+"""
+import threading
+import time
+from collections import deque
+
+
+class ConnectionStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.discarded = 0
+        self.connects = 0
+        self.connect_seconds = 0.0
+        self.connect_seconds_max = 0.0
+
+    def record_connect(self, seconds):
+        with self._lock:
+            self.connects += 1
+            self.connect_seconds += seconds
+            self.connect_seconds_max = max(self.connect_seconds_max, seconds)
+
+    def record(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "discarded": self.discarded,
+                "connects": self.connects,
+                "connect_seconds": self.connect_seconds,
+                "connect_ms_avg": self.connect_seconds / self.connects * 1000 if self.connects else 0.0,
+                "connect_ms_max": self.connect_seconds_max * 1000,
+            }
+
+
+# Per process and per database alias; see stagetwo.db.connection_stats.
+stats = {}
+
+
+def stats_for(alias):
+    return stats.setdefault(alias, ConnectionStats())
+
+
+def timed_connect(connect, stats):
+    started = time.perf_counter()
+    connection = connect()
+    stats.record_connect(time.perf_counter() - started)
+    return connection
+
+
+class ConnectionPool:
+    """
+    LIFO pool of idle connections. ``acquire`` hands out an idle connection
+    (a hit) or opens a new one (a miss); ``release`` keeps it for reuse up to
+    ``size`` idle connections. Connections idle longer than ``max_idle``
+    seconds are closed, and ones idle longer than ``check_after`` seconds are
+    health-checked with ``is_usable`` before being handed out.
+    """
+
+    def __init__(self, size, max_idle=300, check_after=30, is_usable=None, stats=None, timer=time.monotonic):
+        self.size = size
+        self.max_idle = max_idle
+        self.check_after = check_after
+        self.is_usable = is_usable
+        self.stats = stats or ConnectionStats()
+        self.timer = timer
+        self._idle = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self, connect):
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                connection, released_at = self._idle.pop()
+            idle_for = self.timer() - released_at
+            if idle_for > self.max_idle or not self._usable(connection, idle_for):
+                self.discard(connection)
+                continue
+            self.stats.record('hits')
+            return connection
+        self.stats.record('misses')
+        return timed_connect(connect, self.stats)
+
+    def _usable(self, connection, idle_for):
+        if getattr(connection, 'closed', False):
+            return False
+        if self.is_usable is not None and idle_for > self.check_after:
+            return self.is_usable(connection)
+        return True
+
+    def release(self, connection):
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append((connection, self.timer()))
+                return
+        self.discard(connection)
+
+    def discard(self, connection):
+        self.stats.record('discarded')
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def clear(self):
+        with self._lock:
+            idle, self._idle = self._idle, deque()
+        for connection, _ in idle:
+            self.discard(connection)
+
+    def __len__(self):
+        return len(self._idle)
@@ -0,0 +1,49 @@
+"""
+Password hashers whose cost parameters come from ``PASSWORD_HASHER_COSTS``.
+
+The algorithm names are Django's own, so hashes stay interchangeable with
+the stock hashers. When a cost setting changes, ``must_update`` reports
+existing hashes as stale and Django re-hashes them on the next successful
+login. Hashing and verifying are timed in the
+``stagetwo_password_hash_seconds`` metric.
+"""
+from django.conf import settings
+from django.contrib.auth import hashers
+
+from .metrics import PASSWORD_HASH_SECONDS
+
+
+def _cost(algorithm, name, default):
+    return getattr(settings, 'PASSWORD_HASHER_COSTS', {}).get(algorithm, {}).get(name, default)
+
+
+class TimedHasherMixin:
+    def encode(self, password, salt, *args, **kwargs):
+        with PASSWORD_HASH_SECONDS.time(algorithm=self.algorithm, operation='encode'):
+            return super().encode(password, salt, *args, **kwargs)
+
+    def verify(self, password, encoded):
+        with PASSWORD_HASH_SECONDS.time(algorithm=self.algorithm, operation='verify'):
+            return super().verify(password, encoded)
+
+
+class ScryptPasswordHasher(TimedHasherMixin, hashers.ScryptPasswordHasher):
+    work_factor = _cost('scrypt', 'work_factor', hashers.ScryptPasswordHasher.work_factor)
+    block_size = _cost('scrypt', 'block_size', hashers.ScryptPasswordHasher.block_size)
+    parallelism = _cost('scrypt', 'parallelism', hashers.ScryptPasswordHasher.parallelism)
+
+    @property
+    def maxmem(self):
+        # OpenSSL refuses work factors above 2 ** 14 unless the limit is
+        # raised; scrypt needs roughly 128 * N * r bytes.
+        return 2 * 128 * self.work_factor * self.block_size
+
+
+class Argon2PasswordHasher(TimedHasherMixin, hashers.Argon2PasswordHasher):
+    time_cost = _cost('argon2', 'time_cost', hashers.Argon2PasswordHasher.time_cost)
+    memory_cost = _cost('argon2', 'memory_cost', hashers.Argon2PasswordHasher.memory_cost)
+    parallelism = _cost('argon2', 'parallelism', hashers.Argon2PasswordHasher.parallelism)
+
+
+class PBKDF2PasswordHasher(TimedHasherMixin, hashers.PBKDF2PasswordHasher):
+    iterations = _cost('pbkdf2_sha256', 'iterations', hashers.PBKDF2PasswordHasher.iterations)
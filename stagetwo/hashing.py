@@ -0,0 +1,43 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, get_hasher, identify_hasher, make_password
+
+
+# hashlib's pbkdf2_hmac and scrypt release the GIL, so a small thread pool
+# hashes a batch of passwords in parallel.
+hash_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'PASSWORD_HASH_WORKERS', 4),
+    thread_name_prefix='password-hash',
+)
+
+
+def make_passwords(raw_passwords):
+    return list(hash_executor.map(make_password, raw_passwords))
+
+
+async def ahash_password(raw_password):
+    """Hash a password on the bounded hash pool without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(hash_executor, make_password, raw_password)
+
+
+async def acheck_password(user, raw_password):
+    """
+    Async counterpart of ``user.check_password``: verify on the hash pool
+    and, like Django, re-hash and store the password when its hasher or
+    cost is out of date.
+    """
+    loop = asyncio.get_running_loop()
+    valid = await loop.run_in_executor(hash_executor, check_password, raw_password, user.password)
+    if valid and needs_rehash(user.password):
+        user.password = await ahash_password(raw_password)
+        await user.asave(update_fields=['password'])
+    return valid
+
+
+def needs_rehash(encoded):
+    preferred = get_hasher('default')
+    hasher = identify_hasher(encoded)
+    return hasher.algorithm != preferred.algorithm or preferred.must_update(encoded)
@@ -0,0 +1,94 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+from stagetwo.bench import benchmark_database, format_row, summarize
+from stagetwo.models import Organisation, User
+from stagetwo.views import get_tokens_for_user
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare concurrent throughput of the sync views driven by the WSGI handler "
+        "from a thread pool with the async views driven by the ASGI handler on one event loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--organisations', type=int, default=20)
+        parser.add_argument('--json', action='store_true', help="Print results as JSON.")
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            user, other = self.seed(options['organisations'])
+            headers = {"AUTHORIZATION": f"Bearer {get_tokens_for_user(user)['access']}"}
+            routes = {
+                "organisation-list": ('organisation-list', []),
+                "user-detail": ('user-detail', [other.userId]),
+            }
+            results = {}
+            for name, (route, args) in routes.items():
+                with override_settings(ROOT_URLCONF='stagetwo.urls'):
+                    results[f"wsgi {name}"] = self.run_wsgi(reverse(route, args=args), headers, options)
+                with override_settings(ROOT_URLCONF='stagetwo.async_urls'):
+                    results[f"asgi {name}"] = self.run_asgi(reverse(route, args=args), headers, options)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            for name, result in results.items():
+                self.stdout.write(format_row(name, result))
+
+    def seed(self, organisation_count):
+        password = make_password(None)
+        user = User.objects.create(email="bench@example.com", first_name="Bench", password=password)
+        other = User.objects.create(email="other@example.com", first_name="Other", password=password)
+        for i in range(organisation_count):
+            Organisation.objects.create(name=f"Bench organisation {i}").users.add(user, other)
+        return user, other
+
+    def run_wsgi(self, url, headers, options):
+        local = threading.local()
+
+        def request(_):
+            client = getattr(local, 'client', None)
+            if client is None:
+                client = local.client = Client()
+            t0 = time.perf_counter()
+            response = client.get(url, headers=headers)
+            assert response.status_code == 200, response.status_code
+            return time.perf_counter() - t0
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            samples = list(pool.map(request, range(options['requests'])))
+            # Each worker thread opened its own connection.
+            pool.map(lambda _: connections.close_all(), range(options['concurrency']))
+        return summarize(samples, time.perf_counter() - started)
+
+    def run_asgi(self, url, headers, options):
+        async def main():
+            client = AsyncClient()
+            semaphore = asyncio.Semaphore(options['concurrency'])
+
+            async def request():
+                async with semaphore:
+                    t0 = time.perf_counter()
+                    response = await client.get(url, headers=headers)
+                    assert response.status_code == 200, response.status_code
+                    return time.perf_counter() - t0
+
+            started = time.perf_counter()
+            samples = await asyncio.gather(*(request() for _ in range(options['requests'])))
+            return summarize(samples, time.perf_counter() - started)
+
+        return asyncio.run(main())
@@ -0,0 +1,115 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from stagetwo.bench import percentile
+
+# Run in a fresh interpreter per sample: import the WSGI application, then
+# send it one request. Nothing is imported before the clock starts.
+PROBE = """
+import time
+started = time.perf_counter()
+from stagetworest.wsgi import application
+imported = time.perf_counter()
+
+import io, json, sys
+environ = {
+    "REQUEST_METHOD": "GET",
+    "PATH_INFO": sys.argv[1],
+    "QUERY_STRING": "",
+    "SCRIPT_NAME": "",
+    "SERVER_NAME": sys.argv[2],
+    "SERVER_PORT": "443",
+    "HTTP_HOST": sys.argv[2],
+    "SERVER_PROTOCOL": "HTTP/1.1",
+    "wsgi.version": (1, 0),
+    "wsgi.url_scheme": "https",
+    "wsgi.errors": sys.stderr,
+    "wsgi.multithread": False,
+    "wsgi.multiprocess": True,
+    "wsgi.run_once": False,
+}
+statuses = []
+start_response = lambda status, headers, exc_info=None: statuses.append(status)
+b"".join(application(dict(environ, **{"wsgi.input": io.BytesIO()}), start_response))
+responded = time.perf_counter()
+
+# Then the warm per-request cost, which the middleware stack adds to.
+warm = []
+for _ in range(int(sys.argv[3])):
+    t0 = time.perf_counter()
+    b"".join(application(dict(environ, **{"wsgi.input": io.BytesIO()}), start_response))
+    warm.append(time.perf_counter() - t0)
+warm.sort()
+
+from django.apps import apps
+from django.conf import settings
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "first_response_ms": (responded - imported) * 1000,
+    "total_ms": (responded - started) * 1000,
+    "request_ms": warm[len(warm) // 2] * 1000 if warm else 0.0,
+    "status": int(statuses[0].split()[0]),
+    "apps": len(apps.get_app_configs()),
+    "middleware": len(settings.MIDDLEWARE),
+}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure cold start of stagetworest.wsgi.application per settings profile: "
+        "import time and time to the first response, each in a fresh interpreter."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=10)
+        parser.add_argument(
+            '--profile', action='append', dest='profiles',
+            help="Settings module to measure (repeatable). Defaults to the full and API-only profiles.",
+        )
+        parser.add_argument('--path', default='/api/organisations', help="Path of the requests sent.")
+        parser.add_argument('--warm-requests', type=int, default=200, help="Requests timed after the first one.")
+        parser.add_argument('--json', action='store_true', help="Print results as JSON.")
+
+    def handle(self, *args, **options):
+        profiles = options['profiles'] or ['stagetworest.settings', 'stagetworest.settings_api']
+        results = {profile: self.measure(profile, options) for profile in profiles}
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            for profile, result in results.items():
+                self.stdout.write(
+                    f"{profile:<30} apps {result['apps']:>2}  middleware {result['middleware']:>2}  "
+                    f"import p50 {result['import_ms']['p50']:.1f}ms  "
+                    f"first response p50 {result['first_response_ms']['p50']:.1f}ms  "
+                    f"total p50 {result['total_ms']['p50']:.1f}ms  "
+                    f"warm request p50 {result['request_ms']['p50']:.3f}ms  "
+                    f"status {result['status']}"
+                )
+
+    def measure(self, profile, options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=profile)
+        if not env.get('ALLOWED_HOSTS'):
+            env['ALLOWED_HOSTS'] = 'localhost'
+        host = env['ALLOWED_HOSTS'].split(',')[0].lstrip('.').replace('*', 'localhost')
+        samples = []
+        for _ in range(options['runs']):
+            completed = subprocess.run(
+                [sys.executable, '-c', PROBE, options['path'], host, str(options['warm_requests'])],
+                cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+            )
+            if completed.returncode != 0:
+                raise CommandError(f"{profile} failed to start:\n{completed.stderr}")
+            samples.append(json.loads(completed.stdout.splitlines()[-1]))
+
+        result = {key: samples[-1][key] for key in ('status', 'apps', 'middleware')}
+        for key in ('import_ms', 'first_response_ms', 'total_ms', 'request_ms'):
+            values = sorted(sample[key] for sample in samples)
+            result[key] = {"p50": percentile(values, 50), "p95": percentile(values, 95)}
+        return result
@@ -0,0 +1,73 @@
+import json
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+
+from stagetwo.bench import benchmark_database, format_row, measure
+from stagetwo.memberships import membership_cache, share_organisation
+from stagetwo.models import Membership, Organisation, User
+
+
+class Command(BaseCommand):
+    help = "Compare the co-membership double join with the cached membership index UserDetailView uses."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--organisations', type=int, default=500)
+        parser.add_argument('--memberships-per-user', type=int, default=5)
+        parser.add_argument('--iterations', type=int, default=2000)
+        parser.add_argument('--json', action='store_true', help="Print results as JSON.")
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            members = self.seed(options)
+            # Successful cross-user lookups: both users share an organisation.
+            rng = random.Random(0)
+            groups = [pks for pks in members.values() if len(pks) > 1]
+            pairs = [tuple(rng.sample(rng.choice(groups), 2)) for _ in range(options['iterations'])]
+
+            results = {
+                "double_join": self.run(pairs, lambda a, b: Organisation.objects.filter(users=a).filter(users=b).exists()),
+                "index_cold": self.run(pairs, share_organisation, clear=True),
+                "index_warm": self.run(pairs, share_organisation),
+            }
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            for name, result in results.items():
+                self.stdout.write(format_row(name, result))
+
+    def seed(self, options):
+        password = make_password(None)
+        users = User.objects.bulk_create(
+            User(email=f"bench{i}@example.com", password=password)
+            for i in range(options['users'])
+        )
+        organisations = Organisation.objects.bulk_create(
+            Organisation(name=f"Bench organisation {i}")
+            for i in range(options['organisations'])
+        )
+        rng = random.Random(0)
+        members = {org.pk: [] for org in organisations}
+        for user in users:
+            for org in rng.sample(organisations, options['memberships_per_user']):
+                members[org.pk].append(user.pk)
+        Membership.objects.bulk_create(
+            Membership(user_id=user_pk, organisation_id=org_pk)
+            for org_pk, user_pks in members.items()
+            for user_pk in user_pks
+        )
+        return members
+
+    def run(self, pairs, check, clear=False):
+        membership_cache().clear()
+        it = iter(pairs)
+
+        def step():
+            if clear:
+                membership_cache().clear()
+            check(*next(it))
+
+        return measure(step, len(pairs))
@@ -0,0 +1,207 @@
+import json
+import random
+import time
+from collections import Counter
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from stagetwo.bench import benchmark_database, compare_to_baseline, format_row, summarize
+from stagetwo.memberships import update_member_counts
+from stagetwo.models import Membership, Organisation, User
+from stagetwo.tokens import ClaimsAccessToken, ClaimsRefreshToken
+
+PASSWORD = "password123"
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a data set and drive every API route, reporting throughput, p50/p95/p99 latency "
+        "and SQL queries per request. --output saves the results; --baseline fails on regressions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--organisations', type=int, default=500)
+        parser.add_argument('--memberships-per-user', type=int, default=5)
+        parser.add_argument(
+            '--heavy-user-organisations', type=int, default=500,
+            help="Organisations the user driving the read routes belongs to.",
+        )
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument(
+            '--auth-iterations', type=int, default=20,
+            help="Iterations for the routes that hash passwords (register, login).",
+        )
+        parser.add_argument('--query-samples', type=int, default=3)
+        parser.add_argument('--urls', choices=['sync', 'async'], default='sync')
+        parser.add_argument('--json', action='store_true', help="Print results as JSON.")
+        parser.add_argument('--output', help="Write the JSON results to this file.")
+        parser.add_argument('--baseline', help="JSON results of an earlier run to gate against.")
+        parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed p95 slowdown (0.2 = 20%%).")
+
+    def handle(self, *args, **options):
+        urlconf = 'stagetwo.urls' if options['urls'] == 'sync' else 'stagetwo.async_urls'
+        with benchmark_database(), override_settings(ROOT_URLCONF=urlconf):
+            self.seed(options)
+            results = {
+                name: self.run(route, iterations, options)
+                for name, route, iterations in self.routes(options)
+            }
+
+        report = {
+            "config": {key: options[key] for key in (
+                'users', 'organisations', 'memberships_per_user', 'heavy_user_organisations',
+                'iterations', 'auth_iterations', 'urls',
+            )},
+            "results": results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            for name, result in results.items():
+                statuses = ','.join(sorted(result['statuses']))
+                self.stdout.write(
+                    f"{format_row(name, result)}  queries {result['queries_avg']:.1f} (max {result['queries_max']})"
+                    f"  status {statuses}"
+                )
+
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)['results']
+            regressions = compare_to_baseline(results, baseline, options['tolerance'])
+            if regressions:
+                raise CommandError("Regressions against the baseline:\n" + "\n".join(regressions))
+
+    def seed(self, options):
+        password = make_password(PASSWORD)
+        users = User.objects.bulk_create(
+            User(email=f"bench{i}@example.com", first_name="Bench", last_name=str(i), password=password)
+            for i in range(options['users'])
+        )
+        organisations = Organisation.objects.bulk_create(
+            Organisation(name=f"Bench organisation {i}", description="An organisation used for benchmarking")
+            for i in range(options['organisations'])
+        )
+        rng = random.Random(0)
+        memberships = set()
+        for user in users:
+            for org in rng.sample(organisations, min(options['memberships_per_user'], len(organisations))):
+                memberships.add((org.pk, user.pk))
+        # A heavy user in many organisations, and one organisation everybody belongs to.
+        for org in organisations[:options['heavy_user_organisations']]:
+            memberships.add((org.pk, users[0].pk))
+        for user in users:
+            memberships.add((organisations[0].pk, user.pk))
+        Membership.objects.bulk_create(
+            (Membership(organisation_id=org_pk, user_id=user_pk) for org_pk, user_pk in memberships),
+            batch_size=5000,
+        )
+        update_member_counts([org.pk for org in organisations])
+
+        self.users = users
+        self.organisation = organisations[0]
+        self.heavy = users[0]
+        self.admin = User.objects.create(email="admin@example.com", password=password, is_staff=True)
+
+    def bearer(self, user):
+        return {"HTTP_AUTHORIZATION": f"Bearer {ClaimsAccessToken.for_user(user)}"}
+
+    def routes(self, options):
+        """(name, request factory, iterations); a factory returns (method, path, data, headers)."""
+        heavy = self.bearer(self.heavy)
+        admin = self.bearer(self.admin)
+        other = self.users[1]
+        org_users = reverse('add-user-to-organisation', args=[self.organisation.orgId])
+        user_ids = [str(user.userId) for user in self.users[:100]]
+        counter = iter(range(10 ** 9))
+        iterations, auth_iterations = options['iterations'], options['auth_iterations']
+
+        def registration(i):
+            return {"firstName": "New", "lastName": str(i), "email": f"new{i}@example.com", "password": PASSWORD}
+
+        return [
+            ("register", lambda: (
+                'post', reverse('register'), registration(next(counter)), {}
+            ), auth_iterations),
+            ("register-bulk (10)", lambda: (
+                'post', reverse('register-bulk'), {"users": [registration(next(counter)) for _ in range(10)]}, admin
+            ), auth_iterations),
+            ("login", lambda: (
+                'post', reverse('login'), {"email": self.heavy.email, "password": PASSWORD}, {}
+            ), auth_iterations),
+            ("token-refresh", lambda: (
+                'post', reverse('token-refresh'), {"refreshToken": str(ClaimsRefreshToken.for_user(self.heavy))}, {}
+            ), iterations),
+            ("logout", lambda: (
+                'post', reverse('logout'), {}, self.bearer(self.heavy)
+            ), iterations),
+            ("user-detail self", lambda: (
+                'get', reverse('user-detail', args=[self.heavy.userId]), None, heavy
+            ), iterations),
+            ("user-detail co-member", lambda: (
+                'get', reverse('user-detail', args=[other.userId]), None, heavy
+            ), iterations),
+            ("organisation-list", lambda: (
+                'get', reverse('organisation-list'), None, heavy
+            ), iterations),
+            ("organisation-list ?limit=100", lambda: (
+                'get', reverse('organisation-list') + "?limit=100", None, heavy
+            ), iterations),
+            ("organisation-detail", lambda: (
+                'get', reverse('organisation-detail', args=[self.organisation.orgId]), None, heavy
+            ), iterations),
+            ("organisation-create", lambda: (
+                'post', reverse('organisation-create'), {"name": f"Created {next(counter)}"}, heavy
+            ), iterations),
+            ("organisation-members ?limit=100", lambda: (
+                'get', org_users + "?limit=100", None, heavy
+            ), iterations),
+            ("add-user-to-organisation", lambda: (
+                'post', org_users, {"userId": str(self.users[next(counter) % len(self.users)].userId)}, heavy
+            ), iterations),
+            ("add-users-to-organisation (100)", lambda: (
+                'post', reverse('add-users-to-organisation', args=[self.organisation.orgId]),
+                {"userIds": user_ids}, heavy
+            ), iterations),
+        ]
+
+    def send(self, client, route, statuses):
+        method, path, data, headers = route()
+        if method == 'get':
+            response = client.get(path, **headers)
+        else:
+            response = client.post(path, data, content_type='application/json', **headers)
+        statuses[str(response.status_code)] += 1
+
+    def run(self, route, iterations, options):
+        client = Client()
+        statuses = Counter()
+        # Query counts are taken on separate requests so capturing them does
+        # not skew the timings; the first request also warms the caches.
+        counts = []
+        for _ in range(max(1, options['query_samples'])):
+            with CaptureQueriesContext(connection) as queries:
+                self.send(client, route, statuses)
+            counts.append(len(queries))
+
+        samples = []
+        started = time.perf_counter()
+        for _ in range(iterations):
+            t0 = time.perf_counter()
+            self.send(client, route, statuses)
+            samples.append(time.perf_counter() - t0)
+        result = summarize(samples, time.perf_counter() - started)
+        result.update({
+            "queries_avg": sum(counts) / len(counts),
+            "queries_max": max(counts),
+            "statuses": dict(statuses),
+        })
+        return result
@@ -0,0 +1,52 @@
+import importlib.util
+import json
+
+from django.core.management.base import BaseCommand
+
+from stagetwo.bench import format_row, measure
+from stagetwo.hashers import Argon2PasswordHasher, PBKDF2PasswordHasher, ScryptPasswordHasher
+
+
+def int_list(value):
+    return [int(item) for item in value.split(',') if item]
+
+
+class Command(BaseCommand):
+    help = "Report password verifications (logins) per second for each hasher and cost setting."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--pbkdf2-iterations', type=int_list, default=[600000, 260000])
+        parser.add_argument('--scrypt-work-factors', type=int_list, default=[2 ** 14, 2 ** 15])
+        parser.add_argument('--argon2-memory-costs', type=int_list, default=[65536, 102400])
+        parser.add_argument('--json', action='store_true', help="Print results as JSON.")
+
+    def handle(self, *args, **options):
+        candidates = []
+        for iterations in options['pbkdf2_iterations']:
+            candidates.append((f"pbkdf2_sha256 iterations={iterations}", PBKDF2PasswordHasher, {'iterations': iterations}))
+        for work_factor in options['scrypt_work_factors']:
+            candidates.append((f"scrypt work_factor={work_factor}", ScryptPasswordHasher, {'work_factor': work_factor}))
+        if importlib.util.find_spec('argon2') is not None:
+            for memory_cost in options['argon2_memory_costs']:
+                candidates.append((f"argon2 memory_cost={memory_cost}", Argon2PasswordHasher, {'memory_cost': memory_cost}))
+        else:
+            self.stderr.write("argon2-cffi is not installed; skipping argon2.")
+
+        results = {}
+        for name, hasher_class, costs in candidates:
+            hasher = hasher_class()
+            for attr, value in costs.items():
+                setattr(hasher, attr, value)
+            encoded = hasher.encode("correct horse battery staple", hasher.salt())
+            results[name] = measure(
+                lambda: hasher.verify("correct horse battery staple", encoded),
+                options['iterations'],
+                warmup=1,
+            )
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            for name, result in results.items():
+                self.stdout.write(format_row(name, result))
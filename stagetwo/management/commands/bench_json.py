@@ -0,0 +1,59 @@
+import json
+from io import BytesIO
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from stagetwo.bench import benchmark_database, format_row, measure
+from stagetwo.models import Organisation
+from stagetwo.renderers import FastJSONParser, FastJSONRenderer, orjson
+from stagetwo.serializers import OrganisationSerializer
+
+
+class Command(BaseCommand):
+    help = "Compare DRF's JSON renderer/parser with the orjson-backed ones on OrganisationListView payloads."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--organisations', type=int, default=1000)
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--json', action='store_true', help="Print results as JSON.")
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stderr.write("orjson is not installed; FastJSONRenderer falls back to the stdlib.")
+
+        with benchmark_database():
+            Organisation.objects.bulk_create(
+                Organisation(name=f"Bench organisation {i}", description="An organisation used for benchmarking")
+                for i in range(options['organisations'])
+            )
+            payload = {
+                "status": "success",
+                "message": "Organisations retrieved successfully",
+                "data": {
+                    "organisations": OrganisationSerializer(Organisation.objects.all(), many=True).data
+                }
+            }
+
+        body = JSONRenderer().render(payload)
+        if FastJSONRenderer().render(payload) != body:
+            raise CommandError("FastJSONRenderer output differs from JSONRenderer.")
+
+        iterations = options['iterations']
+        results = {
+            "render JSONRenderer": measure(lambda: JSONRenderer().render(payload), iterations, warmup=5),
+            "render FastJSONRenderer": measure(lambda: FastJSONRenderer().render(payload), iterations, warmup=5),
+            "parse JSONParser": measure(lambda: self.parse(JSONParser(), body), iterations, warmup=5),
+            "parse FastJSONParser": measure(lambda: self.parse(FastJSONParser(), body), iterations, warmup=5),
+        }
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            self.stdout.write(f"payload: {len(body)} bytes, {options['organisations']} organisations")
+            for name, result in results.items():
+                self.stdout.write(format_row(name, result))
+
+    def parse(self, parser, body):
+        return parser.parse(BytesIO(body), parser_context={'encoding': 'utf-8'})
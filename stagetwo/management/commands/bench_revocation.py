@@ -0,0 +1,74 @@
+import json
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+
+from stagetwo.authentication import ClaimsJWTAuthentication
+from stagetwo.bench import benchmark_database, format_row, measure
+from stagetwo.models import RevokedToken, User
+from stagetwo.revocation import revocations
+from stagetwo.tokens import ClaimsAccessToken
+
+
+class UncheckedAuthentication(ClaimsJWTAuthentication):
+    def get_validated_token(self, raw_token):
+        return JWTStatelessUserAuthentication.get_validated_token(self, raw_token)
+
+
+class QueryAuthentication(ClaimsJWTAuthentication):
+    # What a table lookup on every request (the stock blacklist) costs.
+    def get_validated_token(self, raw_token):
+        token = JWTStatelessUserAuthentication.get_validated_token(self, raw_token)
+        RevokedToken.objects.filter(jti=token['jti']).exists()
+        return token
+
+
+class Command(BaseCommand):
+    help = "Measure the per-request cost of the token revocation check in ClaimsJWTAuthentication."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--revoked', type=int, default=10000)
+        parser.add_argument('--iterations', type=int, default=5000)
+        parser.add_argument('--json', action='store_true', help="Print results as JSON.")
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            user = User.objects.create(email="bench@example.com", password=make_password(None))
+            expires_at = timezone.now() + timedelta(days=1)
+            RevokedToken.objects.bulk_create(
+                RevokedToken(jti=f"bench-{i}", expires_at=expires_at) for i in range(options['revoked'])
+            )
+            revocations.reset()
+            revocations.sync()
+            request = Request(RequestFactory().get(
+                '/', HTTP_AUTHORIZATION=f"Bearer {ClaimsAccessToken.for_user(user)}"
+            ))
+
+            iterations = options['iterations']
+            results = {
+                "authenticate, no check": measure(
+                    lambda: UncheckedAuthentication().authenticate(request), iterations, warmup=50
+                ),
+                "authenticate, bloom filter": measure(
+                    lambda: ClaimsJWTAuthentication().authenticate(request), iterations, warmup=50
+                ),
+                "authenticate, table lookup": measure(
+                    lambda: QueryAuthentication().authenticate(request), iterations, warmup=50
+                ),
+                "is_revoked miss": measure(lambda: revocations.is_revoked("not-revoked"), iterations),
+                "is_revoked hit": measure(lambda: revocations.is_revoked("bench-0"), iterations),
+            }
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            self.stdout.write(
+                f"{options['revoked']} revoked tokens, filter of {revocations.filter.size // 8} bytes"
+            )
+            for name, result in results.items():
+                self.stdout.write(format_row(name, result))
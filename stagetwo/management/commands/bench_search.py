@@ -0,0 +1,102 @@
+import json
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+
+from stagetwo.bench import benchmark_database, format_row, measure
+from stagetwo.models import Membership, Organisation, User
+from stagetwo.projections import ORGANISATION
+from stagetwo.search import search_organisations
+from stagetwo.views import OrganisationSearchView
+
+SYLLABLES = ["ac", "me", "lo", "ra", "ti", "ven", "dor", "quo", "zen", "bri", "sol", "nex", "tar", "via", "kin"]
+SUFFIXES = ["Labs", "Group", "Holdings", "Partners", "Foundation", "Systems", "Works", "Collective"]
+
+
+def word(rng):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure organisation search latency over a large organisations table (1M rows by default) "
+        "for a user belonging to --memberships of them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--organisations', type=int, default=1_000_000)
+        parser.add_argument('--memberships', type=int, default=5000)
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--explain', action='store_true', help="Print the query plan of each search.")
+        parser.add_argument('--json', action='store_true', help="Print results as JSON.")
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            user = self.seed(options)
+            queries = {
+                "prefix": "Acme",
+                "word prefix": "Solv",
+                "infix": "orquo",
+                "description": "riverside",
+                "no match": "xyzzy",
+            }
+            results = {}
+            for name, query in queries.items():
+                results[f"search {name} ({query})"] = self.run(user, query, options)
+                if options['explain']:
+                    self.stdout.write(self.explain(user, query, options['limit']))
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            self.stdout.write(
+                f"{options['organisations']} organisations on {connection.vendor}, "
+                f"user in {options['memberships']}"
+            )
+            for name, result in results.items():
+                self.stdout.write(f"{format_row(name, result)}  matches on page {result['matches']}")
+
+    def seed(self, options):
+        rng = random.Random(0)
+        user = User.objects.create(email="bench@example.com", password=make_password(None))
+        count = options['organisations']
+        member_of = set(rng.sample(range(count), min(options['memberships'], count)))
+        batch = 10000
+        for start in range(0, count, batch):
+            organisations = Organisation.objects.bulk_create(
+                Organisation(
+                    name=f"{word(rng)} {word(rng)} {rng.choice(SUFFIXES)}",
+                    description=" ".join(word(rng).lower() for _ in range(6))
+                    + (" by the riverside" if rng.random() < 0.01 else ""),
+                )
+                for _ in range(start, min(start + batch, count))
+            )
+            Membership.objects.bulk_create(
+                Membership(organisation_id=org.pk, user_id=user.pk)
+                for i, org in enumerate(organisations, start) if i in member_of
+            )
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE stagetwo_organisation")
+                cursor.execute(f"ANALYZE {Membership._meta.db_table}")
+        return user
+
+    def page(self, user, query, limit):
+        request = RequestFactory().get('/', {'q': query, 'limit': limit})
+        page, _ = OrganisationSearchView.paginator.paginate(
+            search_organisations(user.pk, query).values_list('rank', 'id', *ORGANISATION.columns), request
+        )
+        return page
+
+    def run(self, user, query, options):
+        result = measure(lambda: self.page(user, query, options['limit']), options['iterations'], warmup=5)
+        result["matches"] = len(self.page(user, query, options['limit']))
+        return result
+
+    def explain(self, user, query, limit):
+        queryset = search_organisations(user.pk, query).order_by('rank', 'id')[:limit]
+        return f"-- {query}\n{queryset.explain()}"
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from stagetwo.models import User
+from stagetwo.profiling import profiling_header, profiling_token
+
+
+class Command(BaseCommand):
+    help = (
+        "Print a signed, single-use X-Profile header value that profiles one request to --path, or with "
+        "--email an access token for that staff user whose requests are profiled when sent with X-Profile: claim."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', help="Staff user to mint a profiling access token for.")
+        parser.add_argument('--path', help="Path of the request the header is for, e.g. /api/organisations.")
+        parser.add_argument('--method', default='GET', help="Method of the request the header is for.")
+
+    def handle(self, *args, **options):
+        if not options['email']:
+            if not options['path']:
+                raise CommandError("Give --path for a header, or --email for a token")
+            self.stdout.write(profiling_header(options['method'], options['path']))
+            return
+        user = User.objects.by_email(options['email']).first()
+        if user is None or not user.is_staff:
+            raise CommandError(f"No staff user with email {options['email']}")
+        self.stdout.write(str(profiling_token(user)))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from stagetwo.revocation import prune_expired
+
+
+class Command(BaseCommand):
+    help = "Delete revoked tokens that have expired. Run periodically, e.g. hourly from cron."
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Pruned {prune_expired()} expired revoked tokens")
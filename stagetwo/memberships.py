@@ -0,0 +1,198 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections, router
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Membership, Organisation, User
+
+
+def membership_cache():
+    return caches[getattr(settings, 'MEMBERSHIP_CACHE', 'default')]
+
+
+def _membership_key(user_id, membership_version):
+    return f"stagetwo:memberships:{user_id}:{membership_version}"
+
+
+def _membership_versions(user_pks):
+    return User.objects.filter(pk__in=user_pks).values_list('pk', 'userId', 'membership_version')
+
+
+def _memberships_of(user_pks):
+    return Membership.objects.filter(user_id__in=user_pks).values_list('user_id', 'organisation_id')
+
+
+def _index(versions, cached, rows):
+    """
+    Organisation id sets by user from the ``cached`` entries and the loaded
+    ``rows``, and the loaded entries to store.
+    """
+    ids = {pk: cached[key] for pk, key in versions.items() if key in cached}
+    loaded = {pk: set() for pk in versions if pk not in ids}
+    for user_pk, org_pk in rows:
+        loaded[user_pk].add(org_pk)
+    ids.update(loaded)
+    return ids, {versions[pk]: frozenset(org_pks) for pk, org_pks in loaded.items()}
+
+
+def organisation_ids_for(*user_pks):
+    """
+    The organisation primary keys of each of ``user_pks``, from the
+    co-membership index: entries in ``membership_cache()`` keyed by the
+    user's ``userId`` and ``membership_version``. Reading the versions is one primary key
+    lookup; a user whose entry is missing costs one more query for all of
+    them. Any membership change bumps the version (``bump_membership_versions``),
+    so an entry is never used once it is stale, in any worker.
+    """
+    versions = {pk: _membership_key(user_id, version) for pk, user_id, version in _membership_versions(user_pks)}
+    cache = membership_cache()
+    cached = cache.get_many(list(versions.values()))
+    missing = [pk for pk, key in versions.items() if key not in cached]
+    ids, entries = _index(versions, cached, _memberships_of(missing) if missing else [])
+    if entries:
+        cache.set_many(entries, getattr(settings, 'MEMBERSHIP_CACHE_TIMEOUT', 300))
+    return ids
+
+
+async def aorganisation_ids_for(*user_pks):
+    versions = {
+        pk: _membership_key(user_id, version) async for pk, user_id, version in _membership_versions(user_pks)
+    }
+    cache = membership_cache()
+    cached = await cache.aget_many(list(versions.values()))
+    missing = [pk for pk, key in versions.items() if key not in cached]
+    ids, entries = _index(versions, cached, [row async for row in _memberships_of(missing)] if missing else [])
+    if entries:
+        await cache.aset_many(entries, getattr(settings, 'MEMBERSHIP_CACHE_TIMEOUT', 300))
+    return ids
+
+
+def share_organisation(user_pk, other_pk):
+    """
+    Answer "do these two users share an organisation?" from the
+    co-membership index instead of joining the memberships twice.
+    """
+    ids = organisation_ids_for(user_pk, other_pk)
+    return bool(ids.get(user_pk, set()) & ids.get(other_pk, set()))
+
+
+async def ashare_organisation(user_pk, other_pk):
+    ids = await aorganisation_ids_for(user_pk, other_pk)
+    return bool(ids.get(user_pk, set()) & ids.get(other_pk, set()))
+
+
+def is_member(user_pk, org_pk):
+    """Whether ``user_pk`` belongs to the organisation ``org_pk``: one unique index probe."""
+    return Membership.objects.filter(organisation_id=org_pk, user_id=user_pk).exists()
+
+
+async def ais_member(user_pk, org_pk):
+    return await Membership.objects.filter(organisation_id=org_pk, user_id=user_pk).aexists()
+
+
+def organisation_members(org_id, user_pk):
+    """
+    Memberships of the organisation ``org_id``, or none unless ``user_pk``
+    is one of its members: a single query, walking the (organisation, user)
+    index in user order.
+    """
+    return Membership.objects.filter(organisation__orgId=org_id, organisation__membership__user=user_pk)
+
+
+def _insert_memberships(organisation_pk, user_pks):
+    """
+    Insert memberships with ``ON CONFLICT DO NOTHING RETURNING`` (PostgreSQL
+    and SQLite 3.35+) and return the user primary keys actually inserted.
+    ``bulk_create(ignore_conflicts=True)`` cannot tell which rows a
+    concurrent request inserted first.
+    """
+    connection = connections[router.db_for_write(Membership)]
+    quote = connection.ops.quote_name
+    opts = Membership._meta
+    columns = ", ".join(quote(opts.get_field(name).column) for name in ('organisation', 'user', 'role', 'joined_at'))
+    joined_at = connection.ops.adapt_datetimefield_value(timezone.now())
+    inserted = []
+    with connection.cursor() as cursor:
+        for start in range(0, len(user_pks), 1000):
+            batch = user_pks[start:start + 1000]
+            params = []
+            for pk in batch:
+                params += [organisation_pk, pk, Membership.Role.MEMBER, joined_at]
+            cursor.execute(
+                f"INSERT INTO {quote(opts.db_table)} ({columns}) "
+                f"VALUES {', '.join(['(%s, %s, %s, %s)'] * len(batch))} "
+                f"ON CONFLICT ({quote(opts.get_field('organisation').column)}, "
+                f"{quote(opts.get_field('user').column)}) DO NOTHING "
+                f"RETURNING {quote(opts.get_field('user').column)}",
+                params,
+            )
+            inserted += [row[0] for row in cursor.fetchall()]
+    return inserted
+
+
+def add_members(organisation, user_pks):
+    """
+    Add ``user_pks`` to ``organisation`` with a single INSERT and return the
+    primary keys that were not members yet, in ``user_pks`` order. The
+    INSERT sends no ``m2m_changed``, so versions and member counts are
+    updated here.
+    """
+    inserted = set(_insert_memberships(organisation.pk, user_pks)) if user_pks else set()
+    added = [pk for pk in user_pks if pk in inserted]
+    if added:
+        bump_membership_versions(added)
+        # Exact: rows a concurrent request inserted first are not returned.
+        update_member_counts([organisation.pk], delta=len(added))
+    return added
+
+
+def update_member_counts(org_pks, delta=None):
+    """
+    Keep ``Organisation.member_count`` in step with memberships, adding
+    ``delta`` when the change is known exactly and recounting otherwise.
+    The organisations' versions and their members' organisation-list
+    versions are bumped too, since their responses include the count.
+    """
+    if not org_pks:
+        return
+    if delta is None:
+        count = Coalesce(Subquery(
+            Membership.objects.filter(organisation=OuterRef('pk'))
+            .order_by().values('organisation').annotate(count=Count('*')).values('count')
+        ), 0)
+    else:
+        count = F('member_count') + delta
+    Organisation.objects.filter(pk__in=org_pks).update(member_count=count, version=F('version') + 1)
+    bump_organisations_versions(org_pks)
+
+
+def organisation_list_versions(user_pk):
+    """
+    ``(userId, membership_version, organisations_version)`` of a user: one
+    primary key lookup. Together the two counters version the user's
+    organisation list.
+    """
+    return User.objects.filter(pk=user_pk).values_list('userId', 'membership_version', 'organisations_version')
+
+
+def bump_membership_versions(user_pks):
+    """
+    Invalidate the organisation-list ETags of ``user_pks``. Call this
+    whenever their memberships change.
+    """
+    if user_pks:
+        User.objects.filter(pk__in=user_pks).update(membership_version=F('membership_version') + 1)
+
+
+def bump_organisations_versions(org_pks):
+    """
+    Invalidate the organisation-list ETags of every member of ``org_pks``,
+    whose lists embed those organisations: a single UPDATE, so list reads
+    stay a primary key lookup however many organisations a user has.
+    """
+    if org_pks:
+        User.objects.filter(
+            pk__in=Membership.objects.filter(organisation_id__in=org_pks).values('user_id')
+        ).update(organisations_version=F('organisations_version') + 1)
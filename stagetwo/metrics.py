@@ -0,0 +1,443 @@
+"""
+Counters and histograms exposed in the Prometheus text format.
+
+Metrics are recorded in memory per process. With ``METRICS['directory']``
+set (one directory shared by the workers of a host), each process also
+writes a snapshot of its values to ``<directory>/<pid>.json``, at most every
+``METRICS['flush_interval']`` seconds and on exit; a scrape adds up the
+snapshots of all processes, so any worker can answer it. Without a
+directory a scrape only sees the process that serves it.
+
+When a worker exits its snapshot is merged into ``archive.json`` and then
+removed, as in prometheus_client's multiprocess mode: counters and
+histograms keep the totals of dead workers, so they never go down when a
+worker is recycled, and a later process reusing the pid starts its own
+snapshot. Every metric here is a counter or a histogram; a gauge would
+have to be dropped rather than archived. Workers that are killed never
+reach their exit handler, so the process manager should archive them too;
+with gunicorn (``gunicorn.conf.py``)::
+
+    from stagetwo import metrics
+
+    def on_starting(server):
+        metrics.clear_directory()
+
+    def child_exit(server, worker):
+        metrics.remove_process(worker.pid)
+"""
+import atexit
+import hmac
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: no locking, archiving is best effort
+    fcntl = None
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import Http404, HttpResponse
+
+from .db import connection_stats
+from .timing import collect_timings
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ARCHIVE = 'archive.json'
+# Snapshot ids remembered in the archive, so none is merged twice.
+ARCHIVED_IDS = 1024
+
+
+def metrics_settings():
+    return settings.METRICS
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.registry = registry
+        registry.register(self)
+
+    def key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def labels_text(self, values, extra=()):
+        pairs = list(zip(self.labelnames, values)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        self.registry.update(self, self.key(labels), lambda value: (value or 0) + amount)
+
+    def set(self, value, **labels):
+        # For totals counted elsewhere, copied in by a registry collector.
+        self.registry.update(self, self.key(labels), lambda _: value)
+
+    def samples(self, values):
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{self.labels_text(key)} {_format_value(value)}"
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(registry, name, documentation, labelnames)
+
+    def observe(self, value, **labels):
+        def add(current):
+            # [per-bucket counts (the last one is +Inf), sum, count]
+            counts, total, count = current or ([0] * (len(self.buckets) + 1), 0.0, 0)
+            counts = list(counts)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            return [counts, total + value, count + 1]
+
+        self.registry.update(self, self.key(labels), add)
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self, values):
+        for key, (counts, total, count) in sorted(values.items()):
+            cumulative = 0
+            for bound, bucket in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket
+                le = (('le', _format_value(float(bound))),)
+                yield f"{self.name}_bucket{self.labels_text(key, le)} {cumulative}"
+            yield f"{self.name}_sum{self.labels_text(key)} {_format_value(total)}"
+            yield f"{self.name}_count{self.labels_text(key)} {count}"
+
+
+class Registry:
+    def __init__(self, process=None, timer=time.monotonic):
+        # Names this process's snapshot file; the pid unless given.
+        self.process = process
+        self.metrics = {}
+        self.values = {}
+        self.collectors = []
+        self.timer = timer
+        self.flushed_at = timer()
+        self._id = None
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        self.values[metric.name] = {}
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return Counter(self, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return Histogram(self, name, documentation, labelnames, buckets)
+
+    def collector(self, collect):
+        """Register ``collect()`` to refresh values kept outside the registry."""
+        self.collectors.append(collect)
+        return collect
+
+    def run_collectors(self):
+        for collect in self.collectors:
+            collect()
+
+    def update(self, metric, key, change):
+        with self._lock:
+            values = self.values[metric.name]
+            values[key] = change(values.get(key))
+
+    def reset(self):
+        with self._lock:
+            for values in self.values.values():
+                values.clear()
+
+    def snapshot(self):
+        self.run_collectors()
+        with self._lock:
+            return {
+                name: [[list(key), value] for key, value in values.items()]
+                for name, values in self.values.items()
+            }
+
+    def directory(self):
+        return metrics_settings().get('directory')
+
+    def snapshot_id(self):
+        # New in every process, including workers forked from a preloaded master.
+        pid = os.getpid()
+        if self._id is None or self._id[0] != pid:
+            self._id = (pid, uuid.uuid4().hex)
+        return self._id[1]
+
+    def flush(self):
+        directory = self.directory()
+        self.flushed_at = self.timer()
+        if not directory:
+            return
+        os.makedirs(directory, exist_ok=True)
+        _write(
+            os.path.join(directory, f"{self.process or os.getpid()}.json"),
+            {'id': self.snapshot_id(), 'values': self.snapshot()},
+        )
+
+    def remove(self):
+        if self.directory():
+            self.flush()
+        remove_process(self.process or os.getpid())
+
+    def maybe_flush(self):
+        if self.timer() - self.flushed_at >= metrics_settings().get('flush_interval', 1):
+            self.flush()
+
+    def collect(self):
+        """Values of every metric, added up across the processes of the host, live and exited."""
+        directory = self.directory()
+        if not directory:
+            self.run_collectors()
+            with self._lock:
+                return {name: dict(values) for name, values in self.values.items()}
+        self.flush()
+        # Snapshots before the archive: a snapshot is archived before its
+        # file is removed, so each one is counted exactly once.
+        snapshots = [
+            _read(os.path.join(directory, entry)) for entry in os.listdir(directory)
+            if entry.endswith('.json') and entry != ARCHIVE
+        ]
+        archive = _read(os.path.join(directory, ARCHIVE)) or {'ids': [], 'values': {}}
+        archived = set(archive['ids'])
+        merged = {}
+        _add_values(merged, archive['values'])
+        for snapshot in snapshots:
+            if snapshot and snapshot['id'] not in archived:
+                _add_values(merged, snapshot['values'])
+        return {name: merged.get(name, {}) for name in self.metrics}
+
+    def exposition(self):
+        values = self.collect()
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.samples(values.get(name, {})))
+        return "\n".join(lines) + "\n"
+
+
+def _merge(value, other):
+    # Counters are numbers, histograms [bucket counts, sum, count].
+    if isinstance(value, list):
+        return [_merge(a, b) for a, b in zip(value, other)]
+    return value + other
+
+
+def _add_values(merged, values):
+    for name, pairs in values.items():
+        target = merged.setdefault(name, {})
+        for key, value in pairs:
+            key = tuple(key)
+            current = target.get(key)
+            target[key] = value if current is None else _merge(current, value)
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write(path, data):
+    # Written aside and renamed, so a scrape never reads half a file.
+    partial = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(partial, 'w') as f:
+        json.dump(data, f)
+    os.replace(partial, path)
+
+
+@contextmanager
+def _archive_lock(directory):
+    with open(os.path.join(directory, 'archive.lock'), 'a') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        yield
+
+
+def remove_process(process, directory=None):
+    """Merge the snapshot of a process that has exited into the archive and remove it."""
+    directory = directory or metrics_settings().get('directory')
+    if not directory or not os.path.isdir(directory):
+        return
+    path = os.path.join(directory, f"{process}.json")
+    with _archive_lock(directory):
+        snapshot = _read(path)
+        if snapshot is None:
+            return
+        archive_path = os.path.join(directory, ARCHIVE)
+        archive = _read(archive_path) or {'ids': [], 'values': {}}
+        if snapshot['id'] not in archive['ids']:
+            merged = {}
+            _add_values(merged, archive['values'])
+            _add_values(merged, snapshot['values'])
+            _write(archive_path, {
+                'ids': (archive['ids'] + [snapshot['id']])[-ARCHIVED_IDS:],
+                'values': {
+                    name: [[list(key), value] for key, value in values.items()]
+                    for name, values in merged.items()
+                },
+            })
+        os.remove(path)
+
+
+def clear_directory(directory=None):
+    """Drop every snapshot and the archive; call once before starting the workers."""
+    directory = directory or metrics_settings().get('directory')
+    if not directory or not os.path.isdir(directory):
+        return
+    for entry in os.listdir(directory):
+        if entry.endswith(('.json', '.tmp', '.lock')):
+            try:
+                os.remove(os.path.join(directory, entry))
+            except FileNotFoundError:
+                pass
+
+
+registry = Registry()
+atexit.register(registry.remove)
+
+REQUEST_SECONDS = registry.histogram(
+    'stagetwo_request_duration_seconds', "Time to respond to a request, per route.",
+    ('view', 'method', 'status'),
+)
+REQUEST_QUERIES = registry.histogram(
+    'stagetwo_request_queries', "SQL queries run per request, per route.",
+    ('view', 'method'), buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+REQUEST_SQL_SECONDS = registry.counter(
+    'stagetwo_request_sql_seconds_total', "Time spent in SQL queries, per route.", ('view',),
+)
+PASSWORD_HASH_SECONDS = registry.histogram(
+    'stagetwo_password_hash_seconds', "Time to hash or verify a password.", ('algorithm', 'operation'),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+TOKENS_ISSUED = registry.counter(
+    'stagetwo_tokens_issued_total', "JWTs issued, per token type.", ('type',),
+)
+TOKEN_ISSUE_SECONDS = registry.histogram(
+    'stagetwo_token_issue_seconds', "Time to mint and sign the tokens of one response.",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025),
+)
+DB_POOL_CONNECTIONS = registry.counter(
+    'stagetwo_db_pool_connections_total',
+    "In-process pool connections reused (hit), opened (miss) or discarded, per alias.", ('alias', 'result'),
+)
+DB_CONNECTS = registry.counter(
+    'stagetwo_db_connects_total', "Database connections opened, per alias.", ('alias',),
+)
+DB_CONNECT_SECONDS = registry.counter(
+    'stagetwo_db_connect_seconds_total', "Time spent opening database connections, per alias.", ('alias',),
+)
+AUTH_FAILURES = registry.counter(
+    'stagetwo_auth_failures_total', "Rejected logins, access tokens and refresh tokens.", ('reason',),
+)
+CACHE_REQUESTS = registry.counter(
+    'stagetwo_cache_requests_total', "Cache lookups, per cache and hit or miss.", ('cache', 'result'),
+)
+
+
+@registry.collector
+def collect_connection_stats():
+    for alias, stats in connection_stats().items():
+        for result, key in (('hit', 'hits'), ('miss', 'misses'), ('discarded', 'discarded')):
+            DB_POOL_CONNECTIONS.set(stats[key], alias=alias, result=result)
+        DB_CONNECTS.set(stats['connects'], alias=alias)
+        DB_CONNECT_SECONDS.set(stats['connect_seconds'], alias=alias)
+
+
+def route_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.url_name or match.view_name if match else 'unmatched'
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not metrics_settings().get('enabled'):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        with collect_timings() as timings:
+            response = self.get_response(request)
+        return self.finish(request, response, timings, started)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        with collect_timings() as timings:
+            response = await self.get_response(request)
+        return self.finish(request, response, timings, started)
+
+    def finish(self, request, response, timings, started):
+        view = route_name(request)
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - started, view=view, method=request.method, status=response.status_code
+        )
+        REQUEST_QUERIES.observe(timings.queries, view=view, method=request.method)
+        REQUEST_SQL_SECONDS.inc(timings.sql, view=view)
+        registry.maybe_flush()
+        return response
+
+
+def metrics_view(request):
+    """
+    The metrics of every worker in the Prometheus text format, for scrapers
+    that send ``Authorization: Bearer <METRICS['token']>``. Without a token
+    configured the route does not exist.
+    """
+    token = metrics_settings().get('token')
+    if not token:
+        raise Http404()
+    supplied = request.META.get('HTTP_AUTHORIZATION', '').removeprefix('Bearer ')
+    if not hmac.compare_digest(supplied.encode(), token.encode()):
+        return HttpResponse(status=401, headers={'WWW-Authenticate': 'Bearer'})
+    return HttpResponse(registry.exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
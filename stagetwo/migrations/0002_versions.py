@@ -0,0 +1,27 @@
+# Generated by Django 4.2.4 on 2026-10-16 22:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("stagetwo", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="organisation",
+            name="version",
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="membership_version",
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="version",
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.4 on 2026-10-16 22:46
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("stagetwo", "0002_versions"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="user",
+            constraint=models.UniqueConstraint(
+                django.db.models.functions.text.Lower("email"),
+                name="stagetwo_user_email_ci_unique",
+            ),
+        ),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations
+
+# Trigram indexes over the expressions Django's icontains lookups compile to
+# on PostgreSQL (UPPER(col::text) LIKE UPPER(%s)), so organisation search
+# does not scan the table. Other databases have no trigram indexes and scan.
+INDEXES = {
+    "stagetwo_organisation_name_trgm": "name",
+    "stagetwo_organisation_description_trgm": "description",
+}
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, column in INDEXES.items():
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{name}" ON "stagetwo_organisation" '
+            f'USING gin ((UPPER("{column}"::text)) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name in INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ("stagetwo", "0004_revokedtoken"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
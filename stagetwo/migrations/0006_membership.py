@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    # Membership takes over the table of the implicit through model as is:
+    # only the migration state changes, nothing is run on the database.
+    dependencies = [
+        ("stagetwo", "0005_organisation_search_indexes"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name="Membership",
+                    fields=[
+                        (
+                            "id",
+                            models.BigAutoField(
+                                auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                            ),
+                        ),
+                        (
+                            "organisation",
+                            models.ForeignKey(
+                                on_delete=django.db.models.deletion.CASCADE, to="stagetwo.organisation"
+                            ),
+                        ),
+                        (
+                            "user",
+                            models.ForeignKey(
+                                on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL
+                            ),
+                        ),
+                    ],
+                    options={
+                        "db_table": "stagetwo_organisation_users",
+                        "unique_together": {("organisation", "user")},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name="organisation",
+                    name="users",
+                    field=models.ManyToManyField(
+                        related_name="organisations", through="stagetwo.Membership", to=settings.AUTH_USER_MODEL
+                    ),
+                ),
+            ],
+            database_operations=[],
+        ),
+    ]
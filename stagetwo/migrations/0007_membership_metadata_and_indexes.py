@@ -0,0 +1,119 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+USER_ORG_INDEX = models.Index(fields=["user", "organisation"], name="stagetwo_membership_user_org")
+
+
+def add_user_org_index(apps, schema_editor):
+    model = apps.get_model("stagetwo", "Membership")
+    if schema_editor.connection.vendor == "postgresql":
+        # Without blocking writes to the table while the index builds.
+        schema_editor.add_index(model, USER_ORG_INDEX, concurrently=True)
+    else:
+        schema_editor.add_index(model, USER_ORG_INDEX)
+
+
+def remove_user_org_index(apps, schema_editor):
+    model = apps.get_model("stagetwo", "Membership")
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.remove_index(model, USER_ORG_INDEX, concurrently=True)
+    else:
+        schema_editor.remove_index(model, USER_ORG_INDEX)
+
+
+FK_COLUMNS = ("organisation_id", "user_id")
+
+
+def _single_column_indexes(schema_editor, table):
+    with schema_editor.connection.cursor() as cursor:
+        constraints = schema_editor.connection.introspection.get_constraints(cursor, table)
+    return [
+        (name, info["columns"][0]) for name, info in constraints.items()
+        if info["index"] and not info["unique"] and not info["primary_key"]
+        and len(info["columns"]) == 1 and info["columns"][0] in FK_COLUMNS
+    ]
+
+
+def drop_fk_indexes(apps, schema_editor):
+    # Only the indexes: the foreign key constraints are left alone.
+    model = apps.get_model("stagetwo", "Membership")
+    concurrently = "CONCURRENTLY " if schema_editor.connection.vendor == "postgresql" else ""
+    for name, _ in _single_column_indexes(schema_editor, model._meta.db_table):
+        schema_editor.execute(f"DROP INDEX {concurrently}IF EXISTS {schema_editor.quote_name(name)}")
+
+
+def create_fk_indexes(apps, schema_editor):
+    model = apps.get_model("stagetwo", "Membership")
+    table = model._meta.db_table
+    concurrently = "CONCURRENTLY " if schema_editor.connection.vendor == "postgresql" else ""
+    existing = {column for _, column in _single_column_indexes(schema_editor, table)}
+    for column in FK_COLUMNS:
+        if column not in existing:
+            name = schema_editor._create_index_name(table, [column])
+            schema_editor.execute(
+                f"CREATE INDEX {concurrently}{schema_editor.quote_name(name)} "
+                f"ON {schema_editor.quote_name(table)} ({schema_editor.quote_name(column)})"
+            )
+
+
+class Migration(migrations.Migration):
+    # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction. The new
+    # columns have constant defaults (existing memberships get the time of
+    # the migration as joined_at), which PostgreSQL adds without a rewrite.
+    # The single-column indexes are dropped only once the composite index
+    # that replaces them exists.
+    atomic = False
+
+    dependencies = [
+        ("stagetwo", "0006_membership"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="membership",
+            name="role",
+            field=models.CharField(
+                choices=[("owner", "Owner"), ("member", "Member")], default="member", max_length=16
+            ),
+        ),
+        migrations.AddField(
+            model_name="membership",
+            name="joined_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name="membership", index=USER_ORG_INDEX),
+            ],
+            database_operations=[
+                migrations.RunPython(add_user_org_index, remove_user_org_index),
+            ],
+        ),
+        # The single-column foreign key indexes are covered by the composite
+        # ones. AlterField(db_index=False) would also drop and re-validate
+        # the foreign key constraints, so only the state changes and the
+        # indexes are dropped concurrently.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name="membership",
+                    name="organisation",
+                    field=models.ForeignKey(
+                        db_index=False, on_delete=django.db.models.deletion.CASCADE, to="stagetwo.organisation"
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="membership",
+                    name="user",
+                    field=models.ForeignKey(
+                        db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL
+                    ),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(drop_fk_indexes, create_fk_indexes),
+            ],
+        ),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 10000
+
+
+def count_members(apps, schema_editor):
+    # In id ranges, each committed on its own, so no long lock on the table.
+    Organisation = apps.get_model("stagetwo", "Organisation")
+    Membership = apps.get_model("stagetwo", "Membership")
+    count = Coalesce(
+        Subquery(
+            Membership.objects.filter(organisation=OuterRef("pk"))
+            .order_by()
+            .values("organisation")
+            .annotate(count=Count("*"))
+            .values("count")
+        ),
+        0,
+    )
+    last = Organisation.objects.aggregate(last=models.Max("pk"))["last"] or 0
+    for start in range(0, last, BATCH_SIZE):
+        Organisation.objects.filter(pk__gt=start, pk__lte=start + BATCH_SIZE).update(member_count=count)
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("stagetwo", "0007_membership_metadata_and_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="organisation",
+            name="member_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_members, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.4 on 2026-10-16 23:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("stagetwo", "0009_revokedtoken_created_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="organisations_version",
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
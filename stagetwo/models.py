@@ -1,8 +1,33 @@
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Lower
+from django.utils import timezone
 import uuid
 
+def bump_version(instance, save_kwargs):
+    # Increment in SQL so concurrent saves can never share a version.
+    if instance._state.adding:
+        return
+    instance.version = models.F('version') + 1
+    update_fields = save_kwargs.get('update_fields')
+    if update_fields is not None and 'version' not in update_fields:
+        save_kwargs['update_fields'] = [*update_fields, 'version']
+
+
+def refresh_version(instance):
+    if not isinstance(instance.version, int):
+        instance.refresh_from_db(fields=['version'])
+
+
 class CustomUserManager(BaseUserManager):
+    def by_email(self, email):
+        # Matches the case-insensitive unique index on LOWER(email).
+        return self.alias(email_lower=Lower('email')).filter(email_lower=Lower(Value(email)))
+
+    def get_by_natural_key(self, username):
+        return self.by_email(username).get()
+
     def create_user(self, email, first_name, last_name, password=None, **extra_fields):
         if not email:
             raise ValueError('The Email field must be set')
@@ -34,16 +59,86 @@ class User(AbstractUser):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['firstName', 'lastName']
 
+    class Meta(AbstractUser.Meta):
+        constraints = [
+            models.UniqueConstraint(Lower('email'), name='stagetwo_user_email_ci_unique'),
+        ]
+
+    # Bumped on every save; the strong ETag of the user's detail response
+    version = models.PositiveIntegerField(default=1, editable=False)
+    # Bumped when the user joins or leaves an organisation
+    membership_version = models.PositiveIntegerField(default=1, editable=False)
+    # Bumped when one of the user's organisations changes; with
+    # membership_version, the ETag of their organisation list
+    organisations_version = models.PositiveIntegerField(default=1, editable=False)
+
     objects = CustomUserManager()  # Use the custom user manager
     @property
     def id(self):
         return self.userId
 
+    def save(self, *args, **kwargs):
+        bump_version(self, kwargs)
+        super().save(*args, **kwargs)
+        refresh_version(self)
+
 class Organisation(models.Model):
     orgId = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True, null=True)
-    users = models.ManyToManyField(User, related_name='organisations')
+    users = models.ManyToManyField(User, related_name='organisations', through='Membership')
+    # Bumped on every save; the strong ETag of the organisation's responses
+    version = models.PositiveIntegerField(default=1, editable=False)
+    # Kept up to date as memberships change (memberships.update_member_counts)
+    member_count = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.name
+
+    def save(self, *args, **kwargs):
+        bump_version(self, kwargs)
+        super().save(*args, **kwargs)
+        refresh_version(self)
+
+
+class Membership(models.Model):
+    """
+    A user's membership of an organisation, stored in the table Django
+    created for the original implicit ``Organisation.users`` through model.
+
+    The unique (organisation, user) index answers "is this user a member"
+    and lists an organisation's members; the (user, organisation) index
+    lists a user's organisations. Both cover those queries on their own, so
+    the separate single-column foreign key indexes are not kept.
+    """
+
+    class Role(models.TextChoices):
+        OWNER = 'owner', 'Owner'
+        MEMBER = 'member', 'Member'
+
+    organisation = models.ForeignKey(Organisation, on_delete=models.CASCADE, db_index=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
+    role = models.CharField(max_length=16, choices=Role.choices, default=Role.MEMBER)
+    joined_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'stagetwo_organisation_users'
+        unique_together = [('organisation', 'user')]
+        indexes = [
+            models.Index(fields=['user', 'organisation'], name='stagetwo_membership_user_org'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} in {self.organisation_id}"
+
+
+class RevokedToken(models.Model):
+    # Only the JTI and expiry are kept; rows are pruned once the token
+    # could no longer be accepted anyway (see revocation.py).
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+    # Polled by every process for revocations made elsewhere
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return self.jti
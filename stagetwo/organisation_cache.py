@@ -0,0 +1,140 @@
+"""
+Users' organisation lists and organisation payloads on Django's cache
+framework (the ``ORGANISATION_CACHE`` alias, ``default`` unless set).
+Only the unpaginated list is served from here; a ``limit``/``cursor`` page
+is a keyset query whose cost does not depend on the length of the list.
+
+Entries are keyed by the version counters the ETags already use, so they
+are never invalidated, only left to expire after
+``ORGANISATION_CACHE_TIMEOUT`` seconds:
+
+- a user's list, ``(id, orgId, version)`` of their organisations in id
+  order, is stored under their ``membership_version`` and
+  ``organisations_version`` (``memberships.organisation_list_versions``);
+- an organisation's payload is stored under its ``version`` and shared by
+  all of its members.
+
+Registration, creating an organisation and adding a member all add
+memberships, which bumps ``membership_version`` for the users who joined
+or left (see ``signals.membership_changed``); a changed organisation,
+including its member count, bumps its own ``version`` and, in one UPDATE,
+its members' ``organisations_version``. A list is therefore never served
+stale, checking it is a primary key lookup, and with a shared backend
+(``CACHE_BACKEND``) all workers reuse each other's entries. Keys use the
+public UUIDs, which are never reused.
+
+Lookups are counted in ``stagetwo_cache_requests_total``.
+"""
+from django.conf import settings
+from django.core.cache import caches
+
+from .metrics import CACHE_REQUESTS
+from .models import Organisation
+from .projections import ORGANISATION
+
+
+def organisation_cache():
+    return caches[getattr(settings, 'ORGANISATION_CACHE', 'default')]
+
+
+def cache_timeout():
+    return getattr(settings, 'ORGANISATION_CACHE_TIMEOUT', 300)
+
+
+def _list_key(user_id, membership_version, organisations_version):
+    return f"stagetwo:organisations:{user_id}:{membership_version}:{organisations_version}"
+
+
+def _payload_key(org_id, version):
+    return f"stagetwo:organisation:{org_id}:{version}"
+
+
+def _organisation_rows(queryset):
+    return queryset.order_by('id').values_list('id', 'orgId', 'version', *ORGANISATION.columns)
+
+
+def _store(rows):
+    """Split ``_organisation_rows`` into list entries and payloads to cache."""
+    entries = []
+    payloads = {}
+    for pk, org_id, version, *row in rows:
+        entries.append((pk, str(org_id), version))
+        payloads[_payload_key(org_id, version)] = ORGANISATION.from_row(row)
+    return entries, payloads
+
+
+def organisation_list(user_pk, user_id, membership_version, organisations_version):
+    """
+    ``(id, orgId, version)`` of the user's organisations in id order. A miss
+    loads the payloads in the same query and caches them too.
+    """
+    cache = organisation_cache()
+    key = _list_key(user_id, membership_version, organisations_version)
+    entries = cache.get(key)
+    if entries is not None:
+        CACHE_REQUESTS.inc(cache='organisation_list', result='hit')
+        return entries
+    CACHE_REQUESTS.inc(cache='organisation_list', result='miss')
+    entries, payloads = _store(_organisation_rows(Organisation.objects.filter(users=user_pk)))
+    cache.set_many({key: entries, **payloads}, cache_timeout())
+    return entries
+
+
+async def aorganisation_list(user_pk, user_id, membership_version, organisations_version):
+    cache = organisation_cache()
+    key = _list_key(user_id, membership_version, organisations_version)
+    entries = await cache.aget(key)
+    if entries is not None:
+        CACHE_REQUESTS.inc(cache='organisation_list', result='hit')
+        return entries
+    CACHE_REQUESTS.inc(cache='organisation_list', result='miss')
+    entries, payloads = _store([
+        row async for row in _organisation_rows(Organisation.objects.filter(users=user_pk))
+    ])
+    await cache.aset_many({key: entries, **payloads}, cache_timeout())
+    return entries
+
+
+def _count_payloads(found, missing):
+    if found:
+        CACHE_REQUESTS.inc(found, cache='organisation', result='hit')
+    if missing:
+        CACHE_REQUESTS.inc(missing, cache='organisation', result='miss')
+
+
+def _in_order(entries, payloads):
+    # A payload loaded on a miss may be newer than the entry asking for it.
+    by_id = {payload['orgId']: payload for payload in payloads.values()}
+    return [by_id[org_id] for _, org_id, _ in entries if org_id in by_id]
+
+
+def organisation_payloads(entries):
+    """
+    Response payloads of list ``entries``, in order, with one ``get_many``
+    and at most one query for the ones that are not cached.
+    """
+    cache = organisation_cache()
+    keys = [_payload_key(org_id, version) for _, org_id, version in entries]
+    payloads = cache.get_many(keys)
+    missing = [pk for (pk, _, _), key in zip(entries, keys) if key not in payloads]
+    _count_payloads(len(payloads), len(missing))
+    if missing:
+        _, loaded = _store(_organisation_rows(Organisation.objects.filter(pk__in=missing)))
+        cache.set_many(loaded, cache_timeout())
+        payloads.update(loaded)
+    return _in_order(entries, payloads)
+
+
+async def aorganisation_payloads(entries):
+    cache = organisation_cache()
+    keys = [_payload_key(org_id, version) for _, org_id, version in entries]
+    payloads = await cache.aget_many(keys)
+    missing = [pk for (pk, _, _), key in zip(entries, keys) if key not in payloads]
+    _count_payloads(len(payloads), len(missing))
+    if missing:
+        _, loaded = _store([
+            row async for row in _organisation_rows(Organisation.objects.filter(pk__in=missing))
+        ])
+        await cache.aset_many(loaded, cache_timeout())
+        payloads.update(loaded)
+    return _in_order(entries, payloads)
@@ -0,0 +1,114 @@
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(value):
+    raw = json.dumps(value, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+
+def decode_cursor(cursor):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    try:
+        return json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        raise InvalidCursor('Invalid cursor')
+
+
+class KeysetPaginator:
+    """
+    Opt-in keyset (cursor) pagination over a unique, indexed column.
+
+    Each page is fetched with ``WHERE key > <last key> ORDER BY key LIMIT n``,
+    so the cost of a page stays the same however deep the client pages. The
+    ``next`` cursor is an opaque token wrapping the last key of the page.
+
+    ``key`` may also be a tuple of integer columns whose combination is
+    unique, such as ``('rank', 'id')``; rows are then ordered by all of them
+    and compared as a tuple.
+    """
+    limit_query_param = 'limit'
+    cursor_query_param = 'cursor'
+
+    def __init__(self, key='id', default_limit=None, max_limit=None):
+        self.key = key
+        self.keys = (key,) if isinstance(key, str) else tuple(key)
+        self.default_limit = default_limit or getattr(settings, 'PAGINATION_DEFAULT_LIMIT', 100)
+        self.max_limit = max_limit or getattr(settings, 'PAGINATION_MAX_LIMIT', 1000)
+
+    def is_requested(self, request):
+        params = request.GET
+        return self.limit_query_param in params or self.cursor_query_param in params
+
+    def get_limit(self, request):
+        raw = request.GET.get(self.limit_query_param)
+        if raw is None:
+            return self.default_limit
+        try:
+            limit = int(raw)
+        except ValueError:
+            raise InvalidCursor('Invalid limit')
+        if limit < 1:
+            raise InvalidCursor('Invalid limit')
+        return min(limit, self.max_limit)
+
+    def get_position(self, request):
+        cursor = request.GET.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        position = decode_cursor(cursor)
+        values = [position] if len(self.keys) == 1 else position
+        if not isinstance(values, list) or len(values) != len(self.keys) or not all(
+            isinstance(value, int) and not isinstance(value, bool) for value in values
+        ):
+            raise InvalidCursor('Invalid cursor')
+        return position
+
+    def after(self, position):
+        # (a, b) > (x, y)  <=>  a > x OR (a = x AND b > y)
+        values = [position] if len(self.keys) == 1 else position
+        condition = Q()
+        for i, key in enumerate(self.keys):
+            condition |= Q(**dict(zip(self.keys[:i], values[:i])), **{f'{key}__gt': values[i]})
+        return condition
+
+    def get_page_queryset(self, queryset, request):
+        limit = self.get_limit(request)
+        position = self.get_position(request)
+        if position is not None:
+            queryset = queryset.filter(self.after(position))
+        return queryset.order_by(*self.keys)[:limit + 1], limit
+
+    def paginate(self, queryset, request):
+        """
+        Return ``(rows, next_cursor)`` for the page requested by ``request``.
+        ``next_cursor`` is ``None`` on the last page.
+        """
+        queryset, limit = self.get_page_queryset(queryset, request)
+        return self.get_page(list(queryset), limit)
+
+    async def apaginate(self, queryset, request):
+        queryset, limit = self.get_page_queryset(queryset, request)
+        return self.get_page([row async for row in queryset], limit)
+
+    def get_page(self, rows, limit):
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, encode_cursor(self.get_key(rows[-1]))
+
+    def get_key(self, row):
+        if isinstance(row, tuple):
+            # values_list() rows must select the key columns first.
+            key = list(row[:len(self.keys)])
+        else:
+            key = [getattr(row, name) for name in self.keys]
+        return key[0] if len(self.keys) == 1 else key
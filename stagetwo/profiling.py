@@ -0,0 +1,197 @@
+"""
+On-demand profiling of single requests (``PROFILING['enabled']``).
+
+A request is profiled when it carries an ``X-Profile`` header that is
+either a value signed by ``profiling_header()`` (``manage.py profile_token
+--path``) or ``claim`` together with a bearer access token of a staff user
+that has the ``profile`` claim (``manage.py profile_token --email``).
+Nothing else is looked at, so other requests pay one header lookup.
+
+A signed value names the method and path it is for, expires after
+``PROFILING['max_age']`` seconds and is used once: its nonce is recorded
+in the ``default`` cache, which must be a shared backend for that to hold
+across workers. Tokens go through ``ClaimsJWTAuthentication``, so a
+revoked (logged out) token cannot start a profile.
+
+The request runs under cProfile and the stats are written to
+``PROFILING['directory']``, which keeps the newest ``PROFILING['keep']``
+profiles. The response names the file in ``X-Profile`` and lists the
+functions with the most own time in ``X-Profile-Top``.
+
+cProfile follows the thread it is started on: under ASGI, work an async
+view hands to ``sync_to_async`` threads is not included. Only one request
+per process is profiled at a time (Python allows one active profiler, and
+coroutines interleaved on an event loop would mix their samples); a
+profiling request that arrives meanwhile is served unprofiled.
+"""
+import cProfile
+import os
+import pstats
+import re
+import secrets
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+
+SALT = 'stagetwo.profiling'
+CLAIM = 'profile'
+
+_profiling = threading.Lock()
+
+
+def profiling_settings():
+    return settings.PROFILING
+
+
+def profiling_header(method, path):
+    """
+    A single-use value for the ``X-Profile`` header of a ``method`` request
+    to ``path``, valid for ``PROFILING['max_age']`` seconds.
+    """
+    return signing.TimestampSigner(salt=SALT).sign_object({
+        'request': f"{method.upper()} {path}", 'nonce': secrets.token_urlsafe(16),
+    })
+
+
+def profiling_token(user):
+    from .tokens import ClaimsAccessToken
+
+    token = ClaimsAccessToken.for_user(user)
+    token[CLAIM] = True
+    return token
+
+
+def _signed_nonce(request, value):
+    try:
+        signed = signing.TimestampSigner(salt=SALT).unsign_object(value, max_age=profiling_settings()['max_age'])
+    except signing.BadSignature:
+        return None
+    if not isinstance(signed, dict) or signed.get('request') != f"{request.method} {request.path}":
+        return None
+    return signed.get('nonce')
+
+
+def _nonce_key(nonce):
+    return f"stagetwo:profile:{nonce}"
+
+
+def _raw_token(request):
+    scheme, _, raw = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    return raw if scheme == 'Bearer' and raw else None
+
+
+def _profiles(token):
+    return bool(token.get(CLAIM) and token.get('is_staff'))
+
+
+def _authentication():
+    from .authentication import ClaimsJWTAuthentication
+
+    return ClaimsJWTAuthentication()
+
+
+def wants_profile(request):
+    value = request.META.get('HTTP_X_PROFILE')
+    if not value:
+        return False
+    if value == 'claim':
+        raw = _raw_token(request)
+        try:
+            return raw is not None and _profiles(_authentication().get_validated_token(raw))
+        except AuthenticationFailed:
+            return False
+    nonce = _signed_nonce(request, value)
+    # add() only succeeds for a nonce that has not been used yet.
+    return nonce is not None and cache.add(_nonce_key(nonce), True, profiling_settings()['max_age'])
+
+
+async def awants_profile(request):
+    value = request.META.get('HTTP_X_PROFILE')
+    if not value:
+        return False
+    if value == 'claim':
+        raw = _raw_token(request)
+        try:
+            return raw is not None and _profiles(await _authentication().aget_validated_token(raw))
+        except AuthenticationFailed:
+            return False
+    nonce = _signed_nonce(request, value)
+    return nonce is not None and await cache.aadd(_nonce_key(nonce), True, profiling_settings()['max_age'])
+
+
+def save_profile(profile, request):
+    options = profiling_settings()
+    directory = options['directory']
+    os.makedirs(directory, exist_ok=True)
+    slug = re.sub(r'[^A-Za-z0-9]+', '-', request.path).strip('-') or 'root'
+    name = f"{time.time():.6f}-{request.method}-{slug[:80]}.prof"
+    profile.dump_stats(os.path.join(directory, name))
+
+    # Oldest first: the names start with the time they were written.
+    profiles = sorted(entry for entry in os.listdir(directory) if entry.endswith('.prof'))
+    for old in profiles[:max(0, len(profiles) - options['keep'])]:
+        try:
+            os.remove(os.path.join(directory, old))
+        except FileNotFoundError:
+            pass
+    return name
+
+
+def top_frames(profile, limit):
+    stats = pstats.Stats(profile).stats
+    ranked = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+    return [
+        f"{os.path.basename(filename)}:{line}({function});tt={own * 1000:.2f};calls={calls}"
+        for (filename, line, function), (_, calls, own, _, _) in ranked
+    ]
+
+
+class ProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not profiling_settings()['enabled']:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not wants_profile(request) or not _profiling.acquire(blocking=False):
+            return self.get_response(request)
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+            response = self.get_response(request)
+        finally:
+            profile.disable()
+            _profiling.release()
+        return self.finish(request, response, profile)
+
+    async def __acall__(self, request):
+        if not await awants_profile(request) or not _profiling.acquire(blocking=False):
+            return await self.get_response(request)
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+            response = await self.get_response(request)
+        finally:
+            profile.disable()
+            _profiling.release()
+        return self.finish(request, response, profile)
+
+    def finish(self, request, response, profile):
+        response['X-Profile'] = save_profile(profile, request)
+        limit = profiling_settings()['top']
+        if limit:
+            response['X-Profile-Top'] = ", ".join(top_frames(profile, limit))
+        return response
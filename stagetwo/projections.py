@@ -0,0 +1,57 @@
+"""
+Serializer-free projections of ``User`` and ``Organisation`` for the hot
+read paths.
+
+A projection is resolved once at import into a fixed tuple of columns and
+per-column converters. Rows from ``values_list(*projection.columns)`` are
+turned into response dicts without DRF's per-field machinery. The output
+matches the hand-built user dicts and ``OrganisationSerializer``.
+"""
+
+
+class Projection:
+    def __init__(self, *fields):
+        # fields: (response key, model attribute, converter or None)
+        self.keys = tuple(key for key, _, _ in fields)
+        self.columns = tuple(attr for _, attr, _ in fields)
+        self.converters = tuple(converter for _, _, converter in fields)
+        self._fields = tuple(zip(self.keys, range(len(fields)), self.converters))
+
+    def from_row(self, row):
+        return {
+            key: row[index] if converter is None or row[index] is None else converter(row[index])
+            for key, index, converter in self._fields
+        }
+
+    def from_instance(self, obj):
+        return self.from_row([getattr(obj, attr) for attr in self.columns])
+
+    def rows(self, queryset):
+        return [self.from_row(row) for row in queryset.values_list(*self.columns)]
+
+
+USER = Projection(
+    ("userId", "userId", str),
+    ("firstName", "first_name", None),
+    ("lastName", "last_name", None),
+    ("email", "email", None),
+    ("phone", "phone", None),
+)
+
+ORGANISATION = Projection(
+    ("orgId", "orgId", str),
+    ("name", "name", None),
+    ("description", "description", None),
+    ("memberCount", "member_count", None),
+)
+
+# Rows of Membership joined to the member; only for values_list() rows.
+MEMBER = Projection(
+    ("userId", "user__userId", str),
+    ("firstName", "user__first_name", None),
+    ("lastName", "user__last_name", None),
+    ("email", "user__email", None),
+    ("phone", "user__phone", None),
+    ("role", "role", None),
+    ("joinedAt", "joined_at", None),
+)
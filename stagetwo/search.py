@@ -0,0 +1,46 @@
+"""
+Organisation search over ``name`` and ``description``, scoped to the
+caller's memberships.
+
+Matches are substring (and so prefix) matches, ranked so that exact names
+come first, then names starting with the query, names with a word starting
+with it, other name matches and finally description-only matches. Ties are
+broken by ``id``, which makes ``(rank, id)`` a keyset pagination key.
+
+On PostgreSQL the case-insensitive ``LIKE`` that ``icontains`` compiles to
+is served by the trigram indexes of migration 0005; SQLite scans, which is
+fine for tests and development.
+"""
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from .models import Organisation
+
+MAX_QUERY_LENGTH = 100
+
+
+class InvalidQuery(ValueError):
+    pass
+
+
+def clean_query(raw):
+    query = ' '.join((raw or '').split())
+    if not query:
+        raise InvalidQuery('A search query is required')
+    if len(query) > MAX_QUERY_LENGTH:
+        raise InvalidQuery(f'Search queries are limited to {MAX_QUERY_LENGTH} characters')
+    return query
+
+
+def search_organisations(user_pk, query):
+    """Organisations of ``user_pk`` matching ``query``, annotated with ``rank``."""
+    return Organisation.objects.filter(
+        Q(name__icontains=query) | Q(description__icontains=query),
+        users=user_pk,
+    ).annotate(rank=Case(
+        When(name__iexact=query, then=Value(0)),
+        When(name__istartswith=query, then=Value(1)),
+        When(name__icontains=f' {query}', then=Value(2)),
+        When(name__icontains=query, then=Value(3)),
+        default=Value(4),
+        output_field=IntegerField(),
+    ))
@@ -1,19 +1,42 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
 from django.core.validators import validate_email, RegexValidator
-from .models import Organisation
-from rest_framework.validators import UniqueValidator
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+from .models import Membership, Organisation
+from .hashing import make_passwords
 
 
 User = get_user_model()
 
+EMAIL_TAKEN = "This email is already registered."
+
+# The case-insensitive unique index on email, and the column's own unique
+# constraint, which PostgreSQL may check first for an exact duplicate.
+EMAIL_CONSTRAINTS = ('stagetwo_user_email_ci_unique', 'stagetwo_user_email_key')
+
+
+def is_email_taken(error):
+    """Whether an ``IntegrityError`` is a violation of an email constraint."""
+    diag = getattr(error.__cause__, 'diag', None)
+    if diag is not None:
+        return diag.constraint_name in EMAIL_CONSTRAINTS
+    # SQLite names the index, or the table and column of a UNIQUE column.
+    message = str(error)
+    return message.startswith('UNIQUE constraint failed') and (
+        EMAIL_CONSTRAINTS[0] in message or message.endswith('stagetwo_user.email')
+    )
+
 class UserRegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
     userId = serializers.UUIDField(read_only=True)
+    # Uniqueness is enforced by the case-insensitive unique index on email;
+    # see create_user_with_organisation.
     email = serializers.EmailField(
         required=True,
         validators=[
-            UniqueValidator(queryset=User.objects.all(), message="This email is already registered."),
             validate_email
         ]
     )
@@ -32,30 +55,127 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         fields = ['userId', 'firstName', 'lastName', 'email', 'password', 'phone']
     
     def create(self, validated_data):
-        user = User(
-            email=validated_data['email'],
-            first_name=validated_data['firstName'],
-            last_name=validated_data['lastName'],
-            phone=validated_data.get('phone', ''),
-        )
-        user.set_password(validated_data['password'])
-        user.save()
+        return create_user_with_organisation(validated_data, make_password(validated_data['password']))
+
+
+def create_user_with_organisation(validated_data, password_hash):
+    """
+    Create a registered user from already-validated data and an already
+    hashed password, together with their default organisation.
+
+    Email uniqueness is left to the database: a clash with the unique index
+    is raised as the same field error the serializer used to report. Any
+    other integrity error is re-raised.
+    """
+    user = User(
+        email=validated_data['email'],
+        first_name=validated_data['firstName'],
+        last_name=validated_data['lastName'],
+        phone=validated_data.get('phone', ''),
+        password=password_hash,
+    )
+    try:
+        with transaction.atomic():
+            user.save()
+            org = Organisation.objects.create(name=default_organisation_name(user))
+            org.users.add(user, through_defaults={'role': Membership.Role.OWNER})
+    except IntegrityError as error:
+        if not is_email_taken(error):
+            raise
+        raise serializers.ValidationError({"email": [EMAIL_TAKEN]})
+
+    return user
+
+
+def field_errors(errors):
+    return [
+        {"field": field, "message": message}
+        for field, messages in errors.items()
+        for message in messages
+    ]
 
-        org_name = f"{user.first_name}'s Organisation"
-        org = Organisation.objects.create(name=org_name)
-        org.users.add(user)
-        org.save()
 
-        return user
+def default_organisation_name(user):
+    return f"{user.first_name}'s Organisation"
+
+
+def bulk_register_users(items):
+    """
+    Validate and create a batch of users, each with a default organisation.
+
+    Returns ``(results, created)`` where ``results`` holds one entry per
+    item, in order, and ``created`` the new users. Users, organisations and
+    memberships are each inserted with a single ``bulk_create`` inside one
+    transaction, and passwords are hashed in parallel.
+    """
+    results = [None] * len(items)
+    valid = []
+    for index, item in enumerate(items):
+        serializer = UserRegistrationSerializer(data=item)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            results[index] = {"index": index, "status": "error", "errors": field_errors(serializer.errors)}
+
+    emails = [data['email'].lower() for _, data in valid]
+    taken = set(
+        User.objects.alias(email_lower=Lower('email'))
+        .filter(email_lower__in=emails)
+        .values_list(Lower('email'), flat=True)
+    )
+    pending = []
+    for index, data in valid:
+        email = data['email'].lower()
+        if email in taken:
+            results[index] = {"index": index, "status": "error", "errors": [
+                {"field": "email", "message": EMAIL_TAKEN}
+            ]}
+        else:
+            taken.add(email)
+            pending.append((index, data))
+
+    passwords = make_passwords([data['password'] for _, data in pending])
+    users = [
+        User(
+            email=data['email'],
+            first_name=data['firstName'],
+            last_name=data['lastName'],
+            phone=data.get('phone', ''),
+            password=password,
+        )
+        for (_, data), password in zip(pending, passwords)
+    ]
+    with transaction.atomic():
+        users = User.objects.bulk_create(users)
+        organisations = Organisation.objects.bulk_create(
+            Organisation(name=default_organisation_name(user), member_count=1) for user in users
+        )
+        Membership.objects.bulk_create(
+            Membership(organisation_id=org.pk, user_id=user.pk, role=Membership.Role.OWNER)
+            for user, org in zip(users, organisations)
+        )
+
+    for (index, _), user in zip(pending, users):
+        results[index] = {"index": index, "status": "created", "user": user}
+    return results, users
 
 class UserLoginSerializer(serializers.Serializer):
     email = serializers.EmailField()
     password = serializers.CharField(write_only=True)
 
 class OrganisationSerializer(serializers.ModelSerializer):
+    memberCount = serializers.IntegerField(source='member_count', read_only=True)
+
     class Meta:
         model = Organisation
-        fields = ['orgId', 'name', 'description']
+        fields = ['orgId', 'name', 'description', 'memberCount']
 
 class AddUserToOrganisationSerializer(serializers.Serializer):
     userId = serializers.UUIDField()
+
+class AddUsersToOrganisationSerializer(serializers.Serializer):
+    userIds = serializers.ListField(
+        child=serializers.UUIDField(),
+        allow_empty=False,
+        max_length=getattr(settings, 'MEMBERSHIP_BATCH_MAX', 10000),
+    )
@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .authentication import user_cache
+from .memberships import bump_membership_versions, bump_organisations_versions, update_member_counts
+from .models import Membership, Organisation
+from .timing import install_query_timer
+
+
+@receiver([post_save, post_delete], sender=settings.AUTH_USER_MODEL)
+def evict_cached_user(sender, instance, **kwargs):
+    user_cache.delete(instance.pk)
+
+
+@receiver(m2m_changed, sender=Membership)
+def membership_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        # Remember what is being removed; post_clear gets no pk_set.
+        related = instance.organisations if reverse else instance.users
+        instance._cleared_pks = list(related.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if pk_set is None:
+        pk_set = getattr(instance, '_cleared_pks', [])
+    # reverse: instance is the user whose organisations changed
+    user_pks, org_pks = ([instance.pk], list(pk_set)) if reverse else (list(pk_set), [instance.pk])
+    bump_membership_versions(user_pks)
+    if action == 'post_add':
+        # pk_set only holds the rows add() actually inserted.
+        update_member_counts(org_pks, delta=len(pk_set) if not reverse else 1)
+    else:
+        update_member_counts(org_pks)
+
+
+@receiver(post_save, sender=Organisation)
+def organisation_changed(sender, instance, created, **kwargs):
+    # Members' organisation lists embed this organisation.
+    if not created:
+        bump_organisations_versions([instance.pk])
+
+
+@receiver(pre_delete, sender=Organisation)
+def remember_members_of_deleted_organisation(sender, instance, **kwargs):
+    instance._deleted_member_pks = list(instance.users.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Organisation)
+def bump_versions_of_deleted_organisation(sender, instance, **kwargs):
+    # The join rows are removed by cascade, which sends no m2m_changed.
+    bump_membership_versions(getattr(instance, '_deleted_member_pks', []))
+
+
+@receiver(connection_created)
+def time_queries(sender, connection, **kwargs):
+    # Every alias, so replica reads are counted too.
+    install_query_timer(connection)
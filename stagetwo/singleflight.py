@@ -0,0 +1,73 @@
+"""
+Request coalescing for hot lookups.
+
+When many requests look up the same row at once (a popular organisation's
+page being shared), ``SingleFlight`` lets the first one run the query and
+hands its result, or its exception, to every identical lookup that arrives
+while it is in flight. Nothing is kept afterwards: the next lookup queries
+again, so results are exactly as fresh as without coalescing.
+
+``do`` coalesces threads (WSGI workers with threads), ``ado`` coalesces
+asyncio tasks on one event loop (ASGI). Both are per process. Keys must
+name everything the result depends on, including the database alias the
+read goes to.
+"""
+import asyncio
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._tasks = {}
+
+    def do(self, key, load):
+        """Return ``load()``, sharing one call among the threads asking for ``key``."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = load()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    async def ado(self, key, load):
+        """
+        Return ``await load()``, sharing one call among the tasks asking for
+        ``key``. The call runs as its own task, so a cancelled caller does
+        not cancel it for the others.
+        """
+        loop = asyncio.get_running_loop()
+        key = (id(loop), key)
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._tasks[key] = loop.create_task(load())
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        return await asyncio.shield(task)
+
+    def __len__(self):
+        return len(self._calls) + len(self._tasks)
+
+
+lookups = SingleFlight()
@@ -0,0 +1,101 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from stagetwo.models import Organisation
+
+User = get_user_model()
+
+
+@override_settings(ROOT_URLCONF='stagetwo.async_urls')
+class AsyncViewTests(TestCase):
+    registration = {
+        "firstName": "John",
+        "lastName": "Doe",
+        "email": "john.doe@example.com",
+        "password": "password123",
+        "phone": "1234567890"
+    }
+
+    async def register(self, data):
+        return await self.async_client.post(reverse('register'), data, content_type='application/json')
+
+    async def test_register_login_and_read(self):
+        response = await self.register(self.registration)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        user = response.json()['data']['user']
+        self.assertEqual(user['firstName'], 'John')
+
+        response = await self.async_client.post(reverse('login'), {
+            "email": "john.doe@example.com",
+            "password": "password123"
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        headers = {"AUTHORIZATION": f"Bearer {response.json()['data']['accessToken']}"}
+
+        response = await self.async_client.get(reverse('user-detail', args=[user['userId']]), headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['data']['email'], 'john.doe@example.com')
+
+        response = await self.async_client.get(reverse('organisation-list'), headers=headers)
+        organisations = response.json()['data']['organisations']
+        self.assertEqual([org['name'] for org in organisations], ["John's Organisation"])
+
+        response = await self.async_client.get(
+            reverse('organisation-detail', args=[organisations[0]['orgId']]), headers=headers
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    async def test_refresh_token_cookie_rotates(self):
+        response = await self.async_client.post(
+            reverse('register') + "?refresh=cookie", self.registration, content_type='application/json'
+        )
+        self.assertNotIn('refreshToken', response.json()['data'])
+        cookie = response.cookies['refreshToken'].value
+
+        response = await self.async_client.post(reverse('token-refresh'), content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('accessToken', response.json()['data'])
+        self.assertNotEqual(response.cookies['refreshToken'].value, cookie)
+
+        self.async_client.cookies.clear()
+        response = await self.async_client.post(reverse('token-refresh'), content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_logout_revokes_access_token(self):
+        response = await self.register(self.registration)
+        headers = {"AUTHORIZATION": f"Bearer {response.json()['data']['accessToken']}"}
+        response = await self.async_client.post(reverse('logout'), headers=headers, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = await self.async_client.get(reverse('organisation-list'), headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_register_duplicate_email(self):
+        await self.register(self.registration)
+        response = await self.register(self.registration)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json()['errors'][0]['field'], 'email')
+
+    async def test_login_with_wrong_password(self):
+        await self.register(self.registration)
+        response = await self.async_client.post(reverse('login'), {
+            "email": "john.doe@example.com",
+            "password": "wrong"
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_requires_authentication(self):
+        response = await self.async_client.get(reverse('organisation-list'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn('WWW-Authenticate', response)
+
+    async def test_other_user_outside_organisation_is_forbidden(self):
+        await self.register(self.registration)
+        response = await self.register(dict(self.registration, email="ife.dayo@example.com"))
+        other = response.json()['data']
+        response = await self.async_client.get(
+            reverse('user-detail', args=[(await User.objects.aget(email="john.doe@example.com")).userId]),
+            headers={"AUTHORIZATION": f"Bearer {other['accessToken']}"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(await Organisation.objects.acount(), 2)
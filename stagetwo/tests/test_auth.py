@@ -1,9 +1,14 @@
+from unittest import mock
+
+from django.db import IntegrityError
 from django.urls import reverse
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from django.contrib.auth import get_user_model
 from stagetwo.models import Organisation
+from stagetwo.serializers import create_user_with_organisation
 from rest_framework_simplejwt.tokens import AccessToken
+from django.contrib.auth.hashers import make_password
 
 User = get_user_model()
 
@@ -212,3 +217,67 @@ class UserDetailViewTests(APITestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
+
+class PasswordRehashTests(APITestCase):
+    def test_legacy_hash_is_upgraded_on_login(self):
+        user = User.objects.create_user(
+            first_name="John", last_name="Doe", email="john.doe@example.com", password="password123"
+        )
+        self.assertTrue(user.password.startswith('scrypt$'))
+        user.password = make_password("password123", hasher='pbkdf2_sha256')
+        user.save()
+
+        response = self.client.post(reverse('login'), {
+            "email": "john.doe@example.com",
+            "password": "password123"
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('scrypt$'))
+        self.assertTrue(user.check_password("password123"))
+
+
+class CaseInsensitiveEmailTests(APITestCase):
+    data = {
+        "firstName": "John",
+        "lastName": "Doe",
+        "email": "John.Doe@example.com",
+        "password": "password123",
+        "phone": "1234567890"
+    }
+
+    def test_register_duplicate_email_in_other_case(self):
+        self.client.post(reverse('register'), self.data, format='json')
+        response = self.client.post(reverse('register'), dict(self.data, email="john.doe@EXAMPLE.com"), format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['errors'], [
+            {"field": "email", "message": "This email is already registered."}
+        ])
+        self.assertEqual(User.objects.count(), 1)
+        self.assertEqual(Organisation.objects.count(), 1)
+
+    def test_register_exact_duplicate_email(self):
+        self.client.post(reverse('register'), self.data, format='json')
+        response = self.client.post(reverse('register'), self.data, format='json')
+        self.assertEqual(response.data['errors'], [
+            {"field": "email", "message": "This email is already registered."}
+        ])
+
+    def test_other_integrity_errors_are_not_reported_as_taken_email(self):
+        error = IntegrityError("NOT NULL constraint failed: stagetwo_organisation.name")
+        validated = {"firstName": "John", "lastName": "Doe", "email": "john.doe@example.com"}
+        with mock.patch.object(Organisation.objects, 'create', side_effect=error):
+            with self.assertRaises(IntegrityError):
+                create_user_with_organisation(validated, "!")
+        self.assertEqual(User.objects.count(), 0)
+
+    def test_login_ignores_email_case(self):
+        self.client.post(reverse('register'), self.data, format='json')
+        with self.assertNumQueries(1):
+            user = User.objects.get_by_natural_key("JOHN.DOE@example.com")
+        self.assertEqual(user.email, "John.Doe@example.com")
+        response = self.client.post(reverse('login'), {
+            "email": "john.doe@example.com",
+            "password": "password123"
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -0,0 +1,61 @@
+from datetime import timedelta
+
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from stagetwo.authentication import ClaimsUser, user_cache
+from stagetwo.tokens import ClaimsRefreshToken
+
+User = get_user_model()
+
+
+class ClaimsAuthenticationTests(APITestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.user = User.objects.create_user(
+            email="user1@example.com", first_name="User", last_name="One", password="password123"
+        )
+        self.token = ClaimsRefreshToken.for_user(self.user).access_token
+
+    def test_own_user_detail_needs_no_queries(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        url = reverse('user-detail', args=[str(self.user.userId)])
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['email'], self.user.email)
+        self.assertEqual(response.data['data']['userId'], str(self.user.userId))
+
+    def test_full_user_is_loaded_once_and_cached(self):
+        claims_user = ClaimsUser(self.token)
+        with self.assertNumQueries(1):
+            self.assertEqual(claims_user.date_joined, self.user.date_joined)
+        with self.assertNumQueries(0):
+            self.assertEqual(ClaimsUser(self.token).date_joined, self.user.date_joined)
+
+    def test_cached_user_is_evicted_on_save(self):
+        ClaimsUser(self.token).get_full_user()
+        self.user.phone = "+1234567890"
+        self.user.save()
+        self.assertEqual(ClaimsUser(self.token).get_full_user().phone, "+1234567890")
+
+    def test_invalid_token_is_rejected(self):
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer not-a-token")
+        response = self.client.get(reverse('organisation-list'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_keeps_access_until_the_token_expires(self):
+        refresh = ClaimsRefreshToken.for_user(self.user)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        user_cache.clear()
+        url = reverse('user-detail', args=[str(self.user.userId)])
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+        response = self.client.post(reverse('token-refresh'), {"refreshToken": str(refresh)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        expired = refresh.access_token
+        expired.set_exp(lifetime=-timedelta(seconds=1))
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {expired}")
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,25 @@
+from django.test import SimpleTestCase
+
+from stagetwo.bench import compare_to_baseline, summarize
+
+
+class BenchTests(SimpleTestCase):
+    def test_summarize(self):
+        result = summarize([0.001] * 98 + [0.1] * 2, elapsed=0.298)
+        self.assertEqual(result['iterations'], 100)
+        self.assertAlmostEqual(result['p50_ms'], 1.0)
+        self.assertAlmostEqual(result['p99_ms'], 100.0)
+
+    def test_compare_to_baseline(self):
+        baseline = {
+            "login": {"p95_ms": 10.0, "queries_max": 1},
+            "organisation-list": {"p95_ms": 2.0, "queries_max": 2},
+        }
+        results = {
+            "login": {"p95_ms": 11.9, "queries_max": 1},
+            "organisation-list": {"p95_ms": 2.5, "queries_max": 3},
+            "new-route": {"p95_ms": 50.0, "queries_max": 9},
+        }
+        regressions = compare_to_baseline(results, baseline, tolerance=0.2)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(all(line.startswith("organisation-list") for line in regressions))
@@ -0,0 +1,111 @@
+from django.urls import reverse
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from stagetwo.memberships import add_members
+from stagetwo.models import Organisation
+
+User = get_user_model()
+
+
+class BulkRegistrationTests(APITestCase):
+    client = APIClient()
+    def setUp(self):
+        self.url = reverse('register-bulk')
+        self.admin = User.objects.create_user(
+            email="admin@example.com", first_name="Ad", last_name="Min", password="password123", is_staff=True
+        )
+        self.client.force_authenticate(user=self.admin)
+
+    def registration(self, first_name, email):
+        return {
+            "firstName": first_name,
+            "lastName": "Doe",
+            "email": email,
+            "password": "password123",
+        }
+
+    def test_bulk_registration_reports_per_item_results(self):
+        data = {"users": [
+            self.registration("John", "john.doe@example.com"),
+            self.registration("Jane", "invalid-email"),
+            self.registration("Ad", "admin@example.com"),
+            self.registration("Ife", "ife.dayo@example.com"),
+            self.registration("John", "john.doe@example.com"),
+        ]}
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['data']['results']
+        self.assertEqual([r['status'] for r in results], ["created", "error", "error", "created", "error"])
+        self.assertEqual(results[1]['errors'][0]['field'], 'email')
+        self.assertEqual(results[2]['errors'][0]['message'], "This email is already registered.")
+
+        user = User.objects.get(userId=results[3]['user']['userId'])
+        self.assertTrue(user.check_password("password123"))
+        organisation = Organisation.objects.get(users=user)
+        self.assertEqual(organisation.name, "Ife's Organisation")
+
+    def test_bulk_registration_requires_staff(self):
+        user = User.objects.create_user(
+            email="user@example.com", first_name="User", last_name="One", password="password123"
+        )
+        self.client.force_authenticate(user=user)
+        response = self.client.post(self.url, {"users": [self.registration("John", "john.doe@example.com")]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_bulk_registration_rejects_empty_batch(self):
+        response = self.client.post(self.url, {"users": []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BatchMembershipTests(APITestCase):
+    client = APIClient()
+    def setUp(self):
+        self.owner = User.objects.create_user(
+            email="owner@example.com", first_name="Own", last_name="Er", password="password123"
+        )
+        self.member = User.objects.create_user(
+            email="member@example.com", first_name="Mem", last_name="Ber", password="password123"
+        )
+        self.newcomers = [
+            User.objects.create_user(
+                email=f"new{i}@example.com", first_name="New", last_name=str(i), password="password123"
+            )
+            for i in range(3)
+        ]
+        self.org = Organisation.objects.create(name="Team")
+        self.org.users.add(self.owner, self.member)
+        self.url = reverse('add-users-to-organisation', args=[self.org.orgId])
+        self.client.force_authenticate(user=self.owner)
+
+    def test_batch_add_reports_added_existing_and_missing(self):
+        missing = "00000000-0000-0000-0000-000000000000"
+        user_ids = [str(u.userId) for u in self.newcomers] + [str(self.member.userId), missing]
+        # organisation lookup, users IN, one INSERT ... RETURNING, one
+        # membership_version UPDATE of the added users, one member_count
+        # UPDATE and one organisations_version UPDATE of the members
+        with self.assertNumQueries(6):
+            response = self.client.post(self.url, {"userIds": user_ids}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data['data']
+        self.assertEqual(sorted(data['added']), sorted(str(u.userId) for u in self.newcomers))
+        self.assertEqual(data['alreadyMembers'], [str(self.member.userId)])
+        self.assertEqual(data['notFound'], [missing])
+        self.assertEqual(self.org.users.count(), 5)
+
+    def test_members_added_concurrently_are_reported_as_existing(self):
+        # Inserted by another request after this one resolved the users.
+        add_members(self.org, [self.newcomers[0].pk])
+        self.newcomers[0].refresh_from_db()
+        version = self.newcomers[0].membership_version
+        added = add_members(self.org, [u.pk for u in self.newcomers])
+        self.assertEqual(added, [self.newcomers[1].pk, self.newcomers[2].pk])
+        self.org.refresh_from_db()
+        self.assertEqual(self.org.member_count, 5)
+        self.newcomers[0].refresh_from_db()
+        self.assertEqual(self.newcomers[0].membership_version, version)
+
+    def test_batch_add_requires_membership(self):
+        self.client.force_authenticate(user=self.newcomers[0])
+        response = self.client.post(self.url, {"userIds": [str(self.newcomers[1].userId)]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
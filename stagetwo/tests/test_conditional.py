@@ -0,0 +1,84 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from stagetwo.models import Organisation
+
+User = get_user_model()
+
+
+class ConditionalGetTests(APITestCase):
+    client = APIClient()
+    def setUp(self):
+        self.user1 = User.objects.create_user(
+            email="user1@example.com", first_name="User", last_name="One", password="password123"
+        )
+        self.user2 = User.objects.create_user(
+            email="user2@example.com", first_name="User", last_name="Two", password="password123"
+        )
+        self.org = Organisation.objects.create(name="Test Organisation")
+        self.org.users.add(self.user1, self.user2)
+        self.client.force_authenticate(user=self.user1)
+
+    def assertRevalidates(self, url, queries):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        with self.assertNumQueries(queries):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+        return etag
+
+    def test_organisation_detail(self):
+        url = reverse('organisation-detail', args=[self.org.orgId])
+        # The row version, then the caller's membership.
+        etag = self.assertRevalidates(url, queries=2)
+        self.org.name = "Renamed"
+        self.org.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['name'], "Renamed")
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_user_detail(self):
+        url = reverse('user-detail', args=[self.user2.userId])
+        etag = self.assertRevalidates(url, queries=2)
+        self.user2.phone = "+1234567890"
+        self.user2.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['phone'], "+1234567890")
+
+    def test_organisation_list_follows_membership_version(self):
+        url = reverse('organisation-list')
+        etag = self.assertRevalidates(url, queries=1)
+
+        Organisation.objects.create(name="Another").users.add(self.user1)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['data']['organisations']), 2)
+        etag = response['ETag']
+
+        self.org.description = "Changed"
+        self.org.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_organisation_list_version_is_a_primary_key_lookup(self):
+        url = reverse('organisation-list')
+        etag = self.client.get(url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('JOIN', queries[0]['sql'])
+
+    def test_paginated_pages_have_distinct_etags(self):
+        url = reverse('organisation-list')
+        first = self.client.get(url, {'limit': 1})['ETag']
+        self.assertNotEqual(first, self.client.get(url)['ETag'])
+        self.assertEqual(self.client.get(url, {'limit': 1}, HTTP_IF_NONE_MATCH=first).status_code, status.HTTP_304_NOT_MODIFIED)
@@ -0,0 +1,179 @@
+import re
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from stagetwo.memberships import (
+    ashare_organisation, bump_membership_versions, is_member, membership_cache, organisation_ids_for,
+    organisation_members, share_organisation,
+)
+from stagetwo.models import Membership, Organisation
+
+User = get_user_model()
+
+
+class CoMembershipIndexTests(TestCase):
+    def setUp(self):
+        membership_cache().clear()
+        self.user1 = User.objects.create_user(
+            email="user1@example.com", first_name="User", last_name="One", password="password123"
+        )
+        self.user2 = User.objects.create_user(
+            email="user2@example.com", first_name="User", last_name="Two", password="password123"
+        )
+        self.org = Organisation.objects.create(name="Test Organisation")
+
+    def test_shared_organisation_is_answered_from_the_index(self):
+        self.org.users.add(self.user1, self.user2)
+        with self.assertNumQueries(2):
+            self.assertTrue(share_organisation(self.user1.pk, self.user2.pk))
+        # Warm: only the membership versions are read.
+        with self.assertNumQueries(1):
+            self.assertTrue(share_organisation(self.user1.pk, self.user2.pk))
+        self.assertFalse(share_organisation(self.user1.pk, User.objects.create_user(
+            "user3@example.com", "User", "Three", "password123"
+        ).pk))
+
+    def test_membership_changes_retire_cached_entries(self):
+        self.org.users.add(self.user1)
+        self.assertFalse(share_organisation(self.user1.pk, self.user2.pk))
+        self.org.users.add(self.user2)
+        self.assertEqual(organisation_ids_for(self.user2.pk), {self.user2.pk: {self.org.pk}})
+        self.assertTrue(share_organisation(self.user1.pk, self.user2.pk))
+        self.user2.organisations.remove(self.org)
+        self.assertFalse(share_organisation(self.user1.pk, self.user2.pk))
+
+    def test_version_bumped_by_another_worker_retires_entries(self):
+        self.org.users.add(self.user1, self.user2)
+        self.assertTrue(share_organisation(self.user1.pk, self.user2.pk))
+        # Another worker's signal handlers only leave the bumped version in
+        # the database; nothing is evicted from this process's cache.
+        Membership.objects.filter(organisation=self.org, user=self.user2).delete()
+        bump_membership_versions([self.user2.pk])
+        self.assertFalse(share_organisation(self.user1.pk, self.user2.pk))
+
+    def test_deleted_organisation_revokes_access(self):
+        self.org.users.add(self.user1, self.user2)
+        self.assertTrue(share_organisation(self.user1.pk, self.user2.pk))
+        self.assertTrue(is_member(self.user1.pk, self.org.pk))
+        Organisation.objects.filter(pk=self.org.pk).delete()
+        self.assertFalse(share_organisation(self.user1.pk, self.user2.pk))
+        self.assertFalse(is_member(self.user1.pk, self.org.pk))
+
+    async def test_async_lookups_share_the_index(self):
+        await self.org.users.aadd(self.user1, self.user2)
+        self.assertTrue(await ashare_organisation(self.user1.pk, self.user2.pk))
+        await self.user2.organisations.aremove(self.org)
+        self.assertFalse(await ashare_organisation(self.user1.pk, self.user2.pk))
+
+
+class MembershipModelTests(APITestCase):
+    def test_creators_own_their_organisations(self):
+        response = self.client.post(reverse('register'), {
+            "firstName": "John",
+            "lastName": "Doe",
+            "email": "john.doe@example.com",
+            "password": "password123",
+        }, format='json')
+        user = User.objects.get(email="john.doe@example.com")
+        self.client.force_authenticate(user=user)
+        other = User.objects.create_user("jane.doe@example.com", "Jane", "Doe", "password123")
+        org = user.organisations.get()
+        response = self.client.post(
+            reverse('add-user-to-organisation', args=[org.orgId]), {"userId": str(other.userId)}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+        memberships = Membership.objects.filter(organisation=org).order_by('id')
+        self.assertEqual(
+            [(m.user_id, m.role) for m in memberships],
+            [(user.pk, Membership.Role.OWNER), (other.pk, Membership.Role.MEMBER)],
+        )
+        self.assertLessEqual(memberships[0].joined_at, memberships[1].joined_at)
+
+
+@skipUnless(connection.vendor == 'sqlite', "Query plans are checked with SQLite's EXPLAIN QUERY PLAN")
+class MembershipQueryPlanTests(TestCase):
+    """The membership lookups on the hot paths read only the two composite indexes."""
+
+    USER_ORG = 'stagetwo_membership_user_org'
+    ORG_USER = 'stagetwo_organisation_users_organisation_id_user_id_bd31ecd3_uniq'
+
+    def assertCoveredBy(self, queryset, index):
+        plan = queryset.explain()
+        # The join table is aliased (T3, T4...) when joined more than once.
+        lines = [line for line in plan.splitlines() if re.search(r'SEARCH (stagetwo_organisation_users|T\d+) ', line)]
+        self.assertTrue(lines, plan)
+        for line in lines:
+            self.assertRegex(line, rf'USING COVERING INDEX {re.escape(index)}\b', plan)
+
+    def test_organisations_of_a_user(self):
+        self.assertCoveredBy(Membership.objects.filter(user_id=1).values_list('organisation_id'), self.USER_ORG)
+        self.assertCoveredBy(Organisation.objects.filter(users=1), self.USER_ORG)
+
+    def test_membership_checks(self):
+        self.assertCoveredBy(
+            Organisation.objects.filter(orgId='00000000-0000-0000-0000-000000000000', users=1), self.ORG_USER
+        )
+        self.assertCoveredBy(
+            Membership.objects.filter(organisation_id=1, user_id__in=[1, 2]).values_list('user_id'), self.ORG_USER
+        )
+
+    def test_members_of_an_organisation(self):
+        self.assertCoveredBy(User.objects.filter(organisations=1), self.ORG_USER)
+
+    def test_shared_organisation(self):
+        plan = Organisation.objects.filter(users=1).filter(users=2).explain()
+        self.assertIn(f'USING COVERING INDEX {self.USER_ORG} (user_id=?)', plan)
+        self.assertIn(f'USING COVERING INDEX {self.ORG_USER} (organisation_id=? AND user_id=?)', plan)
+
+    def test_member_listing_walks_the_organisation_index(self):
+        members = organisation_members('00000000-0000-0000-0000-000000000000', 1)
+        plan = members.filter(user_id__gt=1).order_by('user_id')[:10].explain()
+        self.assertIn(f'USING INDEX {self.ORG_USER} (organisation_id=? AND user_id>?)', plan)
+        self.assertIn(f'USING COVERING INDEX {self.ORG_USER} (organisation_id=? AND user_id=?)', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+@skipUnless(connection.vendor == 'postgresql', "PostgreSQL plans need a PostgreSQL DATABASE_URL")
+class PostgresMembershipQueryPlanTests(TestCase):
+    """The same index claims against PostgreSQL's planner, as deployed."""
+
+    USER_ORG = MembershipQueryPlanTests.USER_ORG
+    ORG_USER = MembershipQueryPlanTests.ORG_USER
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            # The test tables are nearly empty; make the planner show its index choice.
+            cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def assertUses(self, queryset, index):
+        plan = queryset.explain()
+        self.assertRegex(plan, rf'Index (Only )?Scan using {re.escape(index)}\b', plan)
+
+    def test_single_column_indexes_are_gone(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Membership._meta.db_table)
+        indexed = sorted(
+            info['columns'] for info in constraints.values()
+            if (info['index'] or info['unique']) and not info['primary_key']
+        )
+        self.assertEqual(indexed, [['organisation_id', 'user_id'], ['user_id', 'organisation_id']])
+        self.assertEqual(
+            sorted(info['columns'][0] for info in constraints.values() if info['foreign_key']),
+            ['organisation_id', 'user_id'],
+        )
+
+    def test_organisations_of_a_user(self):
+        self.assertUses(Membership.objects.filter(user_id=1).values_list('organisation_id'), self.USER_ORG)
+
+    def test_membership_checks(self):
+        self.assertUses(Membership.objects.filter(organisation_id=1, user_id=1), self.ORG_USER)
+
+    def test_member_listing_walks_the_organisation_index(self):
+        self.assertUses(
+            Membership.objects.filter(organisation_id=1, user_id__gt=1).order_by('user_id')[:10], self.ORG_USER
+        )
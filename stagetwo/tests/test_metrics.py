@@ -0,0 +1,140 @@
+import os
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from stagetwo.db.pool import stats as pool_stats, stats_for
+from stagetwo.metrics import Registry, clear_directory, registry, remove_process
+
+
+class RegistryTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def workers(self, count):
+        workers = []
+        for i in range(count):
+            worker = Registry(process=f"worker{i}")
+            worker.counter('logins_total', "Logins.", ('result',))
+            worker.histogram('latency_seconds', "Latency.", buckets=(0.1, 1.0))
+            workers.append(worker)
+        return workers
+
+    def test_exposition_format(self):
+        with override_settings(METRICS={'directory': None}):
+            worker, = self.workers(1)
+            worker.metrics['logins_total'].inc(result='ok')
+            worker.metrics['latency_seconds'].observe(0.05)
+            worker.metrics['latency_seconds'].observe(0.5)
+            worker.metrics['latency_seconds'].observe(5)
+            self.assertEqual(worker.exposition(), "\n".join([
+                '# HELP logins_total Logins.',
+                '# TYPE logins_total counter',
+                'logins_total{result="ok"} 1',
+                '# HELP latency_seconds Latency.',
+                '# TYPE latency_seconds histogram',
+                'latency_seconds_bucket{le="0.1"} 1',
+                'latency_seconds_bucket{le="1.0"} 2',
+                'latency_seconds_bucket{le="+Inf"} 3',
+                'latency_seconds_sum 5.55',
+                'latency_seconds_count 3',
+            ]) + "\n")
+
+    def test_scrape_adds_up_every_process(self):
+        with override_settings(METRICS={'directory': self.directory}):
+            first, second = self.workers(2)
+            first.metrics['logins_total'].inc(result='ok')
+            first.metrics['latency_seconds'].observe(0.05)
+            second.metrics['logins_total'].inc(2, result='ok')
+            second.metrics['logins_total'].inc(result='failed')
+            second.metrics['latency_seconds'].observe(0.5)
+            second.flush()
+
+            values = first.collect()
+        self.assertEqual(values['logins_total'], {('ok',): 3, ('failed',): 1})
+        self.assertEqual(values['latency_seconds'][()], [[1, 1, 0], 0.55, 2])
+
+    def test_exited_processes_stay_counted(self):
+        with override_settings(METRICS={'directory': self.directory}):
+            first, second, third = self.workers(3)
+            second.metrics['logins_total'].inc(result='ok')
+            second.metrics['latency_seconds'].observe(0.5)
+            second.flush()
+            third.metrics['logins_total'].inc(2, result='ok')
+            third.flush()
+            self.assertEqual(first.collect()['logins_total'], {('ok',): 3})
+
+            # Flushed on the way out, so nothing recorded since the last flush is lost.
+            second.metrics['logins_total'].inc(result='ok')
+            second.remove()
+            remove_process('worker2')
+            remove_process('worker2')
+            self.assertEqual(sorted(os.listdir(self.directory)), ['archive.json', 'archive.lock', 'worker0.json'])
+            after = first.collect()
+            self.assertEqual(after['logins_total'], {('ok',): 4})
+            self.assertEqual(after['latency_seconds'][()], [[0, 1, 0], 0.5, 1])
+
+            # A new process reusing the pid adds to the archived totals.
+            reused = self.workers(3)[2]
+            reused.metrics['logins_total'].inc(result='ok')
+            reused.flush()
+            self.assertEqual(first.collect()['logins_total'], {('ok',): 5})
+
+            clear_directory()
+            self.assertEqual(os.listdir(self.directory), [])
+
+
+@override_settings(METRICS={'enabled': True, 'token': 's3cret', 'directory': None})
+class MetricsEndpointTests(APITestCase):
+    def setUp(self):
+        registry.reset()
+
+    def scrape(self, token='s3cret'):
+        return self.client.get(reverse('metrics'), HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_requires_the_token(self):
+        self.assertEqual(self.scrape('wrong').status_code, status.HTTP_401_UNAUTHORIZED)
+        with override_settings(METRICS={'enabled': True, 'token': None}):
+            self.assertEqual(self.scrape().status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_records_views_tokens_hashing_and_failures(self):
+        self.client.post(reverse('register'), {
+            "firstName": "John",
+            "lastName": "Doe",
+            "email": "john.doe@example.com",
+            "password": "password123",
+        }, format='json')
+        self.client.post(reverse('login'), {"email": "john.doe@example.com", "password": "wrong"}, format='json')
+        self.client.get(reverse('organisation-list'), HTTP_AUTHORIZATION="Bearer not-a-token")
+
+        response = self.scrape()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('stagetwo_request_duration_seconds_count{view="register",method="POST",status="201"} 1', body)
+        self.assertIn('stagetwo_request_queries_count{view="login",method="POST"} 1', body)
+        self.assertIn('stagetwo_tokens_issued_total{type="access"} 1', body)
+        self.assertIn('stagetwo_token_issue_seconds_count 1', body)
+        self.assertRegex(body, r'stagetwo_password_hash_seconds_count\{algorithm="\w+",operation="encode"\} [1-9]')
+        self.assertRegex(body, r'stagetwo_password_hash_seconds_count\{algorithm="\w+",operation="verify"\} [1-9]')
+        self.assertIn('stagetwo_auth_failures_total{reason="login"} 1', body)
+        self.assertIn('stagetwo_auth_failures_total{reason="access_token"} 1', body)
+
+    def test_exports_connection_pool_stats(self):
+        stats = stats_for('pool-metrics-test')
+        self.addCleanup(pool_stats.pop, 'pool-metrics-test')
+        stats.record('hits')
+        stats.record('hits')
+        stats.record('misses')
+        stats.record_connect(0.5)
+
+        body = self.scrape().content.decode()
+        self.assertIn('stagetwo_db_pool_connections_total{alias="pool-metrics-test",result="hit"} 2', body)
+        self.assertIn('stagetwo_db_pool_connections_total{alias="pool-metrics-test",result="miss"} 1', body)
+        self.assertIn('stagetwo_db_connects_total{alias="pool-metrics-test"} 1', body)
+        self.assertIn('stagetwo_db_connect_seconds_total{alias="pool-metrics-test"} 0.5', body)
@@ -0,0 +1,126 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
+
+from stagetwo.metrics import CACHE_REQUESTS, registry
+from stagetwo.models import Organisation
+from stagetwo.organisation_cache import _payload_key, organisation_cache
+from stagetwo.tokens import ClaimsAccessToken
+from stagetwo.views import OrganisationCreateView
+
+User = get_user_model()
+
+
+def lookups(cache, result):
+    return registry.values[CACHE_REQUESTS.name].get((cache, result), 0)
+
+
+class OrganisationCacheTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("cached@example.com", "Cache", "User", "password123")
+        self.other = User.objects.create_user("other@example.com", "Other", "User", "password123")
+        self.organisations = []
+        for i in range(3):
+            org = Organisation.objects.create(name=f"Org {i}")
+            org.users.add(self.user)
+            self.organisations.append(org)
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('organisation-list')
+
+    def names(self, response):
+        return [org['name'] for org in response.data['data']['organisations']]
+
+    def test_warm_list_needs_only_the_version_query(self):
+        first = self.client.get(self.url)
+        hits = lookups('organisation_list', 'hit')
+        with self.assertNumQueries(1):
+            second = self.client.get(self.url)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(lookups('organisation_list', 'hit'), hits + 1)
+
+    def test_pages_use_the_keyset_query_not_the_cached_list(self):
+        self.client.get(self.url)
+        hits, misses = lookups('organisation_list', 'hit'), lookups('organisation_list', 'miss')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'limit': 2})
+        self.assertEqual(len(queries), 2)
+        self.assertIn('LIMIT 3', queries[1]['sql'])
+        self.assertEqual(self.names(response), ["Org 0", "Org 1"])
+        response = self.client.get(self.url, {'limit': 2, 'cursor': response.data['data']['next']})
+        self.assertEqual(self.names(response), ["Org 2"])
+        self.assertIsNone(response.data['data']['next'])
+        self.assertEqual(
+            (lookups('organisation_list', 'hit'), lookups('organisation_list', 'miss')), (hits, misses)
+        )
+
+    def test_created_organisation_is_listed(self):
+        self.client.get(self.url)
+        # Called directly: the organisations route also matches the list view.
+        request = APIRequestFactory().post('/', {"name": "Created"}, format='json')
+        force_authenticate(request, user=self.user)
+        self.assertEqual(OrganisationCreateView.as_view()(request).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.names(self.client.get(self.url)), ["Org 0", "Org 1", "Org 2", "Created"])
+
+    def test_added_member_and_member_counts_are_fresh(self):
+        self.client.force_authenticate(user=self.other)
+        self.assertEqual(self.names(self.client.get(self.url)), [])
+
+        self.client.force_authenticate(user=self.user)
+        self.client.get(self.url)
+        response = self.client.post(
+            reverse('add-user-to-organisation', args=[self.organisations[0].orgId]),
+            {"userId": str(self.other.userId)}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(self.url).data['data']['organisations'][0]['memberCount'], 2)
+
+        self.client.force_authenticate(user=self.other)
+        self.assertEqual(self.names(self.client.get(self.url)), ["Org 0"])
+
+    def test_renamed_organisation_is_fresh(self):
+        self.client.get(self.url)
+        self.organisations[1].name = "Renamed"
+        self.organisations[1].save()
+        self.assertEqual(self.names(self.client.get(self.url)), ["Org 0", "Renamed", "Org 2"])
+
+    def test_evicted_payloads_are_reloaded_in_one_query(self):
+        self.client.get(self.url)
+        org = self.organisations[1]
+        org.refresh_from_db()
+        organisation_cache().delete(_payload_key(org.orgId, org.version))
+        misses = lookups('organisation', 'miss')
+        with self.assertNumQueries(2):
+            self.assertEqual(self.names(self.client.get(self.url)), ["Org 0", "Org 1", "Org 2"])
+        self.assertEqual(lookups('organisation', 'miss'), misses + 1)
+
+    def test_registration_lists_the_new_organisation(self):
+        response = self.client.post(reverse('register'), {
+            "firstName": "New", "lastName": "User", "email": "new@example.com", "password": "password123"
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.client.force_authenticate(user=User.objects.get(email="new@example.com"))
+        self.assertEqual(self.names(self.client.get(self.url)), ["New's Organisation"])
+
+
+@override_settings(ROOT_URLCONF='stagetwo.async_urls')
+class AsyncOrganisationCacheTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("cached@example.com", "Cache", "User", "password123")
+        for i in range(3):
+            Organisation.objects.create(name=f"Org {i}").users.add(self.user)
+        self.headers = {"AUTHORIZATION": f"Bearer {ClaimsAccessToken.for_user(self.user)}"}
+
+    async def test_lists_from_the_cache(self):
+        first = await self.async_client.get(reverse('organisation-list'), headers=self.headers)
+        hits = lookups('organisation_list', 'hit')
+        second = await self.async_client.get(reverse('organisation-list'), headers=self.headers)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(lookups('organisation_list', 'hit'), hits + 1)
+        page = await self.async_client.get(reverse('organisation-list'), {'limit': 2}, headers=self.headers)
+        self.assertEqual(page.status_code, status.HTTP_200_OK)
+        self.assertEqual(page.json()['data']['organisations'], first.json()['data']['organisations'][:2])
+        self.assertEqual(lookups('organisation_list', 'hit'), hits + 1)
@@ -0,0 +1,149 @@
+import uuid
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from stagetwo.models import Membership, Organisation
+from stagetwo.tokens import ClaimsAccessToken
+
+User = get_user_model()
+
+
+class OrganisationPaginationTests(APITestCase):
+    client = APIClient()
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="user1@example.com", first_name="User", last_name="One", password="password123"
+        )
+        self.organisations = []
+        for i in range(5):
+            org = Organisation.objects.create(name=f"Org {i}")
+            org.users.add(self.user)
+            self.organisations.append(org)
+        self.url = reverse('organisation-list')
+        self.client.force_authenticate(user=self.user)
+
+    def test_unpaginated_response_is_unchanged(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['data']['organisations']), 5)
+        self.assertNotIn('next', response.data['data'])
+
+    def test_walk_all_pages_with_cursor(self):
+        seen = []
+        response = self.client.get(self.url, {'limit': 2})
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            data = response.data['data']
+            self.assertLessEqual(len(data['organisations']), 2)
+            seen.extend(org['orgId'] for org in data['organisations'])
+            if data['next'] is None:
+                break
+            response = self.client.get(self.url, {'limit': 2, 'cursor': data['next']})
+        self.assertEqual(seen, [str(org.orgId) for org in self.organisations])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_limit(self):
+        response = self.client.get(self.url, {'limit': '0'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class OrganisationMembersTests(APITestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("owner@example.com", "Olive", "Owner", "password123")
+        self.client.force_authenticate(user=self.owner)
+        self.org = Organisation.objects.create(name="Team")
+        self.org.users.add(self.owner, through_defaults={'role': Membership.Role.OWNER})
+        self.others = [
+            User.objects.create_user(f"user{i}@example.com", "User", str(i), "password123") for i in range(4)
+        ]
+        self.url = reverse('add-user-to-organisation', args=[self.org.orgId])
+
+    def member_count(self):
+        response = self.client.get(reverse('organisation-detail', args=[self.org.orgId]))
+        return response.data['data']['memberCount']
+
+    def test_member_count_follows_membership_changes(self):
+        self.assertEqual(self.member_count(), 1)
+        self.client.post(self.url, {"userId": str(self.others[0].userId)}, format='json')
+        self.assertEqual(self.member_count(), 2)
+        self.client.post(
+            reverse('add-users-to-organisation', args=[self.org.orgId]),
+            {"userIds": [str(user.userId) for user in self.others]}, format='json'
+        )
+        self.assertEqual(self.member_count(), 5)
+        self.org.users.remove(self.others[0], self.others[0])
+        self.assertEqual(self.member_count(), 4)
+        self.others[1].organisations.remove(self.org)
+        self.assertEqual(self.member_count(), 3)
+        self.others[1].organisations.add(self.org)
+        self.assertEqual(self.member_count(), 4)
+        self.assertEqual(self.org.users.count(), 4)
+
+    def test_member_count_changes_etags(self):
+        detail = self.client.get(reverse('organisation-detail', args=[self.org.orgId]))
+        listing = self.client.get(reverse('organisation-list'))
+        self.org.users.add(self.others[0])
+        self.assertNotEqual(
+            self.client.get(reverse('organisation-detail', args=[self.org.orgId]))['ETag'], detail['ETag']
+        )
+        self.assertNotEqual(self.client.get(reverse('organisation-list'))['ETag'], listing['ETag'])
+
+    def test_adding_a_member_only_bumps_their_version(self):
+        self.org.users.add(*self.others[1:])
+        versions = dict(User.objects.values_list('pk', 'membership_version'))
+        self.org.users.add(self.others[0])
+        changed = {
+            pk for pk, version in User.objects.values_list('pk', 'membership_version') if versions[pk] != version
+        }
+        self.assertEqual(changed, {self.others[0].pk})
+
+    def test_lists_members_in_pages_with_one_query(self):
+        self.org.users.add(*self.others)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'limit': 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        members = response.data['data']['users']
+        self.assertEqual(
+            [m['email'] for m in members], ["owner@example.com", "user0@example.com", "user1@example.com"]
+        )
+        self.assertEqual([m['role'] for m in members], ["owner", "member", "member"])
+        self.assertIn('joinedAt', members[0])
+
+        response = self.client.get(self.url, {'limit': 3, 'cursor': response.data['data']['next']})
+        self.assertEqual(
+            [m['email'] for m in response.data['data']['users']], ["user2@example.com", "user3@example.com"]
+        )
+        self.assertIsNone(response.data['data']['next'])
+
+    def test_only_members_can_list(self):
+        self.client.force_authenticate(user=self.others[0])
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
+        url = reverse('add-user-to-organisation', args=[uuid.uuid4()])
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(ROOT_URLCONF='stagetwo.async_urls')
+class AsyncOrganisationMembersTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("owner@example.com", "Olive", "Owner", "password123")
+        self.member = User.objects.create_user("member@example.com", "Max", "Member", "password123")
+        self.org = Organisation.objects.create(name="Team")
+        self.org.users.add(self.owner, through_defaults={'role': Membership.Role.OWNER})
+        self.org.users.add(self.member)
+
+    async def test_lists_members(self):
+        response = await self.async_client.get(
+            reverse('add-user-to-organisation', args=[self.org.orgId]),
+            headers={"AUTHORIZATION": f"Bearer {ClaimsAccessToken.for_user(self.member)}"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()['data']
+        self.assertEqual([(m['email'], m['role']) for m in data['users']],
+                         [("owner@example.com", "owner"), ("member@example.com", "member")])
+        self.assertIsNone(data['next'])
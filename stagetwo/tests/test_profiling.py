@@ -0,0 +1,158 @@
+import asyncio
+import os
+import tempfile
+import threading
+from io import StringIO
+
+from asgiref.sync import sync_to_async
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from stagetwo.models import User
+from stagetwo.profiling import ProfilingMiddleware, profiling_header, profiling_token
+from stagetwo.revocation import revocations
+from stagetwo.tokens import ClaimsAccessToken
+
+
+class ProfilingTests(APITestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        settings = override_settings(PROFILING={
+            'enabled': True, 'directory': self.directory, 'keep': 2, 'max_age': 60, 'top': 5,
+        })
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.staff = User.objects.create_user("admin@example.com", "Ada", "Admin", "password123", is_staff=True)
+        self.user = User.objects.create_user("john.doe@example.com", "John", "Doe", "password123")
+
+    def header(self):
+        return profiling_header('GET', reverse('organisation-list'))
+
+    def get_organisations(self, user, **headers):
+        return self.client.get(
+            reverse('organisation-list'), HTTP_AUTHORIZATION=f"Bearer {ClaimsAccessToken.for_user(user)}", **headers
+        )
+
+    def test_signed_header_profiles_the_request(self):
+        response = self.get_organisations(self.user, HTTP_X_PROFILE=self.header())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(os.listdir(self.directory), [response['X-Profile']])
+        self.assertEqual(len(response['X-Profile-Top'].split(', ')), 5)
+
+    def test_unsigned_or_missing_header_is_not_profiled(self):
+        for headers in (
+            {}, {"HTTP_X_PROFILE": "profile"}, {"HTTP_X_PROFILE": self.header() + "x"},
+            {"HTTP_X_PROFILE": profiling_header('POST', reverse('organisation-list'))},
+            {"HTTP_X_PROFILE": profiling_header('GET', reverse('user-detail', args=[self.user.userId]))},
+        ):
+            response = self.get_organisations(self.user, **headers)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('X-Profile', response)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_signed_header_is_used_once(self):
+        header = self.header()
+        self.assertIn('X-Profile', self.get_organisations(self.user, HTTP_X_PROFILE=header))
+        self.assertNotIn('X-Profile', self.get_organisations(self.user, HTTP_X_PROFILE=header))
+
+    def test_revoked_staff_token_does_not_profile(self):
+        token = profiling_token(self.staff)
+        revocations.revoke(token)
+        response = self.client.get(
+            reverse('organisation-list'), HTTP_AUTHORIZATION=f"Bearer {profiling_token(self.staff)}",
+            HTTP_X_PROFILE="claim",
+        )
+        self.assertIn('X-Profile', response)
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=f"Bearer {token}", HTTP_X_PROFILE="claim")
+        self.assertNotIn('X-Profile', ProfilingMiddleware(lambda request: HttpResponse())(request))
+
+    async def test_revoked_staff_token_does_not_profile_async_requests(self):
+        async def view(request):
+            return HttpResponse()
+
+        token = profiling_token(self.staff)
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=f"Bearer {token}", HTTP_X_PROFILE="claim")
+        self.assertIn('X-Profile', await ProfilingMiddleware(view)(request))
+        await sync_to_async(revocations.revoke)(token)
+        self.assertNotIn('X-Profile', await ProfilingMiddleware(view)(request))
+
+    def test_staff_token_claim_profiles_the_request(self):
+        response = self.client.get(
+            reverse('organisation-list'),
+            HTTP_AUTHORIZATION=f"Bearer {profiling_token(self.staff)}", HTTP_X_PROFILE="claim",
+        )
+        self.assertIn('X-Profile', response)
+
+        token = profiling_token(self.user)
+        response = self.client.get(
+            reverse('organisation-list'), HTTP_AUTHORIZATION=f"Bearer {token}", HTTP_X_PROFILE="claim"
+        )
+        self.assertNotIn('X-Profile', response)
+        response = self.get_organisations(self.staff, HTTP_X_PROFILE="claim")
+        self.assertNotIn('X-Profile', response)
+
+    def test_only_the_newest_profiles_are_kept(self):
+        names = [
+            self.get_organisations(self.user, HTTP_X_PROFILE=self.header())['X-Profile'] for _ in range(3)
+        ]
+        self.assertEqual(sorted(os.listdir(self.directory)), names[1:])
+
+    def test_management_command_mints_a_staff_token(self):
+        stdout = StringIO()
+        call_command('profile_token', email="ADMIN@example.com", stdout=stdout)
+        response = self.client.get(
+            reverse('organisation-list'),
+            HTTP_AUTHORIZATION=f"Bearer {stdout.getvalue().strip()}", HTTP_X_PROFILE="claim",
+        )
+        self.assertIn('X-Profile', response)
+
+    def test_management_command_signs_a_header_for_one_request(self):
+        stdout = StringIO()
+        call_command('profile_token', path=reverse('organisation-list'), stdout=stdout)
+        response = self.get_organisations(self.user, HTTP_X_PROFILE=stdout.getvalue().strip())
+        self.assertIn('X-Profile', response)
+
+    def profiled_request(self):
+        return RequestFactory().get('/', HTTP_X_PROFILE=profiling_header('GET', '/'))
+
+    def test_concurrent_threads_profile_one_request_at_a_time(self):
+        entered, release = threading.Event(), threading.Event()
+
+        def slow(request):
+            entered.set()
+            release.wait(5)
+            return HttpResponse()
+
+        middleware = ProfilingMiddleware(slow)
+        responses = []
+        thread = threading.Thread(target=lambda: responses.append(middleware(self.profiled_request())))
+        thread.start()
+        entered.wait(5)
+        # Served unprofiled while the first request holds the profiler.
+        busy = ProfilingMiddleware(lambda request: HttpResponse())(self.profiled_request())
+        release.set()
+        thread.join()
+        self.assertEqual(busy.status_code, 200)
+        self.assertNotIn('X-Profile', busy)
+        self.assertIn('X-Profile', responses[0])
+        self.assertIn('X-Profile', ProfilingMiddleware(lambda request: HttpResponse())(self.profiled_request()))
+
+    def test_interleaved_coroutines_profile_one_request_at_a_time(self):
+        async def slow(request):
+            await asyncio.sleep(0.01)
+            return HttpResponse()
+
+        async def main():
+            middleware = ProfilingMiddleware(slow)
+            return await asyncio.gather(*[middleware(self.profiled_request()) for _ in range(3)])
+
+        responses = asyncio.run(main())
+        self.assertEqual([response.status_code for response in responses], [200] * 3)
+        self.assertEqual(sum('X-Profile' in response for response in responses), 1)
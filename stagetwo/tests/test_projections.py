@@ -0,0 +1,39 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from stagetwo.models import Organisation
+from stagetwo.projections import ORGANISATION, USER
+from stagetwo.serializers import OrganisationSerializer
+
+User = get_user_model()
+
+
+class ProjectionParityTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="user1@example.com", first_name="Zoë", last_name="One", password="password123", phone="+1234567890"
+        )
+        self.user_without_phone = User.objects.create_user(
+            email="user2@example.com", first_name="User", last_name="Two", password="password123", phone=None
+        )
+        Organisation.objects.create(name="With description", description="Described")
+        Organisation.objects.create(name="Without description")
+
+    def test_organisation_projection_matches_serializer(self):
+        organisations = Organisation.objects.order_by('id')
+        expected = OrganisationSerializer(organisations, many=True).data
+        self.assertEqual(ORGANISATION.rows(organisations), [dict(item) for item in expected])
+        for organisation, item in zip(organisations, expected):
+            self.assertEqual(ORGANISATION.from_instance(organisation), dict(item))
+
+    def test_user_projection_matches_previous_response(self):
+        for user in (self.user, self.user_without_phone):
+            expected = {
+                "userId": str(user.userId),
+                "firstName": user.first_name,
+                "lastName": user.last_name,
+                "email": user.email,
+                "phone": user.phone,
+            }
+            self.assertEqual(USER.from_instance(user), expected)
+            row = User.objects.values_list(*USER.columns).get(pk=user.pk)
+            self.assertEqual(USER.from_row(row), expected)
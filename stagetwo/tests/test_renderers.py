@@ -0,0 +1,58 @@
+import datetime
+import uuid
+from decimal import Decimal
+from io import BytesIO
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ErrorDetail, ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from stagetwo.renderers import FastJSONParser, FastJSONRenderer
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    def assertSameBytes(self, data):
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_response_envelopes_are_byte_identical(self):
+        self.assertSameBytes({
+            "status": "success",
+            "message": "Organisations retrieved successfully",
+            "data": {
+                "organisations": [
+                    {"orgId": str(uuid.uuid4()), "name": "Zoë's Organisation   ", "description": None},
+                ],
+                "next": None,
+            }
+        })
+        self.assertSameBytes({"errors": [{"field": "email", "message": ErrorDetail("Enter a valid email address.", code="invalid")}]})
+        self.assertSameBytes({"status": "Bad request", "message": gettext_lazy("Authentication failed"), "statusCode": 401})
+
+    def test_native_types_match_drf_encoder(self):
+        self.assertSameBytes({
+            "uuid": uuid.uuid4(),
+            "datetime": datetime.datetime(2024, 7, 7, 12, 41, 0, 123, tzinfo=datetime.timezone.utc),
+            "date": datetime.date(2024, 7, 7),
+            "decimal": Decimal("1.50"),
+            "big": 2 ** 70,
+            1: "non-string key",
+        })
+
+    def test_none_renders_empty(self):
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+
+class FastJSONParserTests(SimpleTestCase):
+    def parse(self, parser, raw):
+        return parser.parse(BytesIO(raw), parser_context={'encoding': 'utf-8'})
+
+    def test_parses_like_json_parser(self):
+        raw = '{"email": "zoë@example.com", "ids": [1, 2, 36893488147419103232], "ok": true}'.encode()
+        self.assertEqual(self.parse(FastJSONParser(), raw), self.parse(JSONParser(), raw))
+
+    def test_invalid_json_raises_parse_error(self):
+        with self.assertRaises(ParseError):
+            self.parse(FastJSONParser(), b'{"email": ')
+        with self.assertRaises(ParseError):
+            self.parse(FastJSONParser(), b'{"n": NaN}')
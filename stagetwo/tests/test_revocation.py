@@ -0,0 +1,122 @@
+from datetime import timedelta
+from io import StringIO
+from uuid import uuid4
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from stagetwo.models import RevokedToken
+from stagetwo.revocation import BloomFilter, RevocationList, revocations
+
+
+class BloomFilterTests(TestCase):
+    def test_no_false_negatives_and_few_false_positives(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        keys = [str(uuid4()) for _ in range(1000)]
+        for key in keys:
+            bloom.add(key)
+        self.assertTrue(all(key in bloom for key in keys))
+        false_positives = sum(str(uuid4()) in bloom for _ in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+class RevocationListTests(TestCase):
+    def setUp(self):
+        self.now = 0
+        self.revocations = RevocationList(capacity=100, sync_interval=5, sync_margin=60, timer=lambda: self.now)
+
+    def revoke_row(self, jti, expires_in=timedelta(hours=1), **fields):
+        return RevokedToken.objects.create(jti=jti, expires_at=timezone.now() + expires_in, **fields)
+
+    def test_unseen_jti_is_answered_from_memory(self):
+        self.revoke_row("revoked")
+        self.assertTrue(self.revocations.is_revoked("revoked"))
+        with self.assertNumQueries(0):
+            self.assertFalse(self.revocations.is_revoked("other"))
+
+    def test_rows_from_other_processes_are_picked_up_on_sync(self):
+        self.revocations.sync()
+        self.revoke_row("late")
+        with self.assertNumQueries(0):
+            self.assertFalse(self.revocations.is_revoked("late"))
+        self.now = 5
+        self.assertTrue(self.revocations.is_revoked("late"))
+
+    def test_rows_committed_out_of_order_are_picked_up(self):
+        # Created before the first poll, committed after it with a lower id.
+        created_at = timezone.now()
+        self.revoke_row("placeholder", id=100)
+        self.revocations.sync()
+        self.revoke_row("committed late", id=1, created_at=created_at)
+        self.now = 5
+        self.assertTrue(self.revocations.is_revoked("committed late"))
+        count = self.revocations.filter.count
+        self.now = 10
+        self.revocations.sync()
+        self.assertEqual(self.revocations.filter.count, count)
+
+    def test_rows_past_the_margin_are_not_polled_again(self):
+        self.revocations.sync()
+        self.revoke_row("old", created_at=timezone.now() - timedelta(minutes=5))
+        self.now = 5
+        self.assertFalse(self.revocations.is_revoked("old"))
+
+    def test_sync_does_not_prune(self):
+        self.revoke_row("expired", expires_in=-timedelta(seconds=1))
+        self.revoke_row("live")
+        with self.assertNumQueries(2):
+            self.revocations.sync()
+        self.assertTrue(RevokedToken.objects.filter(jti="expired").exists())
+        self.assertFalse(self.revocations.is_revoked("expired"))
+        self.assertTrue(self.revocations.is_revoked("live"))
+
+    def test_expired_rows_are_pruned_by_the_command(self):
+        self.revoke_row("expired", expires_in=-timedelta(seconds=1))
+        self.revoke_row("live")
+        out = StringIO()
+        call_command('prune_revocations', stdout=out)
+        self.assertIn("Pruned 1", out.getvalue())
+        self.assertEqual(list(RevokedToken.objects.values_list('jti', flat=True)), ["live"])
+
+    def test_filter_grows_past_capacity(self):
+        RevokedToken.objects.bulk_create(
+            RevokedToken(jti=f"jti-{i}", expires_at=timezone.now() + timedelta(hours=1)) for i in range(250)
+        )
+        self.revocations.sync()
+        self.assertGreaterEqual(self.revocations.filter.capacity, 250)
+        self.assertTrue(self.revocations.is_revoked("jti-249"))
+
+
+class RevocationEndpointTests(APITestCase):
+    def setUp(self):
+        revocations.reset()
+        response = self.client.post(reverse('register') + "?refresh=true", {
+            "firstName": "John",
+            "lastName": "Doe",
+            "email": "john.doe@example.com",
+            "password": "password123",
+            "phone": "1234567890"
+        }, format='json')
+        self.access = response.data['data']['accessToken']
+        self.refresh = response.data['data']['refreshToken']
+
+    def test_rotated_refresh_token_cannot_be_reused(self):
+        response = self.client.post(reverse('token-refresh'), {"refreshToken": self.refresh}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.post(reverse('token-refresh'), {"refreshToken": self.refresh}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_logout_revokes_access_and_refresh_tokens(self):
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {self.access}"}
+        response = self.client.post(reverse('logout'), {"refreshToken": self.refresh}, format='json', **headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(RevokedToken.objects.count(), 2)
+
+        response = self.client.get(reverse('organisation-list'), **headers)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.post(reverse('token-refresh'), {"refreshToken": self.refresh}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
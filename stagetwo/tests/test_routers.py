@@ -0,0 +1,110 @@
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase, APITransactionTestCase
+
+from stagetwo.models import Organisation, User
+from stagetwo.routers import ReplicaRouter, check_pin_cache, pin_to_primary, replica_reads
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRouterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_reads_use_a_replica_only_when_asked(self):
+        self.assertEqual(User.objects.all().db, 'default')
+        with replica_reads(1):
+            self.assertEqual(User.objects.all().db, 'replica1')
+            self.assertEqual(ReplicaRouter().db_for_write(User), 'default')
+        self.assertEqual(User.objects.all().db, 'default')
+
+    def test_writers_are_pinned_to_the_primary(self):
+        pin_to_primary(1)
+        with replica_reads(1):
+            self.assertEqual(User.objects.all().db, 'default')
+        with replica_reads(2):
+            self.assertEqual(User.objects.all().db, 'replica1')
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(ReplicaRouter().allow_migrate('replica1', 'stagetwo'))
+        self.assertTrue(ReplicaRouter().allow_migrate('default', 'stagetwo'))
+
+    def test_replicas_need_a_shared_pin_cache(self):
+        local = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://'}}
+        with override_settings(CACHES=local):
+            with self.assertRaises(ImproperlyConfigured):
+                check_pin_cache()
+            with override_settings(DATABASE_REPLICAS=[]):
+                check_pin_cache()
+        with override_settings(CACHES=shared):
+            check_pin_cache()
+
+
+class ReplicaRoutingViewTests(APITestCase):
+    registration = {
+        "firstName": "John",
+        "lastName": "Doe",
+        "email": "john.doe@example.com",
+        "password": "password123",
+        "phone": "1234567890"
+    }
+
+    def setUp(self):
+        cache.clear()
+
+    def read_aliases(self, url, token):
+        # "default" doubles as the replica here, so a routed read shows up
+        # as "default" and a primary read as None (the router's "no opinion").
+        aliases = []
+        db_for_read = ReplicaRouter.db_for_read
+
+        def record(router, model, **hints):
+            aliases.append(db_for_read(router, model, **hints))
+            return aliases[-1]
+
+        with override_settings(DATABASE_REPLICAS=['default']), \
+                mock.patch.object(ReplicaRouter, 'db_for_read', record):
+            response = self.client.get(url, HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return set(aliases)
+
+    def test_reads_after_a_write_stay_on_the_primary(self):
+        with override_settings(DATABASE_REPLICAS=['default']):
+            response = self.client.post(reverse('register'), self.registration, format='json')
+        token = response.data['data']['accessToken']
+        self.assertEqual(self.read_aliases(reverse('organisation-list'), token), {None})
+
+        cache.clear()
+        self.assertEqual(self.read_aliases(reverse('organisation-list'), token), {'default'})
+
+
+@skipUnless(settings.DATABASE_REPLICAS, "set DATABASE_REPLICA_URLS to run against a second database")
+class ReplicaDatabaseTests(APITransactionTestCase):
+    # Replicas mirror the default database under test; the mirror's own
+    # connection only sees committed rows, hence a transaction test case.
+    databases = {'default', *settings.DATABASE_REPLICAS}
+
+    def test_organisation_list_reads_from_the_replica(self):
+        replica = settings.DATABASE_REPLICAS[0]
+        response = self.client.post(reverse('register'), {
+            "firstName": "John",
+            "lastName": "Doe",
+            "email": "john.doe@example.com",
+            "password": "password123",
+        }, format='json')
+        token = response.data['data']['accessToken']
+        cache.clear()
+        with CaptureQueriesContext(connections[replica]) as queries:
+            response = self.client.get(reverse('organisation-list'), HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['data']['organisations']), Organisation.objects.count())
+        self.assertTrue(queries.captured_queries)
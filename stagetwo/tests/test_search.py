@@ -0,0 +1,90 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from stagetwo.models import Organisation, User
+from stagetwo.pagination import encode_cursor
+from stagetwo.tokens import ClaimsAccessToken
+
+# Expected order for the query "acme".
+RANKED = [
+    ("Acme", None),
+    ("acme labs", None),
+    ("The Acme Company", None),
+    ("Bacme", None),
+    ("Tools", "Supplies for ACME"),
+]
+
+
+class SearchFixture:
+    def setUp(self):
+        self.user = User.objects.create_user("user1@example.com", "User", "One", "password123")
+        other = User.objects.create_user("user2@example.com", "User", "Two", "password123")
+        # Created in reverse so rank, not id, decides the order.
+        self.organisations = []
+        for name, description in reversed(RANKED):
+            org = Organisation.objects.create(name=name, description=description)
+            org.users.add(self.user)
+            self.organisations.append(org)
+        Organisation.objects.create(name="Unrelated").users.add(self.user)
+        Organisation.objects.create(name="Acme elsewhere").users.add(other)
+        self.url = reverse('organisation-search')
+
+
+class OrganisationSearchTests(SearchFixture, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(user=self.user)
+
+    def names(self, response):
+        return [org['name'] for org in response.data['data']['organisations']]
+
+    def test_ranks_matches_among_the_callers_organisations(self):
+        response = self.client.get(self.url, {'q': 'acme'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.names(response), [name for name, _ in RANKED])
+        self.assertIsNone(response.data['data']['next'])
+
+    def test_prefix_match(self):
+        response = self.client.get(self.url, {'q': 'The Ac'})
+        self.assertEqual(self.names(response), ["The Acme Company"])
+
+    def test_walk_all_pages_with_cursor(self):
+        seen = []
+        response = self.client.get(self.url, {'q': 'acme', 'limit': 2})
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(self.names(response))
+            cursor = response.data['data']['next']
+            if cursor is None:
+                break
+            response = self.client.get(self.url, {'q': 'acme', 'limit': 2, 'cursor': cursor})
+        self.assertEqual(seen, [name for name, _ in RANKED])
+
+    def test_invalid_requests(self):
+        for params in ({}, {'q': '   '}, {'q': 'a' * 101}, {'q': 'acme', 'cursor': encode_cursor(3)}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(user=None)
+        response = self.client.get(self.url, {'q': 'acme'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(ROOT_URLCONF='stagetwo.async_urls')
+class AsyncOrganisationSearchTests(SearchFixture, TestCase):
+    async def test_ranks_and_pages(self):
+        headers = {"AUTHORIZATION": f"Bearer {ClaimsAccessToken.for_user(self.user)}"}
+        response = await self.async_client.get(self.url, {'q': 'acme', 'limit': 3}, headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()['data']
+        self.assertEqual([org['name'] for org in data['organisations']], [name for name, _ in RANKED[:3]])
+
+        response = await self.async_client.get(
+            self.url, {'q': 'acme', 'limit': 3, 'cursor': data['next']}, headers=headers
+        )
+        data = response.json()['data']
+        self.assertEqual([org['name'] for org in data['organisations']], [name for name, _ in RANKED[3:]])
+        self.assertIsNone(data['next'])
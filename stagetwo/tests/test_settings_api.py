@@ -0,0 +1,19 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+
+class APISettingsProfileTests(SimpleTestCase):
+    def test_api_profile_serves_the_api_without_admin_apps(self):
+        stdout = StringIO()
+        call_command(
+            'bench_coldstart', runs=1, warm_requests=1, profiles=['stagetworest.settings_api'],
+            json=True, stdout=stdout,
+        )
+        result = json.loads(stdout.getvalue())['stagetworest.settings_api']
+        # Unauthenticated, so the API answers without touching the database.
+        self.assertEqual(result['status'], 401)
+        self.assertEqual(result['apps'], 5)
+        self.assertEqual(result['middleware'], 5)
@@ -0,0 +1,180 @@
+import asyncio
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from stagetwo.models import Membership, Organisation
+from stagetwo.singleflight import SingleFlight, lookups
+from stagetwo.timing import collect_timings
+from stagetwo.tokens import ClaimsAccessToken
+
+User = get_user_model()
+
+
+class SingleFlightTests(SimpleTestCase):
+    def run_threads(self, flight, load, count=20):
+        start = threading.Barrier(count)
+        results = [None] * count
+
+        def worker(i):
+            start.wait()
+            try:
+                results[i] = flight.do('key', load)
+            except Exception as exc:
+                results[i] = exc
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_threads_share_one_call(self):
+        flight = SingleFlight()
+        calls = []
+
+        def load():
+            calls.append(1)
+            time.sleep(0.2)
+            return ('row',)
+
+        results = self.run_threads(flight, load)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [('row',)] * 20)
+        self.assertEqual(len(flight), 0)
+        # Nothing is kept once the call is over.
+        flight.do('key', load)
+        self.assertEqual(len(calls), 2)
+
+    def test_threads_share_the_exception(self):
+        flight = SingleFlight()
+
+        def load():
+            time.sleep(0.2)
+            raise Organisation.DoesNotExist
+
+        results = self.run_threads(flight, load)
+        self.assertTrue(all(isinstance(result, Organisation.DoesNotExist) for result in results))
+        self.assertEqual(len(flight), 0)
+
+    def test_concurrent_tasks_share_one_call(self):
+        flight = SingleFlight()
+        calls = []
+
+        async def load():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return ('row',)
+
+        async def main():
+            return await asyncio.gather(*[flight.ado('key', load) for _ in range(20)])
+
+        self.assertEqual(asyncio.run(main()), [('row',)] * 20)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(flight), 0)
+
+    def test_cancelled_caller_does_not_cancel_the_others(self):
+        flight = SingleFlight()
+
+        async def load():
+            await asyncio.sleep(0.05)
+            return 'done'
+
+        async def main():
+            first = asyncio.ensure_future(flight.ado('key', load))
+            second = asyncio.ensure_future(flight.ado('key', load))
+            await asyncio.sleep(0)
+            first.cancel()
+            return await second
+
+        self.assertEqual(asyncio.run(main()), 'done')
+
+
+class ThreadedLookupTests(TransactionTestCase):
+    def test_concurrent_threads_share_one_query(self):
+        org = Organisation.objects.create(name="Popular")
+        count = 10
+        start = threading.Barrier(count)
+        queries = []
+        results = [None] * count
+
+        def count_queries(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        def load():
+            # Long enough for every thread to join the call in flight.
+            time.sleep(0.2)
+            return Organisation.objects.values_list('pk', 'name').get(orgId=org.orgId)
+
+        def worker(i):
+            try:
+                # Each thread has its own connection, so the wrapper sees all of them.
+                with connection.execute_wrapper(count_queries):
+                    start.wait()
+                    results[i] = lookups.do(('organisation', org.orgId, 'default'), load)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [(org.pk, "Popular")] * count)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(len(lookups), 0)
+
+
+@override_settings(ROOT_URLCONF='stagetwo.async_urls')
+class CoalescedLookupTests(TestCase):
+    def setUp(self):
+        self.members = [
+            User.objects.create_user(f"member{i}@example.com", "Member", str(i), "password123") for i in range(2)
+        ]
+        self.outsider = User.objects.create_user("outsider@example.com", "Out", "Sider", "password123")
+        self.org = Organisation.objects.create(name="Popular")
+        self.org.users.add(*self.members)
+
+    def get(self, url, user):
+        headers = {"AUTHORIZATION": f"Bearer {ClaimsAccessToken.for_user(user)}"}
+        return self.async_client.get(url, headers=headers)
+
+    async def test_concurrent_detail_requests_share_one_query(self):
+        url = reverse('organisation-detail', args=[self.org.orgId])
+        # Load the token revocation filter first, so only the views query.
+        await self.get(url, self.members[0])
+        with collect_timings() as timings:
+            responses = await asyncio.gather(*[self.get(url, self.members[0]) for _ in range(20)])
+        self.assertEqual({response.status_code for response in responses}, {status.HTTP_200_OK})
+        # One organisation query, then a membership check per request.
+        self.assertEqual(timings.queries, 1 + 20)
+        self.assertEqual(len(lookups), 0)
+
+    async def test_membership_is_still_checked_per_caller(self):
+        url = reverse('organisation-detail', args=[self.org.orgId])
+        responses = await asyncio.gather(self.get(url, self.members[1]), self.get(url, self.outsider))
+        self.assertEqual(
+            [response.status_code for response in responses], [status.HTTP_200_OK, status.HTTP_404_NOT_FOUND]
+        )
+
+    async def test_concurrent_user_lookups_share_one_query(self):
+        url = reverse('user-detail', args=[self.members[1].userId])
+        await self.get(url, self.members[0])
+        with collect_timings() as timings:
+            responses = await asyncio.gather(*[self.get(url, self.members[0]) for _ in range(20)])
+        self.assertEqual({response.status_code for response in responses}, {status.HTTP_200_OK})
+        # One user query, then a co-membership check per request.
+        self.assertEqual(timings.queries, 1 + 20)
+
+    async def test_removed_member_loses_access_at_once(self):
+        url = reverse('organisation-detail', args=[self.org.orgId])
+        self.assertEqual((await self.get(url, self.members[1])).status_code, status.HTTP_200_OK)
+        await Membership.objects.filter(organisation=self.org, user=self.members[1]).adelete()
+        self.assertEqual((await self.get(url, self.members[1])).status_code, status.HTTP_404_NOT_FOUND)
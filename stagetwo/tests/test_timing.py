@@ -0,0 +1,82 @@
+import re
+import time
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from stagetwo.models import Organisation, User
+from stagetwo.tokens import ClaimsAccessToken
+
+
+def parse_server_timing(header):
+    return {
+        match['name']: (float(match['dur']), match['desc'])
+        for match in re.finditer(r'(?P<name>\w+);dur=(?P<dur>[\d.]+)(?:;desc="(?P<desc>[^"]*)")?', header)
+    }
+
+
+def slow_middleware(get_response):
+    def middleware(request):
+        time.sleep(0.05)
+        return get_response(request)
+    return middleware
+
+
+class TimingFixture:
+    def setUp(self):
+        self.user = User.objects.create_user("john.doe@example.com", "John", "Doe", "password123")
+        self.other = User.objects.create_user("jane.doe@example.com", "Jane", "Doe", "password123")
+        org = Organisation.objects.create(name="Shared")
+        org.users.add(self.user, self.other)
+        self.headers = {"HTTP_AUTHORIZATION": f"Bearer {ClaimsAccessToken.for_user(self.user)}"}
+
+
+@override_settings(SERVER_TIMING=True)
+class ServerTimingTests(TimingFixture, APITestCase):
+    def test_header_breaks_down_the_request(self):
+        with self.assertLogs('stagetwo.timing', 'INFO') as logs:
+            response = self.client.get(reverse('user-detail', args=[self.other.userId]), **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        timings = parse_server_timing(response['Server-Timing'])
+        self.assertEqual(set(timings), {'sql', 'auth', 'view', 'render', 'total'})
+        self.assertRegex(timings['sql'][1], r'^[1-9]\d* queries$')
+        self.assertGreater(timings['auth'][0], 0)
+        self.assertGreater(timings['render'][0], 0)
+
+        record = logs.records[0]
+        self.assertEqual(record.status, 200)
+        self.assertEqual(record.timings['queries'], int(timings['sql'][1].split()[0]))
+        self.assertIn(f"path={record.path}", record.getMessage())
+
+    def test_view_time_excludes_other_middleware(self):
+        middleware = [
+            'stagetwo.timing.ServerTimingMiddleware', 'stagetwo.tests.test_timing.slow_middleware',
+        ]
+        with override_settings(MIDDLEWARE=middleware):
+            response = self.client.get(reverse('user-detail', args=[self.other.userId]), **self.headers)
+        timings = parse_server_timing(response['Server-Timing'])
+        self.assertGreaterEqual(timings['total'][0], 50)
+        self.assertGreater(timings['view'][0], 0)
+        self.assertLess(timings['view'][0], 50)
+
+    @override_settings(SERVER_TIMING=False)
+    def test_disabled_by_default(self):
+        response = self.client.get(reverse('user-detail', args=[self.other.userId]), **self.headers)
+        self.assertNotIn('Server-Timing', response)
+
+
+@override_settings(SERVER_TIMING=True, ROOT_URLCONF='stagetwo.async_urls')
+class AsyncServerTimingTests(TimingFixture, TestCase):
+    async def test_header_breaks_down_the_request(self):
+        response = await self.async_client.get(
+            reverse('user-detail', args=[self.other.userId]),
+            headers={"AUTHORIZATION": self.headers["HTTP_AUTHORIZATION"]},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        timings = parse_server_timing(response['Server-Timing'])
+        self.assertRegex(timings['sql'][1], r'^[1-9]\d* queries$')
+        self.assertGreater(timings['auth'][0], 0)
+        self.assertGreater(timings['render'][0], 0)
@@ -0,0 +1,73 @@
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from stagetwo.models import User
+
+
+class TokenRefreshTests(APITestCase):
+    registration = {
+        "firstName": "John",
+        "lastName": "Doe",
+        "email": "john.doe@example.com",
+        "password": "password123",
+        "phone": "1234567890"
+    }
+
+    def login(self, refresh=None):
+        url = reverse('login') + (f"?refresh={refresh}" if refresh else "")
+        return self.client.post(url, {
+            "email": "john.doe@example.com",
+            "password": "password123"
+        }, format='json')
+
+    def setUp(self):
+        self.client.post(reverse('register'), self.registration, format='json')
+
+    def test_refresh_token_only_issued_on_request(self):
+        response = self.login()
+        self.assertNotIn('refreshToken', response.data['data'])
+        self.assertNotIn('refreshToken', response.cookies)
+
+        response = self.client.post(reverse('register') + "?refresh=true", dict(
+            self.registration, email="ife.dayo@example.com"
+        ), format='json')
+        self.assertIn('refreshToken', response.data['data'])
+
+    def test_refresh_with_body_token_rotates(self):
+        refresh = self.login(refresh='true').data['data']['refreshToken']
+        response = self.client.post(reverse('token-refresh'), {"refreshToken": refresh}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data['data']
+        self.assertNotEqual(data['refreshToken'], refresh)
+
+        response = self.client.get(reverse('organisation-list'), HTTP_AUTHORIZATION=f"Bearer {data['accessToken']}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(SIMPLE_JWT={'ROTATE_REFRESH_TOKENS': False})
+    def test_refresh_without_rotation_returns_access_only(self):
+        refresh = self.login(refresh='true').data['data']['refreshToken']
+        response = self.client.post(reverse('token-refresh'), {"refreshToken": refresh}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.data['data']), ['accessToken'])
+
+    def test_refresh_with_cookie(self):
+        response = self.login(refresh='cookie')
+        self.assertNotIn('refreshToken', response.data['data'])
+        cookie = response.cookies['refreshToken']
+        self.assertTrue(cookie['httponly'])
+
+        response = self.client.post(reverse('token-refresh'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response.cookies['refreshToken'].value, cookie.value)
+
+    def test_invalid_refresh_tokens_are_rejected(self):
+        access = self.login().data['data']['accessToken']
+        user = User.objects.get(email="john.doe@example.com")
+        inactive = RefreshToken.for_user(user)
+        User.objects.filter(pk=user.pk).update(is_active=False)
+        for token in (None, "garbage", access, str(inactive)):
+            response = self.client.post(reverse('token-refresh'), {"refreshToken": token}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED, token)
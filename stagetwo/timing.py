@@ -0,0 +1,181 @@
+"""
+Opt-in per-request timing (``SERVER_TIMING = True``).
+
+``ServerTimingMiddleware`` records, for every request, the number and total
+time of SQL queries (through ``connection.execute_wrapper``, so DEBUG is not
+needed), and the time spent authenticating, in the view and rendering. They
+are sent back in a ``Server-Timing`` header and logged as one logfmt line on
+the ``stagetwo.timing`` logger.
+
+The view is timed from ``process_view`` until it returns its response (the
+``process_template_response`` hook for DRF responses, otherwise the way
+back out through this middleware), less the auth and render time spent
+inside it, so other middleware is not counted as view time.
+
+The current request's timings live in a context variable, so code anywhere
+in the request (sync or async) can add to them with ``timed(phase)``; it is
+a no-op outside an instrumented request. The query wrapper is installed on
+every connection as it is opened (connections are per thread, and async
+views query from sync_to_async threads); outside an instrumented request it
+costs one context variable lookup per query.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+logger = logging.getLogger('stagetwo.timing')
+
+_current = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.queries = 0
+        self.sql = 0.0
+        self.view_started = None
+        self.view = None
+        # Phases timed while the view runs, taken out of the view's time.
+        self.in_view = 0.0
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+        if self.view_started is not None and self.view is None:
+            self.in_view += seconds
+
+    def start_view(self):
+        self.view_started = time.perf_counter()
+
+    def end_view(self):
+        if self.view_started is not None and self.view is None:
+            self.view = max(0.0, time.perf_counter() - self.view_started - self.in_view)
+
+    def summary(self):
+        self.end_view()
+        return {
+            "total": time.perf_counter() - self.started,
+            "auth": self.phases.get('auth', 0.0),
+            "view": self.view or 0.0,
+            "render": self.phases.get('render', 0.0),
+            "sql": self.sql,
+            "queries": self.queries,
+        }
+
+
+def current_timings():
+    return _current.get()
+
+
+@contextmanager
+def collect_timings():
+    """
+    Collect the current request's timings, joining the ones already being
+    collected by an outer middleware.
+    """
+    timings = _current.get()
+    if timings is not None:
+        yield timings
+        return
+    timings = RequestTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+def time_query(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.sql += time.perf_counter() - started
+        timings.queries += 1
+
+
+def install_query_timer(connection):
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+@contextmanager
+def timed(phase):
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(phase, time.perf_counter() - started)
+
+
+def server_timing_header(summary):
+    return ", ".join([
+        f'sql;dur={summary["sql"] * 1000:.2f};desc="{summary["queries"]} queries"',
+        f'auth;dur={summary["auth"] * 1000:.2f}',
+        f'view;dur={summary["view"] * 1000:.2f}',
+        f'render;dur={summary["render"] * 1000:.2f}',
+        f'total;dur={summary["total"] * 1000:.2f}',
+    ])
+
+
+class ServerTimingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'SERVER_TIMING', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with collect_timings() as timings:
+            response = self.get_response(request)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        with collect_timings() as timings:
+            response = await self.get_response(request)
+        return self.finish(request, response, timings)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timings = _current.get()
+        if timings is not None:
+            timings.start_view()
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after this hook; time the render.
+        timings = _current.get()
+        if timings is not None:
+            timings.end_view()
+            started = time.perf_counter()
+            response.add_post_render_callback(lambda r: timings.add('render', time.perf_counter() - started))
+        return response
+
+    def finish(self, request, response, timings):
+        summary = timings.summary()
+        response['Server-Timing'] = server_timing_header(summary)
+        logger.info(
+            'method=%s path=%s status=%s total_ms=%.2f auth_ms=%.2f view_ms=%.2f render_ms=%.2f '
+            'sql_ms=%.2f queries=%d',
+            request.method, request.path, response.status_code, summary['total'] * 1000,
+            summary['auth'] * 1000, summary['view'] * 1000, summary['render'] * 1000,
+            summary['sql'] * 1000, summary['queries'],
+            extra={'timings': summary, 'path': request.path, 'status': response.status_code},
+        )
+        return response
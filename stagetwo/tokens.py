@@ -0,0 +1,124 @@
+from django.conf import settings
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, TokenError
+from rest_framework_simplejwt import settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from .authentication import get_cached_user
+from .revocation import revocations
+
+
+def user_claims(user):
+    """
+    Profile claims embedded in every token so authenticated requests can
+    build ``request.user`` without a database round trip.
+    """
+    return {
+        "userId": str(user.userId),
+        "email": user.email,
+        "firstName": user.first_name,
+        "lastName": user.last_name,
+        "phone": user.phone,
+        "is_staff": user.is_staff,
+    }
+
+
+class ClaimsTokenMixin:
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim, value in user_claims(user).items():
+            token[claim] = value
+        return token
+
+
+class ClaimsAccessToken(ClaimsTokenMixin, AccessToken):
+    pass
+
+
+class ClaimsRefreshToken(ClaimsTokenMixin, RefreshToken):
+    pass
+
+
+def requested_refresh_delivery(params):
+    """
+    How the client asked to receive a refresh token: ``"body"``,
+    ``"cookie"`` or ``None`` (access token only, the default).
+    """
+    value = params.get('refresh', '').lower()
+    if value in ('1', 'true', 'body'):
+        return 'body'
+    if value == 'cookie':
+        return 'cookie'
+    return None
+
+
+def refresh_cookie_name():
+    return settings.REFRESH_TOKEN_COOKIE['name']
+
+
+def set_refresh_cookie(response, refresh):
+    options = settings.REFRESH_TOKEN_COOKIE
+    response.set_cookie(
+        options['name'],
+        str(refresh),
+        max_age=int(jwt_settings.api_settings.REFRESH_TOKEN_LIFETIME.total_seconds()),
+        path=options['path'],
+        secure=options['secure'],
+        httponly=True,
+        samesite=options['samesite'],
+    )
+
+
+def delete_refresh_cookie(response):
+    options = settings.REFRESH_TOKEN_COOKIE
+    response.delete_cookie(options['name'], path=options['path'], samesite=options['samesite'])
+
+
+def validate_refresh_token(raw):
+    """
+    Validate a refresh token and return it with its user, re-read so claims
+    minted from it are current. Raises ``TokenError`` for anything unusable.
+    """
+    # Token(None) would mint a fresh token rather than validate one.
+    if not raw or not isinstance(raw, str):
+        raise TokenError("No refresh token provided")
+    refresh = ClaimsRefreshToken(raw)
+    if revocations.is_revoked(refresh.get(jwt_settings.api_settings.JTI_CLAIM)):
+        raise TokenError("Token has been revoked")
+    try:
+        user = get_cached_user(refresh[jwt_settings.api_settings.USER_ID_CLAIM])
+    except (KeyError, AuthenticationFailed):
+        raise TokenError("Token user not found")
+    if not user.is_active:
+        raise TokenError("Token user is inactive")
+    return refresh, user
+
+
+def use_refresh_token(raw):
+    """
+    Accept a refresh token for the refresh endpoint. Returns the user and
+    whether a rotated refresh token should be issued. With
+    ``BLACKLIST_AFTER_ROTATION`` the old token is revoked, and a token that
+    was already rotated is rejected.
+    """
+    # Looked up per call; simplejwt replaces api_settings when SIMPLE_JWT changes.
+    options = jwt_settings.api_settings
+    refresh, user = validate_refresh_token(raw)
+    if options.ROTATE_REFRESH_TOKENS and options.BLACKLIST_AFTER_ROTATION:
+        if not revocations.revoke(refresh):
+            raise TokenError("Token has already been used")
+    return user, options.ROTATE_REFRESH_TOKENS
+
+
+def revoke_tokens(user, access, raw_refresh=None):
+    """
+    Log out: revoke the access token in use and, if given, the caller's
+    refresh token. An unusable refresh token is ignored.
+    """
+    revocations.revoke(access)
+    try:
+        refresh, owner = validate_refresh_token(raw_refresh)
+    except TokenError:
+        return
+    if owner.pk == user.pk:
+        revocations.revoke(refresh)
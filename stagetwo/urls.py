@@ -1,20 +1,30 @@
 from django.urls import path
 from .views import (
     UserRegistrationView, 
+    BulkUserRegistrationView,
     UserLoginView, 
+    TokenRefreshView,
+    LogoutView,
     UserDetailView, 
     OrganisationListView, 
+    OrganisationSearchView,
     OrganisationDetailView, 
     OrganisationCreateView, 
-    AddUserToOrganisationView
+    AddUserToOrganisationView,
+    AddUsersToOrganisationView
 )
 
 urlpatterns = [
     path('register', UserRegistrationView.as_view(), name='register'),
+    path('register/bulk', BulkUserRegistrationView.as_view(), name='register-bulk'),
     path('login', UserLoginView.as_view(), name='login'),
+    path('token/refresh', TokenRefreshView.as_view(), name='token-refresh'),
+    path('logout', LogoutView.as_view(), name='logout'),
     path('users/<uuid:user_id>', UserDetailView.as_view(), name='user-detail'),
     path('organisations', OrganisationListView.as_view(), name='organisation-list'),
+    path('organisations/search', OrganisationSearchView.as_view(), name='organisation-search'),
     path('organisations/<uuid:org_id>', OrganisationDetailView.as_view(), name='organisation-detail'),
     path('organisations', OrganisationCreateView.as_view(), name='organisation-create'),
     path('organisations/<uuid:org_id>/users', AddUserToOrganisationView.as_view(), name='add-user-to-organisation'),
+    path('organisations/<uuid:org_id>/users/batch', AddUsersToOrganisationView.as_view(), name='add-users-to-organisation'),
 ]
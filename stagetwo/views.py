@@ -1,55 +1,149 @@
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS, IsAuthenticated, IsAdminUser
+from rest_framework_simplejwt.exceptions import TokenError
+from django.conf import settings
+from django.db import IntegrityError
 from django.contrib.auth import authenticate
 from .serializers import (
     UserRegistrationSerializer, 
     UserLoginSerializer, 
     OrganisationSerializer,
-    AddUserToOrganisationSerializer
+    AddUserToOrganisationSerializer,
+    AddUsersToOrganisationSerializer,
+    bulk_register_users,
+    field_errors
 )
-from .models import User, Organisation
+from .models import Membership, User, Organisation
+from .conditional import etag_matches, make_etag
+from .memberships import (
+    add_members, is_member, organisation_list_versions, organisation_members, share_organisation
+)
+from .metrics import AUTH_FAILURES, TOKEN_ISSUE_SECONDS, TOKENS_ISSUED
+from .organisation_cache import organisation_list, organisation_payloads
+from .pagination import KeysetPaginator, InvalidCursor
+from .projections import MEMBER, ORGANISATION, USER
+from .routers import pin_to_primary, read_alias, reset_reads, use_replica
+from .search import InvalidQuery, clean_query, search_organisations
+from .singleflight import lookups
+from .tokens import (
+    ClaimsAccessToken,
+    ClaimsRefreshToken,
+    delete_refresh_cookie,
+    refresh_cookie_name,
+    requested_refresh_delivery,
+    revoke_tokens,
+    set_refresh_cookie,
+    use_refresh_token
+)
+
+
+
+def not_modified(etag):
+    return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+def get_tokens_for_user(user, refresh=False):
+    with TOKEN_ISSUE_SECONDS.time():
+        # Only mint (and sign) a refresh token when the client will keep it.
+        if not refresh:
+            tokens = {'access': str(ClaimsAccessToken.for_user(user))}
+        else:
+            refresh = ClaimsRefreshToken.for_user(user)
+            tokens = {
+                'refresh': str(refresh),
+                'access': str(refresh.access_token),
+            }
+    for token_type in tokens:
+        TOKENS_ISSUED.inc(type=token_type)
+    return tokens
+
+def issue_tokens(user, delivery):
+    """
+    Response token fields for ``user`` plus the refresh token to set as a
+    cookie, if the client asked for one that way.
+    """
+    token = get_tokens_for_user(user, refresh=delivery is not None)
+    data = {"accessToken": token['access']}
+    if delivery == 'body':
+        data["refreshToken"] = token['refresh']
+    return data, token['refresh'] if delivery == 'cookie' else None
 
+class ReplicaReadMixin:
+    """Serve the view's GET requests from a read replica; see routers.py."""
+    read_alias_token = None
 
+    def initial(self, request, *args, **kwargs):
+        # Runs after authentication and permission checks.
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS:
+            self.read_alias_token = use_replica(request.user.pk)
 
-def get_tokens_for_user(user):
-    refresh = RefreshToken.for_user(user)
-    return {
-        'refresh': str(refresh),
-        'access': str(refresh.access_token),
-    }
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            if self.read_alias_token is not None:
+                reset_reads(self.read_alias_token)
 
 class UserRegistrationView(APIView):
     def post(self, request):
         serializer = UserRegistrationSerializer(data=request.data)
         if serializer.is_valid():
-            user = serializer.save()
-            token = get_tokens_for_user(user)
+            try:
+                user = serializer.save()
+            except ValidationError as exc:
+                return Response({"errors": field_errors(exc.detail)}, status=status.HTTP_400_BAD_REQUEST)
+            pin_to_primary(user.pk)
+            tokens, cookie = issue_tokens(user, requested_refresh_delivery(request.query_params))
             data = {
-                "accessToken": token['access'],
-                "user": {
-                    "userId": str(user.userId),
-                    "firstName": user.first_name,
-                    "lastName": user.last_name,
-                    "email": user.email,
-                    "phone": user.phone,
-                }
+                **tokens,
+                "user": USER.from_instance(user)
             }
-            return Response({
+            response = Response({
                 "status": "success",
                 "message": "Registration successful",
                 "data": data
             }, status=status.HTTP_201_CREATED)
+            if cookie:
+                set_refresh_cookie(response, cookie)
+            return response
         else:
-            errors = [
-                {"field": field, "message": message}
-                for field, messages in serializer.errors.items()
-                for message in messages
-            ]
-            return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({"errors": field_errors(serializer.errors)}, status=status.HTTP_400_BAD_REQUEST)
         
+class BulkUserRegistrationView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        items = request.data.get("users") if isinstance(request.data, dict) else None
+        max_batch = getattr(settings, 'BULK_REGISTRATION_MAX_BATCH', 1000)
+        if not isinstance(items, list) or not items or len(items) > max_batch:
+            return Response({
+                "status": "Bad Request",
+                "message": f"Provide a 'users' list of 1 to {max_batch} registrations",
+                "statusCode": 400
+            }, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            results, created = bulk_register_users(items)
+        except IntegrityError:
+            # A concurrent registration took one of the emails after the check.
+            return Response({
+                "status": "Conflict",
+                "message": "Some emails were registered concurrently, please retry",
+                "statusCode": 409
+            }, status=status.HTTP_409_CONFLICT)
+        for result in results:
+            if result["status"] == "created":
+                result["user"] = USER.from_instance(result["user"])
+        return Response({
+            "status": "success",
+            "message": f"{len(created)} of {len(items)} users registered",
+            "data": {
+                "results": results
+            }
+        }, status=status.HTTP_200_OK)
+
 class UserLoginView(APIView):
     def post(self, request):
         serializer = UserLoginSerializer(data=request.data)
@@ -58,22 +152,20 @@ class UserLoginView(APIView):
             password = serializer.validated_data['password']
             user = authenticate(request, email=email, password=password)
             if user is not None:
-                token = get_tokens_for_user(user)
+                tokens, cookie = issue_tokens(user, requested_refresh_delivery(request.query_params))
                 data = {
-                    "accessToken": token['access'],
-                    "user": {
-                        "userId": str(user.userId),
-                        "firstName": user.first_name,
-                        "lastName": user.last_name,
-                        "email": user.email,
-                        "phone": user.phone,
-                    }
+                    **tokens,
+                    "user": USER.from_instance(user)
                 }
-                return Response({
+                response = Response({
                     "status": "success",
                     "message": "Login successful",
                     "data": data
                 }, status=status.HTTP_200_OK)
+                if cookie:
+                    set_refresh_cookie(response, cookie)
+                return response
+            AUTH_FAILURES.inc(reason='login')
             return Response({
                 "status": "Bad request",
                 "message": "Authentication failed",
@@ -81,16 +173,72 @@ class UserLoginView(APIView):
             }, status=status.HTTP_401_UNAUTHORIZED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class UserDetailView(APIView):
+def get_raw_refresh_token(request):
+    # The body wins over the cookie; the answer goes back the same way.
+    raw = request.data.get("refreshToken") if isinstance(request.data, dict) else None
+    if raw:
+        return raw, 'body'
+    return request.COOKIES.get(refresh_cookie_name()), 'cookie'
+
+class TokenRefreshView(APIView):
+    """
+    Exchange a refresh token (``refreshToken`` in the body, or the refresh
+    cookie) for a new access token without re-checking the password. With
+    ``ROTATE_REFRESH_TOKENS`` a new refresh token is returned the same way
+    the old one arrived.
+    """
+    authentication_classes = []
+
+    def post(self, request):
+        raw, delivery = get_raw_refresh_token(request)
+        try:
+            user, rotate = use_refresh_token(raw)
+        except TokenError:
+            AUTH_FAILURES.inc(reason='refresh_token')
+            return Response({
+                "status": "Bad request",
+                "message": "Invalid or expired refresh token",
+                "statusCode": 401
+            }, status=status.HTTP_401_UNAUTHORIZED)
+        tokens, cookie = issue_tokens(user, delivery if rotate else None)
+        response = Response({
+            "status": "success",
+            "message": "Token refreshed successfully",
+            "data": tokens
+        }, status=status.HTTP_200_OK)
+        if cookie:
+            set_refresh_cookie(response, cookie)
+        return response
+
+class LogoutView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        raw, _ = get_raw_refresh_token(request)
+        revoke_tokens(request.user, request.auth, raw)
+        response = Response({
+            "status": "success",
+            "message": "Logout successful"
+        }, status=status.HTTP_200_OK)
+        delete_refresh_cookie(response)
+        return response
+
+class UserDetailView(ReplicaReadMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, user_id):
         current_user = request.user
-        if str(current_user.userId) == user_id:
-            user = current_user
+        if str(current_user.userId) == str(user_id):
+            data = USER.from_instance(current_user)
+            # Served from the token claims, so tag the content itself.
+            etag = make_etag('user', data)
         else:
             try:
-                user = User.objects.get(userId=user_id)
+                # Concurrent lookups of one user share a single query.
+                pk, version, *row = lookups.do(
+                    ('user', user_id, read_alias()),
+                    lambda: User.objects.values_list('pk', 'version', *USER.columns).get(userId=user_id)
+                )
             except User.DoesNotExist:
                 return Response({
                     "status": "Bad Request",
@@ -98,53 +246,117 @@ class UserDetailView(APIView):
                     "statusCode": 404
                 }, status=status.HTTP_404_NOT_FOUND)
             #If user does exist, check if both users belong to at least one common organisation
-            commmon_organizations = Organisation.objects.filter(users=current_user).filter(users=user)
-            if not commmon_organizations.exists():
+            if not share_organisation(current_user.pk, pk):
                 return Response({
                     "status": "Forbidden Request",
                     "message": "You do not have the permission to view this yet",
                     "statusCode": 403
                 }, status=status.HTTP_403_FORBIDDEN)
-        data = {
-            "userId": str(user.userId),
-            "firstName": user.first_name,
-            "lastName": user.last_name,
-            "email": user.email,
-            "phone": user.phone,
-        }
+            etag = make_etag('user', str(user_id), version)
+            data = USER.from_row(row)
+        if etag_matches(request, etag):
+            return not_modified(etag)
         return Response({
             "status": "success",
             "message": "User retrieved successfully",
             "data": data
-            }, status=status.HTTP_200_OK)
+            }, status=status.HTTP_200_OK, headers={"ETag": etag})
         
 
-class OrganisationListView(APIView):
+class OrganisationListView(ReplicaReadMixin, APIView):
+    permission_classes = [IsAuthenticated]
+
+    paginator = KeysetPaginator(key='id')
+
+    def get(self, request):
+        versions = organisation_list_versions(request.user.pk).first() or (None, None, 0)
+        etag = make_etag('organisations', request.user.pk, *versions[1:], request.GET.urlencode())
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+        if not self.paginator.is_requested(request):
+            # Served from the organisation cache (see organisation_cache.py).
+            entries = organisation_list(request.user.pk, *versions)
+            return Response({
+                "status": "success",
+                "message": "Organisations retrieved successfully",
+                "data": {
+                    "organisations": organisation_payloads(entries)
+                }
+            }, status=status.HTTP_200_OK, headers={"ETag": etag})
+
+        # A page is one indexed keyset query, however many organisations the
+        # user has; the whole cached list is not loaded for it.
+        try:
+            page, next_cursor = self.paginator.paginate(
+                Organisation.objects.filter(users=request.user.pk).values_list('id', *ORGANISATION.columns), request
+            )
+        except InvalidCursor as exc:
+            return Response({
+                "status": "Bad Request",
+                "message": str(exc),
+                "statusCode": 400
+            }, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            "status": "success",
+            "message": "Organisations retrieved successfully",
+            "data": {
+                "organisations": [ORGANISATION.from_row(row[1:]) for row in page],
+                "next": next_cursor
+            }
+        }, status=status.HTTP_200_OK, headers={"ETag": etag})
+
+class OrganisationSearchView(ReplicaReadMixin, APIView):
+    """
+    ``GET organisations/search?q=`` over the caller's organisations, best
+    matches first (see ``search.py``), paginated with ``limit``/``cursor``.
+    """
     permission_classes = [IsAuthenticated]
 
+    paginator = KeysetPaginator(key=('rank', 'id'), default_limit=20)
+
     def get(self, request):
-        organisations = request.user.organisations.all()
-        serializer = OrganisationSerializer(organisations, many=True)
+        try:
+            query = clean_query(request.query_params.get('q'))
+            page, next_cursor = self.paginator.paginate(
+                search_organisations(request.user.pk, query).values_list('rank', 'id', *ORGANISATION.columns),
+                request
+            )
+        except (InvalidQuery, InvalidCursor) as exc:
+            return Response({
+                "status": "Bad Request",
+                "message": str(exc),
+                "statusCode": 400
+            }, status=status.HTTP_400_BAD_REQUEST)
         return Response({
             "status": "success",
             "message": "Organisations retrieved successfully",
             "data": {
-                "organisations": serializer.data
+                "organisations": [ORGANISATION.from_row(row[2:]) for row in page],
+                "next": next_cursor
             }
         }, status=status.HTTP_200_OK)
 
-class OrganisationDetailView(APIView):
+class OrganisationDetailView(ReplicaReadMixin, APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, org_id):
         try:
-            organisation = Organisation.objects.get(orgId=org_id, users=request.user)
-            serializer = OrganisationSerializer(organisation)
+            # Shared by every member asking at once; membership is checked per caller.
+            pk, version, *row = lookups.do(
+                ('organisation', org_id, read_alias()),
+                lambda: Organisation.objects.values_list('pk', 'version', *ORGANISATION.columns).get(orgId=org_id)
+            )
+            if not is_member(request.user.pk, pk):
+                raise Organisation.DoesNotExist
+            etag = make_etag('organisation', str(org_id), version)
+            if etag_matches(request, etag):
+                return not_modified(etag)
             return Response({
                 "status": "success",
                 "message": "Organisation retrieved successfully",
-                "data": serializer.data
-            }, status=status.HTTP_200_OK)
+                "data": ORGANISATION.from_row(row)
+            }, status=status.HTTP_200_OK, headers={"ETag": etag})
         except Organisation.DoesNotExist:
             return Response({
                 "status": "Bad request",
@@ -159,8 +371,9 @@ class OrganisationCreateView(APIView):
         serializer = OrganisationSerializer(data=request.data)
         if serializer.is_valid():
             organisation = serializer.save()
-            organisation.users.add(request.user)
-            organisation.save()
+            organisation.users.add(request.user.pk, through_defaults={'role': Membership.Role.OWNER})
+            organisation.refresh_from_db(fields=['member_count'])
+            pin_to_primary(request.user.pk)
             return Response({
                 "status": "success",
                 "message": "Organisation created successfully",
@@ -172,17 +385,50 @@ class OrganisationCreateView(APIView):
             "statusCode": 400
         }, status=status.HTTP_400_BAD_REQUEST)
 
-class AddUserToOrganisationView(APIView):
+class AddUserToOrganisationView(ReplicaReadMixin, APIView):
+    """
+    ``organisations/<org_id>/users``: GET lists the members of one of the
+    caller's organisations, in pages (``limit``/``cursor``); POST adds one.
+    """
     permission_classes = [IsAuthenticated]
 
+    paginator = KeysetPaginator(key='user_id')
+
+    def get(self, request, org_id):
+        try:
+            page, next_cursor = self.paginator.paginate(
+                organisation_members(org_id, request.user.pk).values_list('user_id', *MEMBER.columns), request
+            )
+        except InvalidCursor as exc:
+            return Response({
+                "status": "Bad Request",
+                "message": str(exc),
+                "statusCode": 400
+            }, status=status.HTTP_400_BAD_REQUEST)
+        # An empty page is either past the last member or not the caller's organisation.
+        if not page and not Organisation.objects.filter(orgId=org_id, users=request.user.pk).exists():
+            return Response({
+                "status": "Bad request",
+                "message": "Organisation not found",
+                "statusCode": 404
+            }, status=status.HTTP_404_NOT_FOUND)
+        return Response({
+            "status": "success",
+            "message": "Members retrieved successfully",
+            "data": {
+                "users": [MEMBER.from_row(row[1:]) for row in page],
+                "next": next_cursor
+            }
+        }, status=status.HTTP_200_OK)
+
     def post(self, request, org_id):
         serializer = AddUserToOrganisationSerializer(data=request.data)
         if serializer.is_valid():
             try:
                 user = User.objects.get(userId=serializer.validated_data['userId'])
-                organisation = Organisation.objects.get(orgId=org_id, users=request.user)
+                organisation = Organisation.objects.get(orgId=org_id, users=request.user.pk)
                 organisation.users.add(user)
-                organisation.save()
+                pin_to_primary(request.user.pk, user.pk)
                 return Response({
                     "status": "success",
                     "message": "User added to organisation successfully"
@@ -201,3 +447,32 @@ class AddUserToOrganisationView(APIView):
                 }, status=status.HTTP_404_NOT_FOUND)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class AddUsersToOrganisationView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, org_id):
+        serializer = AddUsersToOrganisationSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            organisation = Organisation.objects.get(orgId=org_id, users=request.user.pk)
+        except Organisation.DoesNotExist:
+            return Response({
+                "status": "Bad request",
+                "message": "Organisation not found",
+                "statusCode": 404
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        user_ids = list(dict.fromkeys(serializer.validated_data['userIds']))
+        found = dict(User.objects.filter(userId__in=user_ids).values_list('userId', 'pk'))
+        added = set(add_members(organisation, list(found.values())))
+        pin_to_primary(request.user.pk, *added)
+        return Response({
+            "status": "success",
+            "message": "Users added to organisation successfully",
+            "data": {
+                "added": [str(uid) for uid, pk in found.items() if pk in added],
+                "alreadyMembers": [str(uid) for uid, pk in found.items() if pk not in added],
+                "notFound": [str(uid) for uid in user_ids if uid not in found],
+            }
+        }, status=status.HTTP_200_OK)
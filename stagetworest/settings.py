@@ -11,9 +11,12 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
 from pathlib import Path
+import importlib.util
 import os
+import sys
+import tempfile
 from dotenv import load_dotenv
-import dj_database_url
+from stagetwo.db import database_config
 load_dotenv()
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -46,18 +49,52 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication", 
+        "stagetwo.authentication.ClaimsJWTAuthentication",
     ), 
     'EXCEPTION_HANDLER': 'stagetwo.exception_handler.custom_exception_handler',
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'stagetwo.renderers.FastJSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
-        'rest_framework.parsers.JSONParser',
+        'stagetwo.renderers.FastJSONParser',
     ],
 }
 
+# Full User rows loaded by ClaimsJWTAuthentication when a view needs more
+# than the token claims (per process, bounded LRU with a TTL in seconds)
+USER_CACHE_SIZE = 1024
+USER_CACHE_TTL = 300
+
+# Each user's organisation ids, used to answer "do these users share an
+# organisation?" in UserDetailView. Entries are keyed by membership_version,
+# so a membership change in any worker retires them; use a shared CACHES
+# entry so workers reuse each other's.
+MEMBERSHIP_CACHE = 'default'
+MEMBERSHIP_CACHE_TIMEOUT = 300
+
+# Django's cache framework: local memory per process unless CACHE_BACKEND
+# names a shared one (e.g. django.core.cache.backends.redis.RedisCache with
+# CACHE_LOCATION=redis://...), so every worker reuses the same entries.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Users' organisation lists and organisation payloads, keyed by their
+# version counters (see stagetwo/organisation_cache.py)
+ORGANISATION_CACHE = 'default'
+ORGANISATION_CACHE_TIMEOUT = int(os.getenv('ORGANISATION_CACHE_TIMEOUT', 300))
+
+# Opt-in keyset pagination for list endpoints (?limit=<n>&cursor=<next>)
+PAGINATION_DEFAULT_LIMIT = 100
+PAGINATION_MAX_LIMIT = 1000
+
 MIDDLEWARE = [
+    "stagetwo.profiling.ProfilingMiddleware",
+    "stagetwo.metrics.MetricsMiddleware",
+    "stagetwo.timing.ServerTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -67,6 +104,48 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Server-Timing header and a timing log line per request (SQL, auth, view,
+# render); ServerTimingMiddleware removes itself when this is off
+SERVER_TIMING = os.getenv('SERVER_TIMING', '0') == '1'
+
+# Per-request cProfile runs for staff, see stagetwo/profiling.py; the newest
+# 'keep' profiles are kept in 'directory' and signed headers, each for one
+# request, last 'max_age' seconds
+PROFILING = {
+    'enabled': os.getenv('PROFILING', '0') == '1',
+    'directory': os.getenv('PROFILING_DIR', os.path.join(tempfile.gettempdir(), 'stagetwo-profiles')),
+    'keep': int(os.getenv('PROFILING_KEEP', 50)),
+    'max_age': 300,
+    'top': 10,
+}
+
+# Prometheus metrics served on /internal/metrics to METRICS['token'] holders.
+# Workers of one host share 'directory' so a scrape sees all of them; the
+# process manager should clear it at startup and archive dead workers'
+# snapshots (see the gunicorn hooks in stagetwo/metrics.py).
+METRICS = {
+    'enabled': os.getenv('METRICS', '1') == '1',
+    'token': os.getenv('METRICS_TOKEN'),
+    'directory': os.getenv('METRICS_DIR'),
+    'flush_interval': 1,
+}
+
+# Test runs keep the per-request timing lines quiet; assertLogs still sees them.
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "stagetwo.timing": {
+            "handlers": ["console"], "level": "WARNING" if TESTING else "INFO", "propagate": False,
+        },
+    },
+}
+
 ROOT_URLCONF = "stagetworest.urls"
 
 TEMPLATES = [
@@ -87,14 +166,46 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "stagetworest.wsgi.application"
 
+# Route the API to the native async views; asgi.py turns this on.
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', '0') == '1'
+
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# persistent (long-lived workers), pgbouncer (serverless behind PgBouncer
+# transaction pooling) or pooled (in-process pool); see stagetwo/db
+DATABASE_CONNECTION_MODE = os.getenv('DATABASE_CONNECTION_MODE', 'persistent')
+
+database_options = {
+    'ssl_require': os.getenv('DATABASE_SSL_REQUIRE', '1') == '1',
+    'conn_max_age': int(os.getenv('DATABASE_CONN_MAX_AGE', 600)),
+    'pool': {
+        'size': int(os.getenv('DATABASE_POOL_SIZE', 10)),
+        'max_idle': int(os.getenv('DATABASE_POOL_MAX_IDLE', 300)),
+    },
+}
+
 DATABASES = {
-    'default': dj_database_url.config(default=os.getenv('DATABASE_URL'), conn_max_age=600, ssl_require=True)
+    'default': database_config(os.getenv('DATABASE_URL'), DATABASE_CONNECTION_MODE, **database_options)
 }
 
+# Read replicas (comma-separated URLs) for the read endpoints. A user's reads
+# stay on the primary for REPLICA_PIN_SECONDS after they write; see
+# stagetwo/routers.py. Under test each replica mirrors the default database.
+# The pins live in the REPLICA_PIN_CACHE cache ('default'), which must be
+# shared by all workers (CACHE_BACKEND): startup fails with replicas and a
+# local-memory cache.
+DATABASE_REPLICAS = []
+for index, url in enumerate(filter(None, os.getenv('DATABASE_REPLICA_URLS', '').split(','))):
+    alias = f'replica{index + 1}'
+    DATABASES[alias] = database_config(url, DATABASE_CONNECTION_MODE, **database_options)
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['stagetwo.routers.ReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 5))
+
 """ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql_psycopg2',
@@ -128,6 +239,46 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing policy. The first entry of PASSWORD_HASHERS hashes new
+# passwords; the rest only verify older hashes, which Django upgrades on the
+# next successful login. Argon2 needs the argon2-cffi package.
+PASSWORD_HASHER = os.getenv('PASSWORD_HASHER', 'scrypt')
+if PASSWORD_HASHER == 'argon2' and importlib.util.find_spec('argon2') is None:
+    PASSWORD_HASHER = 'scrypt'
+
+PASSWORD_HASHER_CLASSES = {
+    'argon2': 'stagetwo.hashers.Argon2PasswordHasher',
+    'scrypt': 'stagetwo.hashers.ScryptPasswordHasher',
+    'pbkdf2_sha256': 'stagetwo.hashers.PBKDF2PasswordHasher',
+}
+
+PASSWORD_HASHERS = [PASSWORD_HASHER_CLASSES[PASSWORD_HASHER]] + [
+    path for name, path in PASSWORD_HASHER_CLASSES.items() if name != PASSWORD_HASHER
+]
+
+PASSWORD_HASHER_COSTS = {
+    'scrypt': {
+        'work_factor': int(os.getenv('SCRYPT_WORK_FACTOR', 2 ** 14)),
+    },
+    'argon2': {
+        'time_cost': int(os.getenv('ARGON2_TIME_COST', 2)),
+        'memory_cost': int(os.getenv('ARGON2_MEMORY_COST', 102400)),
+    },
+    'pbkdf2_sha256': {
+        'iterations': int(os.getenv('PBKDF2_ITERATIONS', 600000)),
+    },
+}
+
+
+# Threads used to hash passwords in parallel (bulk registration)
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 4))
+
+# Largest batch accepted by the bulk registration endpoint
+BULK_REGISTRATION_MAX_BATCH = 1000
+
+# Largest list of userIds accepted by the batch membership endpoint
+MEMBERSHIP_BATCH_MAX = 10000
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
@@ -156,7 +307,8 @@ from datetime import timedelta
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=5),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
-    'ROTATE_REFRESH_TOKENS': False,
+    'ROTATE_REFRESH_TOKENS': True,
+    # Enforced by stagetwo.revocation, not simplejwt's token_blacklist app
     'BLACKLIST_AFTER_ROTATION': True,
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': SECRET_KEY,
@@ -173,3 +325,21 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_LIFETIME': timedelta(minutes=5),
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
 }
+
+# Revoked token JTIs are mirrored in a per-process Bloom filter; the table is
+# polled every REVOCATION_SYNC_INTERVAL seconds for rows created since the
+# previous poll less REVOCATION_SYNC_MARGIN seconds (late commits, clock
+# skew). Expired rows are deleted by `manage.py prune_revocations`, run
+# periodically from cron.
+REVOCATION_FILTER_CAPACITY = 100000
+REVOCATION_FILTER_ERROR_RATE = 0.001
+REVOCATION_SYNC_INTERVAL = int(os.getenv('REVOCATION_SYNC_INTERVAL', 5))
+REVOCATION_SYNC_MARGIN = 60
+
+# Cookie used when a client asks for its refresh token with ?refresh=cookie
+REFRESH_TOKEN_COOKIE = {
+    'name': 'refreshToken',
+    'path': '/',
+    'secure': not DEBUG,
+    'samesite': 'Strict',
+}
@@ -0,0 +1,38 @@
+"""
+API-only settings profile.
+
+Loads the minimum app and middleware set the JWT JSON API under
+``stagetwo.urls`` needs: no admin, sessions, messages, static files or
+templates, and no session/CSRF/auth/message middleware (DRF views are
+CSRF-exempt and authenticate from the bearer token). This trims import and
+wiring time on serverless cold starts and per-request middleware work.
+
+Select it with ``DJANGO_SETTINGS_MODULE=stagetworest.settings_api`` (the
+default in ``wsgi.py``). The admin is served separately by ``wsgi_admin.py``
+with the full ``stagetworest.settings``, which is also what migrations and
+``collectstatic`` must run with.
+"""
+from .settings import *  # noqa: F401,F403
+
+INSTALLED_APPS = [
+    "django.contrib.auth",
+    "django.contrib.contenttypes",
+    "rest_framework",
+    "rest_framework_simplejwt",
+    "stagetwo",
+]
+
+# The base stack minus what only the admin and browser sessions use, so the
+# two lists cannot drift apart.
+BROWSER_MIDDLEWARE = {
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.middleware.csrf.CsrfViewMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+}
+MIDDLEWARE = [name for name in MIDDLEWARE if name not in BROWSER_MIDDLEWARE]
+
+TEMPLATES = []
+
+ROOT_URLCONF = "stagetworest.urls_api"
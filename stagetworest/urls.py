@@ -14,11 +14,16 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
+from stagetwo.metrics import metrics_view
+
+api_urls = 'stagetwo.async_urls' if settings.ASYNC_VIEWS else 'stagetwo.urls'
 
 urlpatterns = [
     path("admin/", admin.site.urls),
-    path("auth/", include('stagetwo.urls')),
-    path("api/", include('stagetwo.urls'))
+    path("auth/", include(api_urls)),
+    path("api/", include(api_urls)),
+    path("internal/metrics", metrics_view, name="metrics")
 ]
@@ -0,0 +1,15 @@
+"""
+URL configuration for the API-only profile (settings_api): the API mounts
+of ``stagetworest.urls`` without the admin.
+"""
+from django.conf import settings
+from django.urls import path, include
+from stagetwo.metrics import metrics_view
+
+api_urls = 'stagetwo.async_urls' if settings.ASYNC_VIEWS else 'stagetwo.urls'
+
+urlpatterns = [
+    path("auth/", include(api_urls)),
+    path("api/", include(api_urls)),
+    path("internal/metrics", metrics_view, name="metrics")
+]
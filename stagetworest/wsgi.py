@@ -11,6 +11,9 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "stagetworest.settings")
+# The API-only profile; the admin is mounted separately (wsgi_admin.py).
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "stagetworest.settings_api")
 
 app = get_wsgi_application()
+# The name Django (WSGI_APPLICATION) and most servers look for.
+application = app
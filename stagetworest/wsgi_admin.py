@@ -0,0 +1,14 @@
+"""
+WSGI entry point for the admin mount.
+
+Serves ``stagetworest.urls`` (admin included) with the full settings, so
+the API entry point in ``wsgi.py`` can run the lean API-only profile.
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "stagetworest.settings")
+
+application = app = get_wsgi_application()